@@ -9,6 +9,7 @@
 
 import datetime
 import re
+from collections import defaultdict
 from hashlib import md5
 
 from django.conf import settings
@@ -32,7 +33,7 @@ from allauth.account.utils import sync_user_email_addresses
 from pootle.core.cache import make_method_key
 from pootle_language.models import Language
 from pootle_statistics.models import (ScoreLog, Submission,
-                                      TranslationActionCodes)
+                                      TranslationActionCodes, UserDailyStats)
 from pootle_store.models import Unit
 
 from .managers import UserManager
@@ -176,25 +177,39 @@ class User(AbstractBaseUser):
         now = timezone.now()
         past = now + datetime.timedelta(-days)
 
-        lookup_kwargs = {
-            'creation_time__range': [past, now],
-        }
-
+        # Whole days are read from the daily stats, and only the score logs
+        # of the partial days at both ends of the period are aggregated
+        days_lookup, partial_lookup = UserDailyStats.split_range(past, now)
+        tp_lookup = {}
         if language is not None:
-            lookup_kwargs.update({
-                'submission__translation_project__language__code':
-                    language,
-            })
-
+            tp_lookup['translation_project__language__code'] = language
         if project is not None:
-            lookup_kwargs.update({
-                'submission__translation_project__project__code':
-                    project,
-            })
+            tp_lookup['translation_project__project__code'] = project
 
         meta_user_ids = cls.objects.meta_users().values_list('id', flat=True)
-        top_scores = ScoreLog.objects.values("user").filter(
-            **lookup_kwargs
+        scores = defaultdict(lambda: defaultdict(int))
+
+        if days_lookup is not None:
+            daily_scores = UserDailyStats.objects.values('user').filter(
+                days_lookup, **tp_lookup
+            ).exclude(
+                user__pk__in=meta_user_ids,
+            ).annotate(
+                total_score=Sum('score'),
+                suggested_sum=Sum('suggested'),
+                translated_sum=Sum('translated'),
+                reviewed_sum=Sum('reviewed'),
+            ).order_by()
+            for item in daily_scores:
+                user_scores = scores[item['user']]
+                user_scores['total_score'] += item['total_score']
+                user_scores['suggested'] += item['suggested_sum']
+                user_scores['translated'] += item['translated_sum']
+                user_scores['reviewed'] += item['reviewed_sum']
+
+        partial_scores = ScoreLog.objects.values("user").filter(
+            partial_lookup,
+            **dict(('submission__%s' % k, v) for k, v in tp_lookup.items())
         ).exclude(
             user__pk__in=meta_user_ids,
         ).annotate(
@@ -222,11 +237,7 @@ class User(AbstractBaseUser):
             reviewed=Sum(
                 Case(
                     When(
-                        action_code__in=[
-                            TranslationActionCodes.SUGG_REVIEWED_ACCEPTED,
-                            TranslationActionCodes.REVIEWED,
-                            TranslationActionCodes.EDITED,
-                        ],
+                        action_code__in=TranslationActionCodes.REVIEW_CODES,
                         translated_wordcount__isnull=True,
                         then='wordcount',
                     ),
@@ -234,7 +245,18 @@ class User(AbstractBaseUser):
                     output_field=models.IntegerField()
                 )
             ),
-        ).order_by('-total_score')[offset:]
+        ).order_by()
+        for item in partial_scores:
+            user_scores = scores[item['user']]
+            for field in ('total_score', 'suggested', 'translated',
+                          'reviewed'):
+                user_scores[field] += item[field]
+
+        top_scores = sorted(
+            (dict(user_scores, user=user_id)
+             for user_id, user_scores in scores.iteritems()),
+            key=lambda item: -item['total_score'],
+        )[offset:]
 
         if isinstance(limit, (int, long)) and limit > 0:
             top_scores = top_scores[:limit]
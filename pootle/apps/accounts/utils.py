@@ -9,15 +9,26 @@
 import functools
 import logging
 import sys
+from collections import defaultdict
 
 from django.contrib.auth import get_user_model
 from django.core.validators import ValidationError, validate_email
 from django.db.models import Count
+from django.utils import timezone
 
 from allauth.account.models import EmailAddress
 from allauth.account.utils import sync_user_email_addresses
 
+from pootle.core.checks.checker import QualityCheckUpdater
+from pootle.core.log import UNIT_DELETED, action_log
+from pootle.core.mixins import CachedMethods, stats_batch
+from pootle.core.models import Revision
+from pootle.core.search.queue import tm_update_queue
+from pootle.core.utils.list import chunked
+from pootle_statistics.models import Submission, UserDailyStats
 from pootle_store.constants import FUZZY, UNTRANSLATED
+from pootle_store.models import Store, Suggestion, Unit
+from pootle_store.unit.filters import get_text_search_class
 from pootle_store.util import SuggestionStates
 
 
@@ -62,6 +73,144 @@ def write_stdout(start_msg, end_msg="DONE\n", fail_msg="FAILED\n"):
     return class_wrapper
 
 
+class UnitReverter(object):
+    """Writes the changes made to many units at once.
+
+    This mirrors what `Unit.save()` does for units whose target, state or
+    comment are reverted, but units sharing the same changes are updated
+    with a single query, a single revision is allocated for all of them,
+    and quality checks, TM and search index updates are run once per
+    batch of units. The stats of each affected store are refreshed once.
+    """
+
+    #: Fields whose changes are written to the DB
+    FIELDS = (
+        'target_f', 'target_wordcount', 'target_length', 'state', 'revision',
+        'submitted_by_id', 'submitted_on', 'commented_by_id', 'commented_on',
+        'translator_comment', 'reviewed_by_id', 'reviewed_on',
+    )
+
+    #: Maximum number of units to be handled at once
+    CHUNK_SIZE = 500
+
+    def __init__(self):
+        self.stores = {}
+        self.system_user = get_user_model().objects.get_system_user()
+
+    def get_store(self, store_id):
+        """Returns the store with `store_id`, using the same instance for
+        all of its units so that their dirty stats are collected together.
+        """
+        if store_id not in self.stores:
+            self.stores[store_id] = Store.objects.select_related(
+                'translation_project__language',
+                'translation_project__project',
+            ).get(id=store_id)
+        return self.stores[store_id]
+
+    def revert(self, unit_ids):
+        """Yields the units with `unit_ids` so that they can be reverted.
+
+        Changes made to the yielded units are written once every batch of
+        units has been consumed.
+        """
+        for batch in chunked(sorted(set(unit_ids)), self.CHUNK_SIZE):
+            units = list(Unit.simple_objects.filter(id__in=batch))
+            original = {}
+            for unit in units:
+                unit.store = self.get_store(unit.store_id)
+                unit._log_user = self.system_user
+                original[unit.id] = self.get_values(unit)
+
+            for unit in units:
+                yield unit
+
+            self.save(units, original)
+
+        with stats_batch():
+            for store in self.stores.itervalues():
+                store.mark_dirty(CachedMethods.MTIME)
+                store.update_dirty_cache()
+
+    def get_values(self, unit):
+        return [getattr(unit, field) for field in self.FIELDS]
+
+    def save(self, units, original):
+        revision = None
+        mtime = timezone.now()
+        updates = defaultdict(list)
+        changed = []
+        for unit in units:
+            if unit._target_updated:
+                unit.update_target_fields()
+
+            if (unit._target_updated or
+                unit._state_updated or
+                unit._comment_updated):
+                if revision is None:
+                    revision = Revision.incr()
+                unit.revision = revision
+
+            if hasattr(unit, '_save_action'):
+                action_log(user=unit._log_user, action=unit._save_action,
+                           lang=unit.store.translation_project.language.code,
+                           unit=unit.id, translation=unit.target_f,
+                           path=unit.store.pootle_path)
+
+            unit.update_review_fields()
+
+            changes = tuple(
+                (field, value)
+                for field, value, old_value in zip(self.FIELDS,
+                                                   self.get_values(unit),
+                                                   original[unit.id])
+                if value != old_value
+            )
+            if changes:
+                updates[changes].append(unit.id)
+                changed.append(unit)
+
+        # Units reverted to the same values are updated at once
+        for changes, unit_ids in updates.iteritems():
+            Unit.simple_objects.filter(id__in=unit_ids).update(
+                mtime=mtime, **dict(changes))
+
+        check_ids = [unit.id for unit in changed if unit._target_updated]
+        if check_ids:
+            QualityCheckUpdater(
+                keep_false_positives=False,
+                unit_ids=check_ids,
+            ).update(clear_unknown=False)
+
+        self.update_tmserver([unit for unit in changed
+                              if unit._target_updated and unit.istranslated()])
+
+        get_text_search_class().index_units([
+            unit for unit in changed
+            if unit._target_updated or unit._comment_updated
+        ])
+
+        for unit in changed:
+            unit.reset_update_flags()
+
+    def update_tmserver(self, units):
+        if not units:
+            return
+
+        User = get_user_model()
+        users = User.objects.in_bulk(
+            set(unit.submitted_by_id for unit in units) - set([None])
+        )
+        tm_objs = defaultdict(list)
+        for unit in units:
+            unit.submitted_by = users.get(unit.submitted_by_id)
+            language = unit.store.translation_project.language.code
+            tm_objs[language].append(unit.get_tmserver_obj())
+
+        for language, objs in tm_objs.iteritems():
+            tm_update_queue.push(language, objs)
+
+
 class UserMerger(object):
 
     def __init__(self, src_user, target_user):
@@ -91,6 +240,9 @@ class UserMerger(object):
         self.merge_suggestions()
         self.merge_reviews()
 
+        UserDailyStats.refresh(user_ids=[self.src_user.id,
+                                         self.target_user.id])
+
     @write_stdout(" * Merging units comments: "
                   "%(src_user)s --> %(target_user)s... ")
     def merge_commented(self):
@@ -145,6 +297,9 @@ class UserMerger(object):
 
 class UserPurger(object):
 
+    #: Maximum number of IDs to be included in a single query
+    CHUNK_SIZE = 500
+
     def __init__(self, user):
         """Purges user from site reverting any changes that they have made.
 
@@ -163,36 +318,104 @@ class UserPurger(object):
         - Revert unit comments by user.
         - Revert unit state changes by user.
         - Delete any remaining submissions and suggestions.
-        """
-
-        self.remove_units_created()
-        self.revert_units_edited()
-        self.revert_units_reviewed()
-        self.revert_units_commented()
-        self.revert_units_state_changed()
-
-        # Delete remaining submissions.
-        logger.debug("Deleting remaining submissions for: %s", self.user)
-        self.user.submission_set.all().delete()
 
-        # Delete remaining suggestions.
-        logger.debug("Deleting remaining suggestions for: %s", self.user)
-        self.user.suggestions.all().delete()
+        Units are reverted in bulk, and the stats of the affected stores
+        are refreshed once all of them have been reverted.
+        """
+        with stats_batch():
+            self.remove_units_created()
+            self.revert_units_edited()
+            self.revert_units_reviewed()
+            self.revert_units_commented()
+            self.revert_units_state_changed()
+
+            # Delete remaining submissions.
+            logger.debug("Deleting remaining submissions for: %s", self.user)
+            self.user.submission_set.all().delete()
+
+            # Delete remaining suggestions.
+            logger.debug("Deleting remaining suggestions for: %s", self.user)
+            unit_ids = list(self.user.suggestions.values_list('unit_id',
+                                                              flat=True))
+            self.user.suggestions.all().delete()
+            Unit.update_filter_counts(unit_ids)
+            self.mark_stores_dirty(unit_ids, CachedMethods.SUGGESTIONS)
+
+        UserDailyStats.refresh(user_ids=[self.user.id])
+
+    def get_last_submissions(self, submissions, unit_ids):
+        """Returns the last of `submissions` made by other users on each
+        of the units with `unit_ids`.
+
+        :return: dictionary of `{unit_id: submission_values}`.
+        """
+        last_submissions = {}
+        for batch in chunked(list(unit_ids), self.CHUNK_SIZE):
+            values = (
+                submissions.filter(unit_id__in=batch)
+                           .exclude(submitter=self.user)
+                           .order_by('pk')
+                           .values('unit_id', 'submitter_id', 'new_value',
+                                   'creation_time')
+            )
+            for submission in values:
+                last_submissions[submission['unit_id']] = submission
+        return last_submissions
+
+    def mark_stores_dirty(self, unit_ids, *keys):
+        """Marks the cached `keys` of the stores of `unit_ids` as dirty."""
+        store_ids = set()
+        for batch in chunked(list(unit_ids), self.CHUNK_SIZE):
+            store_ids.update(
+                Unit.simple_objects.filter(id__in=batch)
+                                   .values_list('store_id', flat=True)
+            )
+
+        with stats_batch():
+            for batch in chunked(list(store_ids), self.CHUNK_SIZE):
+                for store in Store.objects.filter(id__in=batch):
+                    store.mark_dirty(*keys)
+                    store.update_dirty_cache()
 
     @write_stdout(" * Removing units created by: %(user)s... ")
     def remove_units_created(self):
         """Remove units created by user that have not had further
         activity.
         """
+        unit_ids = list(
+            self.user.get_units_created().values_list('id', flat=True))
 
         # Delete units created by user without submissions by others.
-        for unit in self.user.get_units_created().iterator():
-
-            # Find submissions by other users on this unit.
-            other_subs = unit.submission_set.exclude(submitter=self.user)
-
-            if not other_subs.exists():
-                unit.delete()
+        for batch in chunked(unit_ids, self.CHUNK_SIZE):
+            other_subs = set(
+                Submission.objects.filter(unit_id__in=batch)
+                                  .exclude(submitter=self.user)
+                                  .values_list('unit_id', flat=True)
+            )
+            units = list(
+                Unit.simple_objects.filter(id__in=batch)
+                                   .exclude(id__in=other_subs)
+                                   .select_related(
+                                       'store__translation_project__language')
+            )
+            if not units:
+                continue
+
+            for unit in units:
+                action_log(user='system', action=UNIT_DELETED,
+                           lang=unit.store.translation_project.language.code,
+                           unit=unit.id, translation='',
+                           path=unit.store.pootle_path)
+
+            deleted_ids = [unit.id for unit in units]
+            self.mark_stores_dirty(deleted_ids,
+                                   CachedMethods.WORDCOUNT_STATS,
+                                   CachedMethods.SUGGESTIONS,
+                                   CachedMethods.CHECKS,
+                                   CachedMethods.LAST_ACTION,
+                                   CachedMethods.LAST_UPDATED)
+            Unit.simple_objects.filter(id__in=deleted_ids).delete()
+            for unit in units:
                 logger.debug("Unit deleted: %s", repr(unit))
 
     @write_stdout(" * Reverting unit comments by: %(user)s... ")
@@ -200,20 +423,21 @@ class UserPurger(object):
         """Revert comments made by user on units to previous comment or else
         just remove the comment.
         """
+        unit_ids = list(self.user.commented.values_list('id', flat=True))
 
-        # Revert unit comments where self.user is latest commenter.
-        for unit in self.user.commented.iterator():
-
-            # Find comments by other self.users
-            comments = unit.get_comments().exclude(submitter=self.user)
+        # Find comments by other users
+        last_comments = self.get_last_submissions(
+            Submission.objects.get_unit_comments(), unit_ids)
 
-            if comments.exists():
+        # Revert unit comments where self.user is latest commenter.
+        for unit in UnitReverter().revert(unit_ids):
+            last_comment = last_comments.get(unit.id)
+            if last_comment is not None:
                 # If there are previous comments by others update the
                 # translator_comment, commented_by, and commented_on
-                last_comment = comments.latest('pk')
-                unit.translator_comment = last_comment.new_value
-                unit.commented_by_id = last_comment.submitter_id
-                unit.commented_on = last_comment.creation_time
+                unit.translator_comment = last_comment['new_value']
+                unit.commented_by_id = last_comment['submitter_id']
+                unit.commented_on = last_comment['creation_time']
                 logger.debug("Unit comment reverted: %s", repr(unit))
             else:
                 unit.translator_comment = ""
@@ -223,24 +447,25 @@ class UserPurger(object):
 
             # Increment revision
             unit._comment_updated = True
-            unit.save()
 
     @write_stdout(" * Reverting units edited by: %(user)s... ")
     def revert_units_edited(self):
         """Revert unit edits made by a user to previous edit.
         """
-        # Revert unit target where user is the last submitter.
-        for unit in self.user.submitted.iterator():
+        unit_ids = list(self.user.submitted.values_list('id', flat=True))
 
-            # Find the last submission by different user that updated the
-            # unit.target.
-            edits = unit.get_edits().exclude(submitter=self.user)
+        # Find the last submission by different user that updated the
+        # unit.target.
+        last_edits = self.get_last_submissions(
+            Submission.objects.get_unit_edits(), unit_ids)
 
-            if edits.exists():
-                last_edit = edits.latest("pk")
-                unit.target_f = last_edit.new_value
-                unit.submitted_by_id = last_edit.submitter_id
-                unit.submitted_on = last_edit.creation_time
+        # Revert unit target where user is the last submitter.
+        for unit in UnitReverter().revert(unit_ids):
+            last_edit = last_edits.get(unit.id)
+            if last_edit is not None:
+                unit.target_f = last_edit['new_value']
+                unit.submitted_by_id = last_edit['submitter_id']
+                unit.submitted_on = last_edit['creation_time']
                 logger.debug("Unit edit reverted: %s", repr(unit))
             else:
                 # if there is no previous submissions set the target to "" and
@@ -252,41 +477,49 @@ class UserPurger(object):
 
             # Increment revision
             unit._target_updated = True
-            unit.save()
 
     @write_stdout(" * Reverting units reviewed by: %(user)s... ")
     def revert_units_reviewed(self):
         """Revert reviews made by user on suggestions to previous state.
         """
+        reviews = self.user.get_suggestion_reviews()
+        suggestion_ids = list(
+            reviews.exclude(suggestion__isnull=True)
+                   .values_list('suggestion_id', flat=True).distinct())
 
         # Revert reviews by this user.
-        for review in self.user.get_suggestion_reviews().iterator():
-            suggestion = review.suggestion
-            if suggestion.user_id == self.user.id:
-                # If the suggestion was also created by this user then remove
-                # both review and suggestion.
-                suggestion.delete()
-                logger.debug("Suggestion removed: %s", (suggestion))
-            elif suggestion.reviewer_id == self.user.id:
-                # If the suggestion is showing as reviewed by the user, then
-                # set the suggestion back to pending and update
-                # reviewer/review_time.
-                suggestion.state = SuggestionStates.PENDING
-                suggestion.reviewer = None
-                suggestion.review_time = None
-                suggestion.save()
-                logger.debug("Suggestion reverted: %s", (suggestion))
-
-            # Remove the review.
-            review.delete()
-
-        for unit in self.user.reviewed.iterator():
-            reviews = unit.get_suggestion_reviews().exclude(
-                submitter=self.user)
-            if reviews.exists():
-                previous_review = reviews.latest('pk')
-                unit.reviewed_by_id = previous_review.submitter_id
-                unit.reviewed_on = previous_review.creation_time
+        unit_ids = set()
+        for batch in chunked(suggestion_ids, self.CHUNK_SIZE):
+            suggestions = Suggestion.objects.filter(id__in=batch)
+            unit_ids.update(suggestions.values_list('unit_id', flat=True))
+
+            # If the suggestion was also created by this user then remove
+            # both review and suggestion.
+            suggestions.filter(user=self.user).delete()
+
+            # If the suggestion is showing as reviewed by the user, then
+            # set the suggestion back to pending and update
+            # reviewer/review_time.
+            suggestions.filter(reviewer=self.user).update(
+                state=SuggestionStates.PENDING,
+                reviewer=None,
+                review_time=None,
+            )
+
+        # Remove the reviews.
+        reviews.delete()
+
+        Unit.update_filter_counts(unit_ids)
+        self.mark_stores_dirty(unit_ids, CachedMethods.SUGGESTIONS)
+
+        unit_ids = list(self.user.reviewed.values_list('id', flat=True))
+        last_reviews = self.get_last_submissions(
+            Submission.objects.get_unit_suggestion_reviews(), unit_ids)
+        for unit in UnitReverter().revert(unit_ids):
+            previous_review = last_reviews.get(unit.id)
+            if previous_review is not None:
+                unit.reviewed_by_id = previous_review['submitter_id']
+                unit.reviewed_on = previous_review['creation_time']
                 logger.debug("Unit reviewed_by reverted: %s", repr(unit))
             else:
                 unit.reviewed_by = None
@@ -295,7 +528,6 @@ class UserPurger(object):
                 # Increment revision
                 unit._target_updated = True
                 logger.debug("Unit reviewed_by removed: %s", repr(unit))
-            unit.save()
 
     @write_stdout(" * Reverting unit state changes by: %(user)s... ")
     def revert_units_state_changed(self):
@@ -305,21 +537,33 @@ class UserPurger(object):
         # Delete orphaned submissions.
         self.user.submission_set.filter(unit__isnull=True).delete()
 
-        for submission in self.user.get_unit_states_changed().iterator():
-            unit = submission.unit
-
-            # We have to get latest by pk as on mysql precision is not to
-            # microseconds - so creation_time can be ambiguous
-            if submission != unit.get_state_changes().latest('pk'):
-                # If the unit has been changed more recently we don't need to
-                # revert the unit state.
-                submission.delete()
-                return
-            submission.delete()
-            other_submissions = (unit.get_state_changes()
-                                     .exclude(submitter=self.user))
-            if other_submissions.exists():
-                new_state = other_submissions.latest('pk').new_value
+        submissions = self.user.get_unit_states_changed()
+        unit_ids = list(
+            submissions.values_list('unit_id', flat=True).distinct())
+
+        # We have to get latest by pk as on mysql precision is not to
+        # microseconds - so creation_time can be ambiguous
+        last_submitters = {}
+        for batch in chunked(unit_ids, self.CHUNK_SIZE):
+            last_submitters.update(
+                Submission.objects.get_unit_state_changes()
+                .filter(unit_id__in=batch)
+                .order_by('pk')
+                .values_list('unit_id', 'submitter_id')
+            )
+        last_states = self.get_last_submissions(
+            Submission.objects.get_unit_state_changes(), unit_ids)
+        submissions.delete()
+
+        # If the unit has been changed more recently we don't need to
+        # revert the unit state.
+        unit_ids = [unit_id for unit_id, submitter_id
+                    in last_submitters.iteritems()
+                    if submitter_id == self.user.id]
+        for unit in UnitReverter().revert(unit_ids):
+            last_state = last_states.get(unit.id)
+            if last_state is not None:
+                new_state = int(last_state['new_value'])
             else:
                 new_state = UNTRANSLATED
             if new_state != unit.state:
@@ -331,7 +575,6 @@ class UserPurger(object):
 
                 # Increment revision
                 unit._state_updated = True
-                unit.save()
                 logger.debug("Unit state reverted: %s", repr(unit))
 
 
@@ -9,14 +9,60 @@
 
 import datetime
 import logging
+import time
+from multiprocessing import Pool
 
+from django.conf import settings
 from django.core.management.base import BaseCommand
+from django.db import connections
 
+from django_redis import get_redis_connection
+
+from pootle.core.models import Revision
 from pootle.runner import set_sync_mode
 from pootle_project.models import Project
+from pootle_store import parse_cache
 from pootle_translationproject.models import TranslationProject
 
 
+#: Command run by the current worker process, and the options it was
+#: called with
+_worker_command = None
+_worker_options = None
+
+
+def close_connections():
+    """Closes the DB and Redis connections of the current process, so
+    they are not shared with the processes forked from it.
+    """
+    connections.close_all()
+    for alias, cache_settings in settings.CACHES.iteritems():
+        if 'RedisCache' not in cache_settings['BACKEND']:
+            continue
+
+        pool = getattr(get_redis_connection(alias), 'connection_pool', None)
+        if pool is not None:
+            pool.disconnect()
+
+
+def init_worker(command, options):
+    global _worker_command, _worker_options
+    _worker_command = command
+    _worker_options = options
+
+
+def process_translation_project(tp_pk):
+    """Runs the worker's command over a single translation project, to be
+    run in a worker process.
+    """
+    start = time.time()
+    Revision.reset_stats()
+    tp = TranslationProject.objects.get(pk=tp_pk)
+    succeeded = _worker_command.do_translation_project(tp, **_worker_options)
+    stats = Revision.get_stats()
+    return tp.pootle_path, succeeded, time.time() - start, stats.calls
+
+
 class SkipChecksMixin(object):
     def check(self, app_configs=None, tags=None, display_num_errors=False,
               include_deployment_checks=False):
@@ -63,13 +109,26 @@ class PootleCommand(BaseCommand):
             help=(u"Run all jobs in a single process, without "
                   "using rq workers"),
         )
+        parser.add_argument(
+            '--jobs',
+            type=int,
+            default=1,
+            help=u"Number of processes to run the command in parallel, "
+                 u"one translation project at a time",
+        )
 
     def __init__(self, *args, **kwargs):
         self.languages = []
         self.projects = []
+        self.processed = []
+        self.failed = []
         super(PootleCommand, self).__init__(*args, **kwargs)
 
     def do_translation_project(self, tp, **options):
+        """Runs the command over `tp`.
+
+        :return: `False` if the command failed, `True` otherwise.
+        """
         process_stores = True
 
         if hasattr(self, "handle_translation_project"):
@@ -78,10 +137,10 @@ class PootleCommand(BaseCommand):
                 process_stores = self.handle_translation_project(tp, **options)
             except Exception:
                 logging.exception(u"Failed to run %s over %s", self.name, tp)
-                return
+                return False
 
             if not process_stores:
-                return
+                return True
 
         if hasattr(self, "handle_all_stores"):
             logging.info(u"Running %s over %s's files", self.name, tp)
@@ -90,7 +149,9 @@ class PootleCommand(BaseCommand):
             except Exception:
                 logging.exception(u"Failed to run %s over %s's files",
                                   self.name, tp)
-                return
+                return False
+
+        return True
 
     def handle(self, **options):
         # adjust debug level to the verbosity option
@@ -118,17 +179,35 @@ class PootleCommand(BaseCommand):
         # info start
         start = datetime.datetime.now()
         logging.info('Start running of %s', self.name)
+        Revision.reset_stats()
+        parse_cache.stats.reset()
 
         self.handle_all(**options)
 
         # info finish
         end = datetime.datetime.now()
         logging.info('All done for %s in %s', self.name, end - start)
+        if self.processed:
+            elapsed = (end - start).total_seconds()
+            logging.info('Processed %d translation projects '
+                         '(%.2f per second)', len(self.processed),
+                         len(self.processed) / max(elapsed, 0.001))
+        if self.failed:
+            logging.error('Failed to run %s over %d translation projects: '
+                          '%s', self.name, len(self.failed),
+                          ', '.join(self.failed))
+        stats = Revision.get_stats()
+        if stats.calls:
+            logging.info('Allocated %d revisions', stats.calls)
+        if parse_cache.stats.hits or parse_cache.stats.misses:
+            logging.info('Loaded %d parsed files from the parse cache, '
+                         'parsed %d files', parse_cache.stats.hits,
+                         parse_cache.stats.misses)
 
-    def handle_all(self, **options):
-        if options["no_rq"]:
-            set_sync_mode(options['noinput'])
-
+    def get_translation_projects(self):
+        """Yields the translation projects the command should process,
+        restricted to the given projects and languages.
+        """
         if self.process_disabled_projects:
             project_query = Project.objects.all()
         else:
@@ -145,4 +224,68 @@ class PootleCommand(BaseCommand):
                 tp_query = tp_query.filter(language__code__in=self.languages)
 
             for tp in tp_query.iterator():
-                self.do_translation_project(tp, **options)
+                yield tp
+
+    def handle_all(self, **options):
+        if options["no_rq"]:
+            set_sync_mode(options['noinput'])
+
+        if options['jobs'] > 1:
+            self.handle_all_parallel(**options)
+            return
+
+        for tp in self.get_translation_projects():
+            if self.do_translation_project(tp, **options):
+                self.processed.append(tp.pootle_path)
+            else:
+                self.failed.append(tp.pootle_path)
+
+    def imap_parallel(self, func, iterable, **options):
+        """Yields the results of calling `func` over the items of
+        `iterable` in `options['jobs']` worker processes, in the order
+        they complete.
+
+        Workers are forked, and can access the command and its options
+        through `_worker_command` and `_worker_options`.
+        """
+        # Workers must not share the DB and Redis connections
+        close_connections()
+        pool = Pool(options['jobs'], initializer=init_worker,
+                    initargs=(self, options))
+        try:
+            for result in pool.imap_unordered(func, iterable):
+                yield result
+            pool.close()
+        except BaseException:
+            pool.terminate()
+            raise
+        finally:
+            pool.join()
+
+    def handle_all_parallel(self, **options):
+        tp_pks = [tp.pk for tp in self.get_translation_projects()]
+        self.stdout.write(u"Running %s for %d translation projects in %d "
+                          u"processes" % (self.name, len(tp_pks),
+                                          options['jobs']))
+
+        start = time.time()
+        stats = Revision.get_stats()
+        results = self.imap_parallel(process_translation_project, tp_pks,
+                                     **options)
+        for i, result in enumerate(results, 1):
+            pootle_path, succeeded, elapsed, calls = result
+            stats.calls += calls
+            if succeeded:
+                self.processed.append(pootle_path)
+            else:
+                self.failed.append(pootle_path)
+            self.stdout.write(u"[%d/%d] %s %s (%.2f seconds)" % (
+                i, len(tp_pks), u"Processed" if succeeded else u"FAILED",
+                pootle_path, elapsed))
+
+        elapsed = time.time() - start
+        self.stdout.write(
+            u"Processed %d translation projects in %.2f seconds "
+            u"(%.2f per second), %d failed" % (
+                len(tp_pks), elapsed, len(tp_pks) / max(elapsed, 0.001),
+                len(self.failed)))
@@ -6,16 +6,50 @@
 # or later license. See the LICENSE file for a copy of the license and the
 # AUTHORS file for copyright and authorship information.
 
+import logging
 import os
+import time
 
 # This must be run before importing Django.
 os.environ['DJANGO_SETTINGS_MODULE'] = 'pootle.settings'
 
+from django.db import connections
+
 from pootle.core.checks.checker import QualityCheckUpdater
+from pootle.runner import set_sync_mode
+from pootle_misc.checks import check_timer
+from pootle_store.models import QualityCheck
+from pootle_translationproject.models import TranslationProject
 
 from . import PootleCommand
 
 
+def update_tp_checks(args):
+    """Update the checks of a single translation project, to be run in a
+    worker process.
+
+    :return: a tuple of `(pootle_path, succeeded, updated, elapsed,
+        timings)`.
+    """
+    tp_pk, check_names, timing = args
+    start = time.time()
+    check_timer.enabled = timing
+    check_timer.reset()
+    tp = TranslationProject.objects.get(pk=tp_pk)
+    try:
+        updated = QualityCheckUpdater(check_names, tp).update(
+            clear_unknown=False)
+    except Exception:
+        logging.exception(u"Failed to update checks in %s", tp)
+        succeeded, updated = False, 0
+    else:
+        succeeded = True
+    finally:
+        connections.close_all()
+    return (tp.pootle_path, succeeded, updated, time.time() - start,
+            check_timer.timings)
+
+
 class Command(PootleCommand):
     help = "Allow checks to be recalculated manually."
     process_disabled_projects = True
@@ -29,6 +63,12 @@ class Command(PootleCommand):
             default=None,
             help='Check to recalculate',
         )
+        parser.add_argument(
+            '--timing',
+            action='store_true',
+            default=False,
+            help=u"Report the time spent running each check",
+        )
 
     def handle_all_stores(self, translation_project, **options):
         self.stdout.write(u"Running %s for %s" %
@@ -38,8 +78,53 @@ class Command(PootleCommand):
             translation_project).update()
 
     def handle_all(self, **options):
-        if not self.projects and not self.languages:
+        check_timer.enabled = options['timing']
+        check_timer.reset()
+
+        if options['jobs'] > 1:
+            self.handle_all_parallel(**options)
+        elif not self.projects and not self.languages:
             self.stdout.write(u"Running %s (noargs)" % self.name)
             QualityCheckUpdater(options['check_names']).update()
         else:
             super(Command, self).handle_all(**options)
+
+        if options['timing']:
+            self.write_timings()
+
+    def write_timings(self):
+        self.stdout.write(u"Time spent per check:")
+        for name, calls, elapsed in check_timer.get_report():
+            self.stdout.write(u"%-40s %10d calls %10.3f seconds" %
+                              (name, calls, elapsed))
+
+    def handle_all_parallel(self, **options):
+        if options["no_rq"]:
+            set_sync_mode(options['noinput'])
+
+        tp_pks = [tp.pk for tp in self.get_translation_projects()]
+        self.stdout.write(u"Running %s for %d translation projects in %d "
+                          u"processes" % (self.name, len(tp_pks),
+                                          options['jobs']))
+        QualityCheck.delete_unknown_checks()
+
+        results = self.imap_parallel(
+            update_tp_checks,
+            [(tp_pk, options['check_names'], options['timing'])
+             for tp_pk in tp_pks],
+            **options
+        )
+        for i, result in enumerate(results, 1):
+            pootle_path, succeeded, updated, elapsed, timings = result
+            check_timer.merge(timings)
+            if not succeeded:
+                self.failed.append(pootle_path)
+                self.stdout.write(u"[%d/%d] FAILED %s (%.2f seconds)" % (
+                    i, len(tp_pks), pootle_path, elapsed))
+                continue
+
+            self.processed.append(pootle_path)
+            self.stdout.write(
+                u"[%d/%d] Updated checks for %d units in %s "
+                u"(%.2f seconds)" % (i, len(tp_pks), updated,
+                                     pootle_path, elapsed))
@@ -14,7 +14,7 @@ os.environ['DJANGO_SETTINGS_MODULE'] = 'pootle.settings'
 from django.contrib.auth import get_user_model
 from django.core.management.base import BaseCommand
 
-from pootle_statistics.models import ScoreLog
+from pootle_statistics.models import ScoreLog, UserDailyStats
 
 
 class Command(BaseCommand):
@@ -51,6 +51,12 @@ class Command(BaseCommand):
 
             scorelogs.delete()
 
+            if options['users']:
+                UserDailyStats.refresh(
+                    user_ids=list(users.values_list('pk', flat=True)))
+            else:
+                UserDailyStats.refresh()
+
             if options['users']:
                 self.stdout.write('Scores for specified users were reset to 0.')
             else:
@@ -77,5 +83,6 @@ class Command(BaseCommand):
             self.stdout.write("Score for user %s set to %.3f" %
                               (username, user_score))
             User.objects.filter(id=user_pk).update(score=user_score)
+            UserDailyStats.refresh(user_ids=[user_pk])
         end = datetime.datetime.now()
         self.stdout.write('All done in %s.' % (end - start))
@@ -12,6 +12,7 @@ import os
 # This must be run before importing Django.
 os.environ['DJANGO_SETTINGS_MODULE'] = 'pootle.settings'
 
+from pootle.core.mixins import stats_batch
 from pootle_store.models import Store
 
 from . import PootleCommand
@@ -27,7 +28,10 @@ class Command(PootleCommand):
     def handle_all_stores(self, translation_project, **options_):
         stores = Store.objects.live().filter(
             translation_project=translation_project
-        )
-        for store in stores.iterator():
-            logger.info('Add job to update stats for %s', store.pootle_path)
-            store.update_all_cache()
+        ).select_related('parent', 'translation_project')
+        # All stores of the TP are recalculated by a single batch job
+        with stats_batch():
+            for store in stores.iterator():
+                logger.info('Add %s to the stats update batch',
+                            store.pootle_path)
+                store.update_all_cache()
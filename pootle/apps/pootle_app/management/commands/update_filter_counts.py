@@ -0,0 +1,33 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) Zing contributors.
+#
+# This file is a part of the Zing project. It is distributed under the GPL3
+# or later license. See the LICENSE file for a copy of the license and the
+# AUTHORS file for copyright and authorship information.
+
+import logging
+import os
+
+# This must be run before importing Django.
+os.environ['DJANGO_SETTINGS_MODULE'] = 'pootle.settings'
+
+from pootle_store.models import Unit
+
+from . import PootleCommand
+
+
+logger = logging.getLogger(__name__)
+
+
+class Command(PootleCommand):
+    help = "Recalculate the suggestion and check counts of units."
+    process_disabled_projects = True
+
+    def handle_all_stores(self, translation_project, **options_):
+        unit_ids = Unit.simple_objects.filter(
+            store__translation_project=translation_project,
+        ).values_list('id', flat=True)
+        counts = Unit.update_filter_counts(list(unit_ids))
+        logger.info(u"Updated counts for %d units in %s",
+                    len(counts), translation_project)
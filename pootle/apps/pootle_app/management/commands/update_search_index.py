@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) Zing contributors.
+#
+# This file is a part of the Zing project. It is distributed under the GPL3
+# or later license. See the LICENSE file for a copy of the license and the
+# AUTHORS file for copyright and authorship information.
+
+import logging
+import os
+
+# This must be run before importing Django.
+os.environ['DJANGO_SETTINGS_MODULE'] = 'pootle.settings'
+
+from pootle.core.utils.list import chunked
+from pootle_store.models import Unit
+from pootle_store.unit.filters import get_text_search_class
+
+from . import PootleCommand
+
+
+logger = logging.getLogger(__name__)
+
+
+class Command(PootleCommand):
+    help = "Index the text of units for the editor search."
+    process_disabled_projects = True
+
+    #: Number of units to be indexed at once
+    CHUNK_SIZE = 500
+
+    def handle_all(self, **options):
+        get_text_search_class().create_indexes()
+        super(Command, self).handle_all(**options)
+
+    def handle_all_stores(self, translation_project, **options_):
+        text_search_class = get_text_search_class()
+        unit_ids = Unit.objects.filter(
+            store__translation_project=translation_project,
+        ).order_by('id').values_list('id', flat=True)
+
+        indexed = 0
+        for batch in chunked(list(unit_ids), self.CHUNK_SIZE):
+            text_search_class.index_units(Unit.objects.filter(id__in=batch))
+            indexed += len(batch)
+
+        logger.info(u"Indexed %d units in %s", indexed, translation_project)
@@ -8,6 +8,7 @@
 
 import os
 import sys
+from collections import defaultdict
 from hashlib import md5
 
 # This must be run before importing Django.
@@ -19,6 +20,8 @@ from translate.storage import factory
 from django.conf import settings
 from django.core.management.base import BaseCommand, CommandError
 
+from pootle.core.search.index import bump_index_revision
+from pootle.core.search.queue import tm_update_queue
 from pootle.core.utils import dateformat
 from pootle_store.models import Unit
 
@@ -255,7 +258,9 @@ class Command(BaseCommand):
                 self.stdout.write("%s (%s%%)" % (i, percent), ending='\r')
                 self.stdout.flush()
 
-            yield self.parser.get_unit_data(unit)
+            unit_data = self.parser.get_unit_data(unit)
+            self.languages.add(unit_data['_type'])
+            yield unit_data
 
         if i != total:
             self.stdout.write("Expected %d, loaded %d." % (total, i))
@@ -274,6 +279,8 @@ class Command(BaseCommand):
 
         self.INDEX_NAME = self.tm_settings['INDEX_NAME']
         self.is_local_tm = options['tm'] == 'local'
+        #: Languages of the indexed translations
+        self.languages = set()
 
         self.es = Elasticsearch([
             {
@@ -346,4 +353,33 @@ class Command(BaseCommand):
         if self.is_local_tm:
             self._set_latest_indexed_revision(**options)
 
-        helpers.bulk(self.es, self._parse_translations(**options))
+        if self.is_local_tm:
+            self._queue_translations(**options)
+        else:
+            helpers.bulk(self.es, self._parse_translations(**options))
+            # Cached TM results for these languages are now outdated
+            bump_index_revision(*self.languages)
+
+    def _queue_translations(self, **options):
+        """Indexes translations from the DB through the same queue used
+        for updates made to units, flushing it every `BULK_CHUNK_SIZE`
+        translations.
+        """
+        objs_by_language = defaultdict(list)
+        for i, unit_data in enumerate(self._parse_translations(**options),
+                                      start=1):
+            del unit_data['_index']
+            language = unit_data.pop('_type')
+            unit_data['id'] = unit_data.pop('_id')
+            objs_by_language[language].append(unit_data)
+
+            if i % BULK_CHUNK_SIZE == 0:
+                self._flush_queue(objs_by_language)
+
+        self._flush_queue(objs_by_language)
+
+    def _flush_queue(self, objs_by_language):
+        for language, objs in objs_by_language.iteritems():
+            tm_update_queue.add(language, objs)
+        objs_by_language.clear()
+        tm_update_queue.flush()
@@ -0,0 +1,274 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) Zing contributors.
+#
+# This file is a part of the Zing project. It is distributed under the GPL3
+# or later license. See the LICENSE file for a copy of the license and the
+# AUTHORS file for copyright and authorship information.
+
+import logging
+import os
+import time
+
+# This must be run before importing Django.
+os.environ['DJANGO_SETTINGS_MODULE'] = 'pootle.settings'
+
+from django.core.management.base import CommandError
+from django.db import close_old_connections
+
+from pootle.core.mixins import stats_batch
+from pootle.core.utils import inotify
+from pootle.runner import set_sync_mode
+from pootle_app.project_tree import (FILE_EXTENSIONS, is_hidden_file,
+                                     to_podir_path)
+from pootle_store.util import get_mtime_datetime
+
+from . import PootleCommand
+
+
+logger = logging.getLogger(__name__)
+
+
+class Command(PootleCommand):
+    help = "Watch translation files and update stores as they change."
+    process_disabled_projects = True
+
+    #: Events directories of translation projects are watched for
+    WATCH_MASK = (
+        inotify.IN_CLOSE_WRITE | inotify.IN_CREATE | inotify.IN_DELETE |
+        inotify.IN_MOVED_FROM | inotify.IN_MOVED_TO |
+        inotify.IN_DELETE_SELF | inotify.IN_ONLYDIR
+    )
+
+    #: Longest time (in seconds) changes are held back while events keep
+    #: coming in
+    MAX_DELAY = 60
+
+    def add_arguments(self, parser):
+        super(Command, self).add_arguments(parser)
+        parser.add_argument(
+            '--overwrite',
+            action='store_true',
+            dest='overwrite',
+            default=False,
+            help="Don't just update untranslated units "
+                 "and add new units, but overwrite database "
+                 "translations to reflect state in files.",
+        )
+        parser.add_argument(
+            '--debounce',
+            type=float,
+            default=2,
+            help=u"Seconds to wait for files to stop changing before "
+                 u"updating their stores",
+        )
+        parser.add_argument(
+            '--skip-initial-scan',
+            action='store_true',
+            default=False,
+            help=u"Don't update the stores changed while the command "
+                 u"wasn't running when starting",
+        )
+
+    def __init__(self, *args, **kwargs):
+        super(Command, self).__init__(*args, **kwargs)
+        self.inotify = None
+        self.translation_projects = {}
+        #: Watched directories as `{wd: (tp, relative_dir)}`
+        self.watches = {}
+        #: Translation projects to be rescanned in full, by ID
+        self.rescans = set()
+        #: Translation projects whose files were added or removed, by ID
+        self.scans = set()
+        #: Changed translation files, as `{tp_id: set(relative_paths)}`
+        self.changed = {}
+
+    def add_watches(self, tp, relative_dir):
+        """Watches `relative_dir` of `tp` and its subdirectories."""
+        podir_path = to_podir_path(relative_dir)
+        try:
+            wd = self.inotify.add_watch(podir_path, self.WATCH_MASK)
+        except OSError as e:
+            # The directory was removed in the meantime
+            logger.debug(u"Can't watch %s: %s", podir_path, e)
+            return
+
+        self.watches[wd] = (tp, relative_dir)
+        for child_path in os.listdir(podir_path):
+            if (not is_hidden_file(child_path) and
+                os.path.isdir(os.path.join(podir_path, child_path))):
+                self.add_watches(tp, os.path.join(relative_dir, child_path))
+
+    def watch_translation_projects(self):
+        for tp in self.get_translation_projects():
+            self.translation_projects[tp.id] = tp
+            if tp.directory_exists_on_disk():
+                self.add_watches(tp, tp.real_path)
+        logger.info(u"Watching %d directories of %d translation projects",
+                    len(self.watches), len(self.translation_projects))
+
+    @property
+    def has_pending(self):
+        return bool(self.rescans or self.scans or self.changed)
+
+    def handle_event(self, event):
+        if event.mask & inotify.IN_Q_OVERFLOW:
+            # Events were lost: fall back to checking every file
+            logger.warning(u"Event queue overflowed, rescanning all "
+                           u"translation projects")
+            self.rescans.update(self.translation_projects)
+            for tp in self.translation_projects.itervalues():
+                if tp.directory_exists_on_disk():
+                    self.add_watches(tp, tp.real_path)
+            return
+
+        if event.wd not in self.watches:
+            return
+
+        tp, relative_dir = self.watches[event.wd]
+        if event.mask & inotify.IN_IGNORED:
+            # The watched directory is gone
+            del self.watches[event.wd]
+            return
+
+        if event.mask & inotify.IN_DELETE_SELF:
+            self.rescans.add(tp.id)
+            return
+
+        try:
+            name = event.name.decode('utf-8')
+        except UnicodeDecodeError:
+            # Such files can't be translation files of stores either
+            logger.warning(u"Ignoring %r in %s: not a UTF-8 name",
+                           event.name, relative_dir)
+            return
+
+        if is_hidden_file(name):
+            return
+
+        relative_path = os.path.join(relative_dir, name)
+        if event.mask & inotify.IN_ISDIR:
+            if event.mask & (inotify.IN_CREATE | inotify.IN_MOVED_TO):
+                self.add_watches(tp, relative_path)
+            # Directories are updated along with their files
+            self.rescans.add(tp.id)
+            return
+
+        if os.path.splitext(name)[1][1:] not in FILE_EXTENSIONS:
+            return
+
+        if event.mask & (inotify.IN_CREATE | inotify.IN_DELETE |
+                         inotify.IN_MOVED_FROM | inotify.IN_MOVED_TO):
+            self.scans.add(tp.id)
+        self.changed.setdefault(tp.id, set()).add(relative_path)
+
+    def update_stores(self, tp, relative_paths, **options):
+        """Updates the stores of the `relative_paths` files of `tp`."""
+        disk_files = {}
+        for relative_path in relative_paths:
+            try:
+                file_stat = os.stat(to_podir_path(relative_path))
+            except OSError:
+                # Removed files only require their stores to be obsoleted
+                continue
+            disk_files[relative_path] = (
+                get_mtime_datetime(file_stat.st_mtime),
+                file_stat.st_size,
+            )
+
+        pootle_paths = [
+            tp.pootle_path + os.path.relpath(relative_path, tp.real_path)
+            for relative_path in disk_files
+        ]
+        stores = tp.stores.live().select_related('parent').filter(
+            pootle_path__in=pootle_paths)
+        tp.update_stores_from_disk(stores, disk_files,
+                                   overwrite=options['overwrite'])
+
+    def update_translation_project(self, tp, **options):
+        if tp.id in self.rescans:
+            logger.info(u"Rescanning %s", tp)
+            if tp.directory_exists_on_disk():
+                tp.update_from_disk(overwrite=options['overwrite'])
+            elif tp.project.directory_exists_on_disk():
+                tp.directory.makeobsolete()
+            return
+
+        with stats_batch():
+            if tp.id in self.scans:
+                # Create new, make obsolete removed stores
+                tp.scan_files()
+
+            relative_paths = self.changed.get(tp.id, set())
+            logger.info(u"Updating %d files in %s", len(relative_paths), tp)
+            self.update_stores(tp, relative_paths, **options)
+
+    def process_pending(self, **options):
+        tp_ids = self.rescans | self.scans | set(self.changed)
+        for tp_id in sorted(tp_ids):
+            tp = self.translation_projects[tp_id]
+            try:
+                self.update_translation_project(tp, **options)
+            except Exception:
+                logger.exception(u"Failed to update %s", tp)
+                self.failed.append(tp.pootle_path)
+            else:
+                self.processed.append(tp.pootle_path)
+
+        self.rescans.clear()
+        self.scans.clear()
+        self.changed.clear()
+
+    def watch(self, **options):
+        """Updates the stores whose files change, once files have stopped
+        changing for `options['debounce']` seconds.
+        """
+        debounce = options['debounce']
+        first_event = last_event = None
+        while True:
+            timeout = None
+            if self.has_pending:
+                timeout = max(0, min(last_event + debounce,
+                                     first_event + self.MAX_DELAY) -
+                              time.time())
+
+            events = self.inotify.read_events(timeout)
+            for event in events:
+                self.handle_event(event)
+
+            if not self.has_pending:
+                continue
+
+            now = time.time()
+            if events:
+                last_event = now
+                first_event = first_event or now
+
+            if (now - last_event >= debounce or
+                now - first_event >= self.MAX_DELAY):
+                # The DB connection may have been dropped while waiting
+                # for events
+                close_old_connections()
+                self.process_pending(**options)
+                first_event = last_event = None
+
+    def handle_all(self, **options):
+        if options['no_rq']:
+            set_sync_mode(options['noinput'])
+
+        try:
+            self.inotify = inotify.Inotify()
+        except OSError as e:
+            raise CommandError(u"Can't watch files: %s" % e)
+
+        try:
+            self.watch_translation_projects()
+            if not options['skip_initial_scan']:
+                self.rescans.update(self.translation_projects)
+                self.process_pending(**options)
+
+            self.watch(**options)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.inotify.close()
@@ -12,6 +12,8 @@ from django.contrib.auth.models import Permission
 from django.contrib.contenttypes.models import ContentType
 from django.core.cache import cache
 from django.db import models
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
 from django.utils.encoding import iri_to_uri
 
 
@@ -28,67 +30,104 @@ def get_pootle_permission(codename):
     return Permission.objects.get(content_type=content_type, codename=codename)
 
 
+#: Prefix of the cache keys holding the effective permissions of users
+PERMISSIONS_KEY_PREFIX = 'Permissions'
+
+
+def get_permissions_cache_key(username, pootle_path):
+    return iri_to_uri(u'%s:%s:%s' % (PERMISSIONS_KEY_PREFIX, username,
+                                     pootle_path))
+
+
 def get_permissions_by_username(username, directory):
+    """Returns the set of permission codenames granted to `username` in
+    `directory`, or `None` if no permission set applies to it.
+    """
     pootle_path = directory.pootle_path
     path_parts = filter(None, pootle_path.split('/'))
-    key = iri_to_uri('Permissions:%s' % username)
-    permissions_cache = cache.get(key, {})
 
-    if pootle_path not in permissions_cache:
+    try:
+        permissionset = PermissionSet.objects.filter(
+            directory__in=directory.trail(),
+            user__username=username).order_by('-directory__pootle_path')[0]
+    except IndexError:
+        permissionset = None
+
+    if (len(path_parts) > 1 and path_parts[0] != 'projects' and
+        (permissionset is None or
+         len(filter(None, permissionset.directory.pootle_path.split('/'))) < 2)):
+        # Active permission at language level or higher, check project
+        # level permission
         try:
-            permissionset = PermissionSet.objects.filter(
-                directory__in=directory.trail(),
-                user__username=username).order_by('-directory__pootle_path')[0]
-        except IndexError:
-            permissionset = None
-
-        if (len(path_parts) > 1 and path_parts[0] != 'projects' and
-            (permissionset is None or
-            len(filter(None, permissionset.directory.pootle_path.split('/'))) < 2)):
-            # Active permission at language level or higher, check project
-            # level permission
-            try:
-                project_path = '/projects/%s/' % path_parts[1]
-                permissionset = PermissionSet.objects.get(
-                    directory__pootle_path=project_path,
-                    user__username=username)
-            except PermissionSet.DoesNotExist:
-                pass
-
-        if permissionset:
-            permissions_cache[pootle_path] = permissionset.to_dict()
-        else:
-            permissions_cache[pootle_path] = None
+            project_path = '/projects/%s/' % path_parts[1]
+            permissionset = PermissionSet.objects.get(
+                directory__pootle_path=project_path,
+                user__username=username)
+        except PermissionSet.DoesNotExist:
+            pass
 
-        cache.set(key, permissions_cache, settings.POOTLE_CACHE_TIMEOUT)
+    if permissionset is None:
+        return None
 
-    return permissions_cache[pootle_path]
+    return set(permissionset.positive_permissions.values_list('codename',
+                                                              flat=True))
 
 
-def get_matching_permissions(user, directory):
-    if user.is_authenticated:
-        permissions = get_permissions_by_username(user.username,
-                                                  directory)
-        if permissions is not None:
-            return permissions
+def get_effective_permissions(username, directory):
+    """Returns the permissions `username` has in `directory`, falling back
+    to the ones of the `default` and `nobody` users.
+    """
+    usernames = [username]
+    if username != 'nobody':
+        usernames.extend(['default', 'nobody'])
+
+    for matching_username in usernames:
+        codenames = get_permissions_by_username(matching_username, directory)
+        if codenames is not None:
+            return dict.fromkeys(codenames, True)
+
+    return {}
+
 
-        permissions = get_permissions_by_username('default', directory)
+def get_matching_permissions(user, directory, request=None):
+    """Returns the permissions `user` has in `directory`, as a dictionary
+    keyed by permission codename.
+
+    The permissions are cached per user and path, and invalidated when any
+    permission set they depend on changes. If `request` is given, they are
+    also memoized for the duration of the request.
+    """
+    username = user.username if user.is_authenticated else 'nobody'
+    pootle_path = directory.pootle_path
+
+    if request is not None:
+        if not hasattr(request, '_permissions_cache'):
+            request._permissions_cache = {}
+        permissions = request._permissions_cache.get((username, pootle_path))
         if permissions is not None:
             return permissions
 
-    permissions = get_permissions_by_username('nobody', directory)
+    key = get_permissions_cache_key(username, pootle_path)
+    permissions = cache.get(key)
+    if permissions is None:
+        permissions = get_effective_permissions(username, directory)
+        cache.set(key, permissions, settings.POOTLE_CACHE_TIMEOUT)
+
+    if request is not None:
+        request._permissions_cache[(username, pootle_path)] = permissions
 
     return permissions
 
 
-def check_user_permission(user, permission_codename, directory):
+def check_user_permission(user, permission_codename, directory,
+                          request=None):
     """Checks if the current user has the permission to perform
     ``permission_codename``.
     """
     if user.is_superuser:
         return True
 
-    permissions = get_matching_permissions(user, directory)
+    permissions = get_matching_permissions(user, directory, request=request)
 
     return ("administrate" in permissions or
             permission_codename in permissions)
@@ -141,16 +180,44 @@ class PermissionSet(models.Model):
         permissions_iterator = self.positive_permissions.iterator()
         return dict((perm.codename, perm) for perm in permissions_iterator)
 
-    def save(self, *args, **kwargs):
-        super(PermissionSet, self).save(*args, **kwargs)
-        # FIXME: can we use `post_save` signals or invalidate caches in model
-        # managers, please?
-        key = iri_to_uri('Permissions:%s' % self.user.username)
-        cache.delete(key)
-
-    def delete(self, *args, **kwargs):
-        super(PermissionSet, self).delete(*args, **kwargs)
-        # FIXME: can we use `post_delete` signals or invalidate caches in model
-        # managers, please?
-        key = iri_to_uri('Permissions:%s' % self.user.username)
-        cache.delete(key)
+    def invalidate_cache(self):
+        """Invalidates the cached permissions this permission set affects.
+
+        The permissions of the `default` and `nobody` users apply to any
+        user lacking their own, so changing them invalidates the cached
+        permissions of all users.
+        """
+        username = self.user.username
+        if username in ('default', 'nobody'):
+            username = '*'
+
+        path_parts = filter(None, self.directory.pootle_path.split('/'))
+        if len(path_parts) == 2 and path_parts[0] == 'projects':
+            # Project permissions apply to the project's TPs too
+            pootle_path = '/*/%s/' % path_parts[1]
+        else:
+            pootle_path = self.directory.pootle_path
+
+        cache.delete_pattern(
+            get_permissions_cache_key(username, pootle_path + '*'))
+
+
+@receiver([post_delete, post_save], sender=PermissionSet)
+def invalidate_permissions_cache(**kwargs):
+    kwargs['instance'].invalidate_cache()
+
+
+@receiver(m2m_changed, sender=PermissionSet.positive_permissions.through)
+def invalidate_permissions_cache_on_change(**kwargs):
+    if not kwargs['action'].startswith('post_'):
+        return
+
+    if not kwargs['reverse']:
+        kwargs['instance'].invalidate_cache()
+    elif kwargs['pk_set'] is None:
+        # Permission sets are unknown when clearing them from a permission
+        cache.delete_pattern(get_permissions_cache_key('*', '*'))
+    else:
+        for permission_set in PermissionSet.objects.filter(
+                pk__in=kwargs['pk_set']).select_related('user', 'directory'):
+            permission_set.invalidate_cache()
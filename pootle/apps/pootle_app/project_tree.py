@@ -10,14 +10,20 @@
 import errno
 import logging
 import os
+import stat
 
 from django.conf import settings
 
+from pootle.core.cache import get_cache
 from pootle.core.log import STORE_RESURRECTED, store_log
 from pootle.core.utils.timezone import datetime_min
 from pootle_app.models.directory import Directory
 from pootle_store.models import Store
-from pootle_store.util import relative_real_path
+from pootle_store.util import (get_file_digest, get_mtime_datetime,
+                               relative_real_path)
+
+
+cache = get_cache('redis')
 
 
 FILE_EXTENSIONS = ['po']
@@ -82,6 +88,93 @@ def split_files_and_dirs(real_dir):
     return files, dirs
 
 
+def get_translation_files(relative_dir):
+    """Returns the translation files found in `relative_dir` and its
+    subdirectories, as `add_files()` would, with a single `stat()` call
+    per entry.
+
+    :return: a dictionary of `{file: (mtime, size)}`, where `file` is the
+        path as stored in `Store.file` and `mtime` is the datetime as
+        returned by `Store.get_file_mtime()`.
+    """
+    files = {}
+    podir_path = to_podir_path(relative_dir)
+    for child_path in os.listdir(podir_path):
+        if is_hidden_file(child_path):
+            continue
+
+        try:
+            child_stat = os.stat(os.path.join(podir_path, child_path))
+        except OSError:
+            # Broken symlink
+            continue
+
+        relative_child_path = os.path.join(relative_dir, child_path)
+        if (stat.S_ISREG(child_stat.st_mode) and
+            os.path.splitext(child_path)[1][1:] in FILE_EXTENSIONS):
+            files[relative_child_path] = (
+                get_mtime_datetime(child_stat.st_mtime),
+                child_stat.st_size,
+            )
+        elif stat.S_ISDIR(child_stat.st_mode):
+            files.update(get_translation_files(relative_child_path))
+
+    return files
+
+
+class ScanManifest(object):
+    """Sizes and digests of the files of a translation project, as they
+    were when last imported.
+
+    This allows telling files which were touched but not changed since
+    they were imported from the ones which need to be parsed again. An
+    entry is only valid as long as its store's `file_mtime` is the one
+    recorded along with it, i.e. the file wasn't synced or imported in
+    the meantime.
+    """
+
+    def __init__(self, translation_project):
+        self.key = 'pootle:scan_manifest:%d' % translation_project.id
+        self.entries = cache.get(self.key) or {}
+        self.modified = False
+
+    def is_unchanged(self, store, size):
+        """Tells whether the file of `store`, being `size` bytes long, is
+        the same as when last imported.
+        """
+        entry = self.entries.get(store.file.name)
+        if entry is None:
+            return False
+
+        file_mtime, file_size, digest = entry
+        return (file_mtime == store.file_mtime and file_size == size and
+                digest == get_file_digest(to_podir_path(store.file.name)))
+
+    def add(self, store, size, digest=None):
+        """Records the file of `store` as imported."""
+        if digest is None:
+            digest = get_file_digest(to_podir_path(store.file.name))
+        self.entries[store.file.name] = (store.file_mtime, size, digest)
+        self.modified = True
+
+    def touch(self, store):
+        """Records the new `file_mtime` of an unchanged file."""
+        file_mtime_, size, digest = self.entries[store.file.name]
+        self.entries[store.file.name] = (store.file_mtime, size, digest)
+        self.modified = True
+
+    def prune(self, files):
+        """Drops the entries of files other than `files`."""
+        for name in set(self.entries) - set(files):
+            del self.entries[name]
+            self.modified = True
+
+    def save(self):
+        if self.modified:
+            cache.set(self.key, self.entries, None)
+            self.modified = False
+
+
 def add_items(fs_items_set, db_items, create_or_resurrect_db_item, parent):
     """Add/make obsolete the database items to correspond to the filesystem.
 
@@ -203,6 +203,9 @@ class Language(models.Model, TreeItem):
     def get_children(self):
         return self.translationproject_set.live()
 
+    def get_stats_token_path(self):
+        return self.pootle_path
+
     # # # /TreeItem
 
     def get_stats_for_user(self, user):
@@ -9,6 +9,8 @@
 
 import logging
 import re
+import time
+from collections import OrderedDict
 
 from translate.filters import checks
 from translate.filters.decorators import Category, cosmetic, critical
@@ -269,11 +271,108 @@ class SkipCheck(Exception):
     pass
 
 
+class FingerprintCache(object):
+    """Bounded LRU cache of source string fingerprints, keyed by check and
+    source string.
+
+    Sources are shared by all the translations of a unit, so their
+    fingerprints are computed once per process and reused across units
+    and languages.
+    """
+
+    #: Marks sources the check is skipped for
+    SKIP = object()
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.clear()
+
+    def __len__(self):
+        return len(self.data)
+
+    def clear(self):
+        self.data = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get_fingerprint(self, key, get_fingerprint_func, string):
+        """Get the source fingerprint of `string` for the `key` check,
+        computing it with `get_fingerprint_func` on cache misses.
+
+        :raise SkipCheck: if the check doesn't apply to `string`.
+        """
+        cache_key = (key, string)
+        try:
+            fingerprint = self.data.pop(cache_key)
+            self.hits += 1
+        except KeyError:
+            self.misses += 1
+            try:
+                fingerprint = get_fingerprint_func(string, is_source=True)
+            except SkipCheck:
+                fingerprint = self.SKIP
+
+            if len(self.data) >= self.maxsize:
+                self.data.popitem(last=False)
+
+        self.data[cache_key] = fingerprint
+
+        if fingerprint is self.SKIP:
+            raise SkipCheck()
+
+        return fingerprint
+
+
+fingerprint_cache = FingerprintCache(maxsize=10000)
+
+
+class CheckTimer(object):
+    """Accumulates the time spent running each check, once enabled."""
+
+    def __init__(self):
+        self.enabled = False
+        self.reset()
+
+    def reset(self):
+        #: Maps check names to `[calls, seconds]` lists
+        self.timings = {}
+
+    def add(self, name, elapsed, calls=1):
+        timing = self.timings.setdefault(name, [0, 0])
+        timing[0] += calls
+        timing[1] += elapsed
+
+    def merge(self, timings):
+        for name, (calls, elapsed) in timings.iteritems():
+            self.add(name, elapsed, calls)
+
+    def get_report(self):
+        """Return `(name, calls, seconds)` tuples, slowest checks first."""
+        return sorted(
+            ((name, calls, elapsed)
+             for name, (calls, elapsed) in self.timings.iteritems()),
+            key=lambda timing: timing[2],
+            reverse=True
+        )
+
+
+check_timer = CheckTimer()
+
+
 class ENChecker(checks.UnitChecker):
 
     def run_test(self, test, unit):
         """Runs the given test on the given unit."""
-        return test(self.str1, self.str2, language_code=self.language_code)
+        if not check_timer.enabled:
+            return test(self.str1, self.str2,
+                        language_code=self.language_code)
+
+        start = time.time()
+        try:
+            return test(self.str1, self.str2,
+                        language_code=self.language_code)
+        finally:
+            check_timer.add(test.__name__, time.time() - start)
 
     def run_filters(self, unit, categorised=False):
         """Make some optimizations before running individual filters in
@@ -405,7 +504,8 @@ class ENChecker(checks.UnitChecker):
 
             return fingerprint
 
-        if check_translation(get_fingerprint, str1, str2):
+        if check_translation(get_fingerprint, str1, str2,
+                             u"mustache_placeholder_pairs"):
             return True
 
         raise checks.FilterFailure(u"mustache_placeholder_pairs")
@@ -451,7 +551,8 @@ class ENChecker(checks.UnitChecker):
 
             return fingerprint
 
-        if check_translation(get_fingerprint, str1, str2):
+        if check_translation(get_fingerprint, str1, str2,
+                             u"mustache_like_placeholder_pairs"):
             return True
 
         raise checks.FilterFailure(u"mustache_like_placeholder_pairs")
@@ -470,7 +571,8 @@ class ENChecker(checks.UnitChecker):
 
             return is_date_format
 
-        if check_translation(get_fingerprint, str1, str2):
+        if check_translation(get_fingerprint, str1, str2,
+                             u"date_format"):
             return True
 
         raise checks.FilterFailure(u"Incorrect date format")
@@ -501,7 +603,8 @@ class ENChecker(checks.UnitChecker):
 
             return fingerprint
 
-        if check_translation(get_fingerprint, str1, str2):
+        if check_translation(get_fingerprint, str1, str2,
+                             u"whitespace"):
             return True
 
         raise checks.FilterFailure(u"Incorrect whitespaces")
@@ -511,7 +614,8 @@ class ENChecker(checks.UnitChecker):
         def get_fingerprint(string, is_source=False, translation=''):
             return 0
 
-        if check_translation(get_fingerprint, str1, str2):
+        if check_translation(get_fingerprint, str1, str2,
+                             u"test_check"):
             return True
 
         raise checks.FilterFailure(u"Incorrect test check")
@@ -571,7 +675,8 @@ class ENChecker(checks.UnitChecker):
 
             return fingerprint
 
-        if check_translation(get_fingerprint, str1, str2):
+        if check_translation(get_fingerprint, str1, str2,
+                             u"changed_attributes"):
             return True
 
         raise checks.FilterFailure(u"Changed attributes")
@@ -594,7 +699,8 @@ class ENChecker(checks.UnitChecker):
 
             return fingerprint
 
-        if check_translation(get_fingerprint, str1, str2):
+        if check_translation(get_fingerprint, str1, str2,
+                             u"c_format"):
             return True
 
         raise checks.FilterFailure(u"Incorrect C format")
@@ -618,7 +724,8 @@ class ENChecker(checks.UnitChecker):
 
             return fingerprint
 
-        if check_translation(get_fingerprint, str1, str2):
+        if check_translation(get_fingerprint, str1, str2,
+                             u"non_printable"):
             return True
 
         raise checks.FilterFailure(u"Non printable mismatch")
@@ -646,7 +753,8 @@ class ENChecker(checks.UnitChecker):
 
             return level
 
-        if check_translation(get_fingerprint, str1, str2):
+        if check_translation(get_fingerprint, str1, str2,
+                             u"unbalanced_tag_braces"):
             return True
 
         raise checks.FilterFailure(u"Unbalanced tag braces")
@@ -686,7 +794,8 @@ class ENChecker(checks.UnitChecker):
         if plurr_format_regex.search(str1):
             return True
 
-        if check_translation(get_fingerprint, str1, str2):
+        if check_translation(get_fingerprint, str1, str2,
+                             u"unbalanced_curly_braces"):
             return True
 
         raise checks.FilterFailure(u"Unbalanced curly braces")
@@ -732,7 +841,8 @@ class ENChecker(checks.UnitChecker):
 
             return fingerprint
 
-        if check_translation(get_fingerprint, str1, str2):
+        if check_translation(get_fingerprint, str1, str2,
+                             u"tags_differ"):
             return True
 
         raise checks.FilterFailure(u"Tags differ")
@@ -786,7 +896,8 @@ class ENChecker(checks.UnitChecker):
         if plurr_format_regex.search(str1):
             return True
 
-        if check_translation(get_fingerprint, str1, str2):
+        if check_translation(get_fingerprint, str1, str2,
+                             u"accelerators"):
             return True
 
         raise checks.FilterFailure(u"Accelerator mismatch")
@@ -858,7 +969,8 @@ class ENChecker(checks.UnitChecker):
 
             return fingerprint
 
-        if check_translation(get_fingerprint, str1, str2):
+        if check_translation(get_fingerprint, str1, str2,
+                             u"broken_entities"):
             return True
 
         raise checks.FilterFailure(u"Broken HTML entities")
@@ -914,7 +1026,8 @@ class ENChecker(checks.UnitChecker):
 
             return fingerprint
 
-        if check_translation(get_fingerprint, str1, str2):
+        if check_translation(get_fingerprint, str1, str2,
+                             u"doublequoting"):
             return True
 
         raise checks.FilterFailure(u"Double quotes mismatch")
@@ -1195,20 +1308,31 @@ def _generic_check(str1, str2, regex, message):
 
         return fingerprint
 
-    if check_translation(get_fingerprint, str1, str2):
+    if check_translation(get_fingerprint, str1, str2, regex.pattern):
         return True
 
     raise checks.FilterFailure(message)
 
 
-def check_translation(get_fingerprint_func, string, translation):
+def check_translation(get_fingerprint_func, string, translation,
+                      fingerprint_key=None):
+    """Compare the fingerprints of `string` and its `translation`.
+
+    :param fingerprint_key: key identifying the check, if provided the
+        source fingerprint is retrieved from `fingerprint_cache`. Source
+        fingerprints must not depend on the translation to be cached.
+    """
     if translation == '':
         # no real translation provided, skipping
         return True
 
     try:
-        a_fingerprint = get_fingerprint_func(string, is_source=True,
-                                             translation=translation)
+        if fingerprint_key is None:
+            a_fingerprint = get_fingerprint_func(string, is_source=True,
+                                                 translation=translation)
+        else:
+            a_fingerprint = fingerprint_cache.get_fingerprint(
+                fingerprint_key, get_fingerprint_func, string)
     except SkipCheck:
         # skip translation as it doesn't match required criteria
         return True
@@ -385,6 +385,9 @@ class Project(models.Model, CachedTreeItem, ProjectURLMixin):
     def get_children(self):
         return self.translationproject_set.live()
 
+    def get_stats_token_paths(self):
+        return ['/projects/']
+
     # # # /TreeItem
 
     def get_stats_for_user(self, user):
@@ -430,6 +433,13 @@ class ProjectResource(VirtualResource, ProjectURLMixin):
     def get_stats_for_user(self, user):
         return self.get_stats()
 
+    # # # TreeItem
+
+    def get_stats_token_path(self):
+        return '/projects/%s/' % split_pootle_path(self.pootle_path)[1]
+
+    # # # /TreeItem
+
 
 class ProjectSet(VirtualResource, ProjectURLMixin):
 
@@ -442,6 +452,13 @@ class ProjectSet(VirtualResource, ProjectURLMixin):
         self.directory = Directory.objects.projects
         super(ProjectSet, self).__init__(resources, self.directory.pootle_path)
 
+    # # # TreeItem
+
+    def get_stats_token_path(self):
+        return self.pootle_path
+
+    # # # /TreeItem
+
 
 @receiver([post_delete, post_save])
 @disable_for_loaddata
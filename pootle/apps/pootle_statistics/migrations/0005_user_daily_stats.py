@@ -0,0 +1,36 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pootle_translationproject', '0003_realpath_can_be_none'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('pootle_statistics', '0004_fill_translated_wordcount'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserDailyStats',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(db_index=True)),
+                ('score', models.FloatField(default=0)),
+                ('suggested', models.IntegerField(default=0)),
+                ('translated', models.IntegerField(default=0)),
+                ('reviewed', models.IntegerField(default=0)),
+                ('submissions', models.IntegerField(default=0)),
+                ('translation_project', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='pootle_translationproject.TranslationProject')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AlterUniqueTogether(
+            name='userdailystats',
+            unique_together=set([('user', 'translation_project', 'date')]),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations
+
+
+def fill_user_daily_stats(apps, schema_editor):
+    from pootle_statistics.models import UserDailyStats
+
+    UserDailyStats.refresh()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pootle_statistics', '0005_user_daily_stats'),
+    ]
+
+    operations = [
+        migrations.RunPython(fill_user_daily_stats),
+    ]
@@ -7,16 +7,22 @@
 # or later license. See the LICENSE file for a copy of the license and the
 # AUTHORS file for copyright and authorship information.
 
+import datetime
+from collections import defaultdict
+
 from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.db import models
-from django.db.models import F
+from django.db import IntegrityError, models, transaction
+from django.db.models import F, Q
 from django.template.defaultfilters import truncatechars
+from django.utils import timezone
 from django.utils.functional import cached_property
 from django.utils.translation import ugettext_lazy as _
 
 from pootle.core.log import SCORE_CHANGED, log
 from pootle.core.utils import dateformat
+from pootle.core.utils.list import chunked
+from pootle.core.utils.timezone import make_aware, make_naive
 from pootle_misc.checks import check_names
 from pootle_store.constants import FUZZY, TRANSLATED, UNTRANSLATED
 from pootle_store.fields import to_python
@@ -314,8 +320,13 @@ class Submission(models.Model):
         return result
 
     def save(self, *args, **kwargs):
+        created = self.pk is None
         super(Submission, self).save(*args, **kwargs)
 
+        if created and self.submitter_id is not None:
+            UserDailyStats.add(self.submitter_id, self.translation_project_id,
+                               self.creation_time, submissions=1)
+
         if not self.needs_scorelog():
             return
 
@@ -346,6 +357,9 @@ class TranslationActionCodes(object):
     # 'RR' suggestion rejected (counted towards the reviewer)
     SUGG_REVIEWED_REJECTED = 12
 
+    #: Actions whose wordcount is accounted as reviewed, unless translated
+    REVIEW_CODES = (SUGG_REVIEWED_ACCEPTED, REVIEWED, EDITED)
+
     NAMES_MAP = {
         NEW: 'TA',
         EDITED: 'TE',
@@ -507,8 +521,16 @@ class ScoreLog(models.Model):
         User.objects.filter(id=self.user.id).update(
             score=F('score') + self.score_delta
         )
+        UserDailyStats.add(self.user_id,
+                           self.submission.translation_project_id,
+                           self.creation_time, **self.get_daily_stats())
         self.log()
 
+    def get_daily_stats(self):
+        """Returns the amounts this entry adds to the user's daily stats."""
+        return get_scorelog_stats(self.action_code, self.wordcount,
+                                  self.translated_wordcount, self.score_delta)
+
     def log(self):
         d = {
             'user': self.user,
@@ -704,3 +726,200 @@ class ScoreLog(models.Model):
             TranslationActionCodes.SUGG_REVIEWED_ACCEPTED:
                 get_sugg_reviewed_accepted,
         }.get(self.action_code, lambda: (None, None))()
+
+
+def get_scorelog_stats(action_code, wordcount, translated_wordcount,
+                       score_delta):
+    """Returns the amounts a score log entry adds to the daily stats of
+    its user, in the terms used by leaderboards.
+    """
+    stats = {
+        'score': score_delta,
+        'suggested': 0,
+        'translated': 0,
+        'reviewed': 0,
+    }
+    if action_code == TranslationActionCodes.SUGG_ADDED:
+        stats['suggested'] = wordcount
+    if translated_wordcount is not None:
+        stats['translated'] = int(round(translated_wordcount))
+    elif action_code in TranslationActionCodes.REVIEW_CODES:
+        stats['reviewed'] = wordcount
+    return stats
+
+
+def get_stats_date(value):
+    """Returns the (UTC) day daily stats for `value` are accounted to."""
+    return make_naive(value, timezone.utc).date()
+
+
+def get_day_start(day):
+    """Returns the (UTC) datetime `day` starts at."""
+    return make_aware(datetime.datetime.combine(day, datetime.time()),
+                      tz=timezone.utc)
+
+
+class UserDailyStats(models.Model):
+    """Contributions of a user to a translation project during a day.
+
+    These roll up `Submission` and `ScoreLog` entries, and are updated as
+    those are created, so that leaderboards and contributor lists don't
+    need to aggregate every single entry in the period they cover.
+    """
+
+    #: Maximum number of rows to be written in a single query
+    CHUNK_SIZE = 500
+
+    #: Fields aggregating contributions
+    STATS_FIELDS = ('score', 'suggested', 'translated', 'reviewed',
+                    'submissions')
+
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, null=False,
+                             on_delete=models.CASCADE)
+    translation_project = models.ForeignKey(
+        'pootle_translationproject.TranslationProject', null=False,
+        on_delete=models.CASCADE)
+    date = models.DateField(db_index=True, null=False)
+
+    score = models.FloatField(null=False, default=0)
+    suggested = models.IntegerField(null=False, default=0)
+    translated = models.IntegerField(null=False, default=0)
+    reviewed = models.IntegerField(null=False, default=0)
+    submissions = models.IntegerField(null=False, default=0)
+
+    class Meta(object):
+        unique_together = ('user', 'translation_project', 'date')
+
+    @classmethod
+    def add(cls, user_id, translation_project_id, when, **values):
+        """Adds `values` to the stats of a user in a translation project
+        for the day `when` belongs to.
+        """
+        values = dict((field, value) for field, value in values.iteritems()
+                      if value)
+        if not values:
+            return
+
+        lookup = {
+            'user_id': user_id,
+            'translation_project_id': translation_project_id,
+            'date': get_stats_date(when),
+        }
+        updates = dict((field, F(field) + value)
+                       for field, value in values.iteritems())
+        if cls.objects.filter(**lookup).update(**updates):
+            return
+
+        try:
+            with transaction.atomic():
+                cls.objects.create(**dict(lookup, **values))
+        except IntegrityError:
+            # The row was created concurrently
+            cls.objects.filter(**lookup).update(**updates)
+
+    @classmethod
+    def add_submissions(cls, submissions):
+        """Accounts `submissions` created without going through
+        `Submission.save()`.
+        """
+        counts = defaultdict(int)
+        for submission in submissions:
+            if submission.submitter_id is None:
+                continue
+            key = (submission.submitter_id,
+                   submission.translation_project_id,
+                   get_stats_date(submission.creation_time))
+            counts[key] += 1
+
+        for (user_id, tp_id, date), count in counts.iteritems():
+            cls.add(user_id, tp_id, get_day_start(date), submissions=count)
+
+    @classmethod
+    def refresh(cls, user_ids=None):
+        """Recalculates daily stats from the submissions and score logs.
+
+        :param user_ids: list of IDs of the users to recalculate stats for.
+            If `None`, stats are recalculated for all users.
+        """
+        stats = defaultdict(lambda: defaultdict(int))
+
+        submissions = Submission.simple_objects.filter(
+            submitter__isnull=False,
+        )
+        scorelogs = ScoreLog.objects.all()
+        if user_ids is not None:
+            submissions = submissions.filter(submitter__in=user_ids)
+            scorelogs = scorelogs.filter(user__in=user_ids)
+
+        submission_values = submissions.values_list(
+            'submitter_id', 'translation_project_id', 'creation_time',
+        ).order_by()
+        for user_id, tp_id, creation_time in submission_values.iterator():
+            key = (user_id, tp_id, get_stats_date(creation_time))
+            stats[key]['submissions'] += 1
+
+        scorelog_values = scorelogs.values_list(
+            'user_id', 'submission__translation_project_id', 'creation_time',
+            'action_code', 'wordcount', 'translated_wordcount',
+            'score_delta',
+        ).order_by()
+        for row in scorelog_values.iterator():
+            key = (row[0], row[1], get_stats_date(row[2]))
+            for field, value in get_scorelog_stats(*row[3:]).iteritems():
+                stats[key][field] += value
+
+        with transaction.atomic():
+            existing = cls.objects.all()
+            if user_ids is not None:
+                existing = existing.filter(user__in=user_ids)
+            existing.delete()
+
+            rows = [
+                cls(user_id=user_id, translation_project_id=tp_id,
+                    date=date, **values)
+                for (user_id, tp_id, date), values in stats.iteritems()
+            ]
+            for batch in chunked(rows, cls.CHUNK_SIZE):
+                cls.objects.bulk_create(batch)
+
+    @staticmethod
+    def split_range(start=None, end=None, field='creation_time'):
+        """Splits the `[start, end]` range into the days which are
+        entirely covered by it, and the partial days at its edges.
+
+        :param start: beginning of the range, if any.
+        :param end: end of the range. Any rows from the current day on
+            are considered partial if it's `None`.
+        :param field: name of the datetime field rows within partial days
+            are looked up by.
+        :return: a `(days, partial)` tuple of lookups, where `days`
+            matches `UserDailyStats` for the whole days in the range (or
+            is `None` if there are none), and `partial` matches rows with
+            `field` within the partial days.
+        """
+        if end is None:
+            last_day = get_stats_date(timezone.now())
+            end_lookup = Q()
+        else:
+            last_day = get_stats_date(end)
+            end_lookup = Q(**{'%s__lte' % field: end})
+
+        first_day = None
+        if start is not None:
+            first_day = get_stats_date(start)
+            if get_day_start(first_day) < start:
+                first_day += datetime.timedelta(days=1)
+
+            if first_day >= last_day:
+                return None, Q(**{'%s__gte' % field: start}) & end_lookup
+
+        days = Q(date__lt=last_day)
+        partial = (Q(**{'%s__gte' % field: get_day_start(last_day)}) &
+                   end_lookup)
+        if first_day is not None:
+            days &= Q(date__gte=first_day)
+            partial |= Q(**{
+                '%s__gte' % field: start,
+                '%s__lt' % field: get_day_start(first_day),
+            })
+        return days, partial
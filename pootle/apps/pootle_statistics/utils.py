@@ -5,12 +5,16 @@
 # or later license. See the LICENSE file for a copy of the license and the
 # AUTHORS file for copyright and authorship information.
 
-from collections import OrderedDict
+from collections import OrderedDict, defaultdict
 
 from django.contrib.auth import get_user_model
-from django.db.models import Count, Q
+from django.db.models import Count, Q, Sum
 from django.utils.functional import cached_property
 
+from pootle.core.utils.list import chunked
+
+from .models import Submission, UserDailyStats
+
 
 User = get_user_model()
 
@@ -39,15 +43,7 @@ class Contributors(object):
 
     @property
     def site_filters(self):
-        q = Q()
-        tp_related = "submission__translation_project__"
-        if self.project_codes:
-            q = q & Q(
-                **{"%sproject__code__in" % tp_related: self.project_codes})
-        if self.language_codes:
-            q = q & Q(
-                **{"%slanguage__code__in" % tp_related: self.language_codes})
-        return q
+        return self.get_tp_filters("submission__translation_project__")
 
     @property
     def time_filters(self):
@@ -72,15 +68,61 @@ class Contributors(object):
     def items(self):
         return self.contributors.items()
 
+    def get_tp_filters(self, tp_related):
+        q = Q()
+        if self.project_codes:
+            q = q & Q(
+                **{"%sproject__code__in" % tp_related: self.project_codes})
+        if self.language_codes:
+            q = q & Q(
+                **{"%slanguage__code__in" % tp_related: self.language_codes})
+        return q
+
+    def get_contributions(self):
+        """Returns the number of submissions of each user, as a dictionary of
+        `{user_id: contributions}`.
+
+        Contributions in whole days are read from the daily stats, and only
+        submissions in partial days are counted.
+        """
+        contributions = defaultdict(int)
+        days, partial = UserDailyStats.split_range(self.since, self.until)
+        if days is not None:
+            daily = (
+                UserDailyStats.objects
+                .filter(days & self.get_tp_filters("translation_project__"))
+                .filter(user__in=self.user_qs, submissions__gt=0)
+                .values("user")
+                .annotate(contributions=Sum("submissions"))
+                .order_by())
+            for row in daily:
+                contributions[row["user"]] += row["contributions"]
+
+        submissions = (
+            Submission.objects
+            .filter(partial & self.get_tp_filters("translation_project__"))
+            .filter(submitter__in=self.user_qs)
+            .values("submitter")
+            .annotate(contributions=Count("id"))
+            .order_by())
+        for row in submissions:
+            contributions[row["submitter"]] += row["contributions"]
+        return contributions
+
     @cached_property
     def contributors(self):
-        qs = self.user_qs.filter(self.filters).annotate(
-            contributions=Count("submission"))
+        contributions = self.get_contributions()
+        users = []
+        for user_ids in chunked(contributions.keys(), 500):
+            for user in (self.user_qs.filter(pk__in=user_ids)
+                                     .values("id", "username", "full_name",
+                                             "email")):
+                user["contributions"] = contributions[user.pop("id")]
+                users.append(user)
         if self.sort_by == "contributions":
-            qs = qs.order_by("-contributions", "username")
+            users.sort(key=lambda user: (-user["contributions"],
+                                         user["username"]))
         else:
-            qs = qs.order_by("username")
+            users.sort(key=lambda user: user["username"])
         return OrderedDict(
-            [(user["username"], user)
-             for user
-             in qs.values("username", "full_name", "contributions", "email")])
+            [(user["username"], user) for user in users])
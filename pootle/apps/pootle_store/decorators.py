@@ -47,7 +47,8 @@ def get_unit_context(permission_code=None):
             request.translation_project = tp
 
             request.permissions = get_matching_permissions(request.user,
-                                                           tp.directory)
+                                                           tp.directory,
+                                                           request=request)
 
             if (permission_code is not None and
                 not check_permission(permission_code, request)):
@@ -8,32 +8,134 @@
 # AUTHORS file for copyright and authorship information.
 
 import difflib
+from bisect import bisect_left
 from collections import OrderedDict
 
 from django.db import models
 from django.utils.functional import cached_property
 
 from .constants import FUZZY, OBSOLETE, TRANSLATED, UNTRANSLATED
-from .fields import to_python as multistring_to_python
+from .fields import (to_db as multistring_to_db,
+                     to_python as multistring_to_python)
 from .unit import UnitProxy
 
 
+def get_common_subsequence(a, b):
+    """Returns the longest common subsequence of `a` and `b`, as a list of
+    `(i, j)` index pairs.
+
+    Items must be unique within each of the sequences, which allows to
+    find the subsequence as the longest increasing subsequence of the
+    positions in `b` of the items in `a`, in `O(n log n)` time.
+    """
+    b_positions = dict((item, j) for j, item in enumerate(b))
+
+    pairs = []
+    predecessors = []
+    # `tails[k]` is the smallest position in `b` ending a subsequence of
+    # length `k + 1`, and `tail_pairs[k]` the pair it belongs to
+    tails = []
+    tail_pairs = []
+    for i, item in enumerate(a):
+        j = b_positions.get(item)
+        if j is None:
+            continue
+
+        k = bisect_left(tails, j)
+        if k == len(tails):
+            tails.append(j)
+            tail_pairs.append(len(pairs))
+        else:
+            tails[k] = j
+            tail_pairs[k] = len(pairs)
+        predecessors.append(tail_pairs[k - 1] if k > 0 else None)
+        pairs.append((i, j))
+
+    subsequence = []
+    pair = tail_pairs[-1] if tail_pairs else None
+    while pair is not None:
+        subsequence.append(pairs[pair])
+        pair = predecessors[pair]
+    subsequence.reverse()
+
+    return subsequence
+
+
+def get_opcodes(a, b):
+    """Returns `difflib.SequenceMatcher`-like opcodes to turn `a` into `b`.
+
+    Sequences of unique items, such as unit IDs, are diffed in
+    `O(n log n)` time based on their longest common subsequence, whereas
+    `SequenceMatcher` is used otherwise.
+    """
+    if len(set(a)) != len(a) or len(set(b)) != len(b):
+        return difflib.SequenceMatcher(None, a, b).get_opcodes()
+
+    opcodes = []
+    i = j = 0
+    for (next_i, next_j) in get_common_subsequence(a, b) + [(len(a), len(b))]:
+        if i < next_i and j < next_j:
+            opcodes.append(('replace', i, next_i, j, next_j))
+        elif i < next_i:
+            opcodes.append(('delete', i, next_i, j, j))
+        elif j < next_j:
+            opcodes.append(('insert', i, i, j, next_j))
+
+        if next_i == len(a):
+            break
+
+        if opcodes and opcodes[-1][0] == 'equal' and opcodes[-1][2] == next_i:
+            opcodes[-1] = ('equal', opcodes[-1][1], next_i + 1,
+                           opcodes[-1][3], next_j + 1)
+        else:
+            opcodes.append(('equal', next_i, next_i + 1, next_j, next_j + 1))
+        i, j = next_i + 1, next_j + 1
+
+    return opcodes
+
+
 class UnitDiffProxy(UnitProxy):
     """Wraps File/DB Unit dicts used by StoreDiff for equality comparison"""
 
     match_attrs = ["context", "developer_comment", "locations",
                    "source", "state", "target", "translator_comment"]
+    raw_attrs = ["source", "target"]
+
+    @property
+    def comparable(self):
+        """Returns a tuple of the unit values compared for equality."""
+        return tuple(getattr(self, k) for k in self.match_attrs)
+
+    @property
+    def raw_comparable(self):
+        """Returns a tuple of the unit values compared for equality, with
+        `raw_attrs` in their DB representation.
+
+        These are cheaper to retrieve: units having equal raw values are
+        equal, but not necessarily the other way round.
+        """
+        return tuple(
+            getattr(self, 'raw_%s' % k if k in self.raw_attrs else k)
+            for k in self.match_attrs
+        )
 
     def __eq__(self, other):
-        return all(getattr(self, k) == getattr(other, k)
-                   for k in self.match_attrs)
+        return (self.raw_comparable == other.raw_comparable
+                or self.comparable == other.comparable)
 
     def __ne__(self, other):
         return not self == other
 
 
 class DBUnit(UnitDiffProxy):
-    pass
+
+    @property
+    def raw_source(self):
+        return self.unit["source_f"] or ""
+
+    @property
+    def raw_target(self):
+        return self.unit["target_f"] or ""
 
 
 class FileUnit(UnitDiffProxy):
@@ -50,6 +152,14 @@ class FileUnit(UnitDiffProxy):
     def target(self):
         return multistring_to_python(self.unit["target"])
 
+    @property
+    def raw_source(self):
+        return multistring_to_db(self.unit["source"]) or ""
+
+    @property
+    def raw_target(self):
+        return multistring_to_db(self.unit["target"]) or ""
+
 
 class FileStore(object):
     """File store representation for diffing."""
@@ -60,10 +170,11 @@ class FileStore(object):
     @cached_property
     def units(self):
         """Returns all file units except the header."""
-        return OrderedDict(
-            (unit.getid(), self.get_file_unit(unit))
+        units = (
+            self.get_file_unit(unit)
             for unit in self.store.units if not unit.isheader()
         )
+        return OrderedDict((unit['unitid'], unit) for unit in units)
 
     def get_file_unit(self, unit):
         """Retrieves individual unit data.
@@ -127,10 +238,14 @@ class DBStore(object):
     @cached_property
     def active_uids(self):
         return [
-            uid for uid, unit in self.units.items()
+            uid for uid, unit in self.units.iteritems()
             if unit['state'] != OBSOLETE
         ]
 
+    @cached_property
+    def active_uid_set(self):
+        return set(self.active_uids)
+
     def get_unit(self, id):
         """Retrieves a comparable `DBUnit` object by `id`."""
         return DBUnit(self.units[id])
@@ -140,7 +255,7 @@ class DBStore(object):
         `since_revision` revision.
         """
         return [
-            uid for uid, unit in self.units.items()
+            uid for uid, unit in self.units.iteritems()
             if (unit['revision'] > since_revision
                 and unit['state'] != OBSOLETE)
         ]
@@ -239,12 +354,13 @@ class StoreDiff(object):
     def updated_target_units(self):
         return self.target.get_updated_uids(since_revision=self.source_revision)
 
+    @cached_property
+    def updated_target_unit_set(self):
+        return set(self.updated_target_units)
+
     @cached_property
     def opcodes(self):
-        sm = difflib.SequenceMatcher(None,
-                                     self.target.active_uids,
-                                     self.new_unit_list)
-        return sm.get_opcodes()
+        return get_opcodes(self.target.active_uids, self.new_unit_list)
 
     def diff(self):
         """Return a dictionary of change actions or None if there are no
@@ -281,10 +397,10 @@ class StoreDiff(object):
         return to_add
 
     def get_units_to_obsolete(self):
-        return [unit['id'] for unitid, unit in self.target.units.items()
+        return [unit['id'] for unitid, unit in self.target.units.iteritems()
                 if (unitid not in self.source.units
-                    and unitid in self.target.active_uids
-                    and unitid not in self.updated_target_units)]
+                    and unitid in self.target.active_uid_set
+                    and unitid not in self.updated_target_unit_set)]
 
     def get_units_to_update(self):
         uid_index_map = {}
@@ -307,19 +423,17 @@ class StoreDiff(object):
         """Returns a set of unit DB ids to be updated.
         """
         update_ids = set()
+        source_units = self.source.units
+        target_units = self.target.units
 
         for (tag, i1, i2, j1_, j2_) in self.opcodes:
             if tag != 'equal':
                 continue
 
-            update_ids.update(set(
-                self.target.units[uid]['id']
-                for uid in self.target.active_uids[i1:i2]
-                if (
-                    uid in self.source.units
-                    and self.source.get_unit(uid) != self.target.get_unit(uid)
-                )
-            ))
+            for uid in self.target.active_uids[i1:i2]:
+                if (uid in source_units and
+                        self.source.get_unit(uid) != self.target.get_unit(uid)):
+                    update_ids.add(target_units[uid]['id'])
 
         return update_ids
 
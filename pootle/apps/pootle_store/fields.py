@@ -179,19 +179,40 @@ class TranslationStoreFieldFile(FieldFile):
                     raise KeyError
             except KeyError:
                 logging.debug(u"Cache miss for %s", self.path)
-                from translate.storage import factory
-                syncer = self.instance.syncer
-
-                classes = {
-                    syncer.extension: syncer.file_class,
-                }
-                store_obj = factory.getobject(self.path,
-                                              ignore=self.field.ignore,
-                                              classes=classes)
+                store_obj = self._load_store()
                 self._store_tuple = StoreTuple(store_obj, mod_info,
                                                self.realpath)
                 self._store_cache[self.path] = self._store_tuple
 
+    def _parse_store(self):
+        from translate.storage import factory
+        syncer = self.instance.syncer
+
+        classes = {
+            syncer.extension: syncer.file_class,
+        }
+        return factory.getobject(self.path, ignore=self.field.ignore,
+                                 classes=classes)
+
+    def _load_store(self):
+        """Loads the translation store from the on-disk parse cache if it's
+        enabled and up to date, parsing the file otherwise.
+        """
+        from . import parse_cache
+        if not parse_cache.is_enabled() or not self.exists():
+            return self._parse_store()
+
+        fingerprint = parse_cache.get_fingerprint(self.realpath)
+        store_obj = parse_cache.load(self.realpath, fingerprint)
+        if store_obj is not None:
+            parse_cache.stats.hits += 1
+            return store_obj
+
+        parse_cache.stats.misses += 1
+        store_obj = self._parse_store()
+        parse_cache.save(self.realpath, fingerprint, store_obj)
+        return store_obj
+
     def _touch_store_cache(self):
         """Update stored mod_info without reparsing file."""
         if hasattr(self, "_store_tuple"):
@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+from pootle.core.utils.db import set_mysql_collation_for_column
+
+
+def make_search_tokens_cs(apps, schema_editor):
+    cursor = schema_editor.connection.cursor()
+    set_mysql_collation_for_column(
+        apps,
+        cursor,
+        "pootle_store.SearchToken",
+        "text",
+        "utf8_bin",
+        "varchar(64)")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pootle_store', '0002_store_translation_project'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchToken',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('text', models.CharField(max_length=64, unique=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='UnitSearchToken',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('field', models.PositiveSmallIntegerField()),
+                ('token', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='units', to='pootle_store.SearchToken')),
+                ('unit', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_tokens', to='pootle_store.Unit')),
+            ],
+        ),
+        migrations.AlterUniqueTogether(
+            name='unitsearchtoken',
+            unique_together=set([('token', 'field', 'unit')]),
+        ),
+        migrations.RunPython(make_search_tokens_cs),
+    ]
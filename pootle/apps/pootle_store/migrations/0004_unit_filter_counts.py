@@ -0,0 +1,29 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pootle_store', '0003_search_tokens'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='unit',
+            name='check_count',
+            field=models.PositiveIntegerField(db_index=True, default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='unit',
+            name='critical_check_count',
+            field=models.PositiveIntegerField(db_index=True, default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='unit',
+            name='suggestion_count',
+            field=models.PositiveIntegerField(db_index=True, default=0, editable=False),
+        ),
+    ]
@@ -7,7 +7,6 @@
 # or later license. See the LICENSE file for a copy of the license and the
 # AUTHORS file for copyright and authorship information.
 
-import datetime
 import io
 import logging
 import operator
@@ -22,45 +21,53 @@ from translate.storage.factory import getobject
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.core.exceptions import ValidationError
-from django.db import models
-from django.db.models import F
+from django.db import models, transaction
+from django.db.models import Count, F
 from django.urls import reverse
 from django.utils import timezone
 from django.utils.functional import cached_property
 from django.utils.http import urlquote
 from django.utils.translation import ugettext_lazy as _
 
+from django_rq.queues import get_queue
+
 from pootle.core.log import (
     TRANSLATION_ADDED, TRANSLATION_CHANGED, TRANSLATION_DELETED,
     UNIT_ADDED, UNIT_DELETED, UNIT_OBSOLETE, UNIT_RESURRECTED,
     STORE_ADDED, STORE_DELETED, STORE_OBSOLETE,
     MUTE_QUALITYCHECK, UNMUTE_QUALITYCHECK,
     action_log, store_log)
+from pootle.core.cache import get_cache
 from pootle.core.mixins import CachedMethods, CachedTreeItem
 from pootle.core.models import Revision
 from pootle.core.search import SearchBroker
+from pootle.core.search.queue import tm_update_queue
 from pootle.core.storage import PootleFileSystemStorage
 from pootle.core.url_helpers import (get_editor_filter, split_pootle_path,
                                      to_tp_relative_path)
 from pootle.core.utils import dateformat
 from pootle.core.utils.aggregate import max_column
+from pootle.core.utils.list import chunked
 from pootle.core.utils.multistring import PLURAL_PLACEHOLDER, SEPARATOR
-from pootle.core.utils.timezone import datetime_min, make_aware
+from pootle.core.utils.timezone import datetime_min
 from pootle_misc.checks import check_names
 from pootle_misc.util import import_func
 from pootle_statistics.models import (Submission, SubmissionFields,
-                                      SubmissionTypes)
+                                      SubmissionTypes, UserDailyStats)
 
 from .constants import FUZZY, NEW, OBSOLETE, PARSED, TRANSLATED, UNTRANSLATED
 from .fields import MultiStringField, TranslationStoreField
 from .managers import StoreManager, SuggestionManager, UnitManager
-from .util import SuggestionStates
+from .util import SuggestionStates, get_mtime_datetime
 from .syncer import PoStoreSyncer
+from .unit.filters import get_text_search_class
 from .updater import StoreUpdater
 
 
 TM_BROKER = None
 
+cache = get_cache('redis')
+
 
 def get_tm_broker():
     global TM_BROKER
@@ -69,6 +76,26 @@ def get_tm_broker():
     return TM_BROKER
 
 
+def prefetch_tm_suggestions_job(uids):
+    """RQ job"""
+    units = Unit.objects.filter(id__in=uids).select_related(
+        'store__translation_project__language',
+    )
+    for unit in units:
+        unit.get_tm_suggestions()
+
+
+def create_prefetch_tm_suggestions_job(uids):
+    if not get_tm_broker().has_servers:
+        return
+
+    queue = get_queue('default')
+    if queue._async:
+        queue.enqueue(prefetch_tm_suggestions_job, uids)
+    else:
+        prefetch_tm_suggestions_job(uids)
+
+
 # # # # # # # # Quality Check # # # # # # #
 
 
@@ -92,7 +119,10 @@ class QualityCheck(models.Model):
     def delete_unknown_checks(cls):
         unknown_checks = QualityCheck.objects \
             .exclude(name__in=check_names.keys())
+        unit_ids = list(unknown_checks.values_list('unit_id', flat=True)
+                                      .distinct())
         unknown_checks.delete()
+        Unit.update_filter_counts(unit_ids)
 
 # # # # # # # # # Suggestion # # # # # # # #
 
@@ -233,6 +263,25 @@ class Unit(models.Model, base.TranslationUnit):
                                     db_index=True, related_name='reviewed')
     reviewed_on = models.DateTimeField(db_index=True, null=True)
 
+    # Denormalized counts for editor filters, see `update_filter_counts()`
+    suggestion_count = models.PositiveIntegerField(default=0, db_index=True,
+                                                   editable=False)
+    check_count = models.PositiveIntegerField(default=0, db_index=True,
+                                              editable=False)
+    critical_check_count = models.PositiveIntegerField(default=0,
+                                                       db_index=True,
+                                                       editable=False)
+
+    #: Fields holding the counts calculated by `update_filter_counts()`
+    FILTER_COUNT_FIELDS = ('suggestion_count', 'check_count',
+                           'critical_check_count')
+
+    #: Maximum number of units whose counts are calculated in a query
+    FILTER_COUNTS_CHUNK_SIZE = 500
+
+    #: Cache key of the counter bumped whenever filter counts are updated
+    FILTER_COUNTS_VERSION_KEY = 'pootle:unit_filter_counts_version'
+
     objects = UnitManager()
     simple_objects = models.Manager()
 
@@ -280,6 +329,82 @@ class Unit(models.Model, base.TranslationUnit):
         """Returns the max revision number across all units."""
         return max_column(cls.objects.all(), 'revision', 0)
 
+    @classmethod
+    def get_filter_counts_version(cls):
+        """Returns the version of the filter counts, which changes whenever
+        suggestions or quality checks of any unit change.
+        """
+        return cache.get(cls.FILTER_COUNTS_VERSION_KEY, 0)
+
+    @classmethod
+    def bump_filter_counts_version(cls):
+        def bump():
+            try:
+                cache.incr(cls.FILTER_COUNTS_VERSION_KEY)
+            except ValueError:
+                cache.set(cls.FILTER_COUNTS_VERSION_KEY, 1, None)
+
+        bump()
+        # Results read by others before the changes were committed are
+        # stale by then too
+        transaction.on_commit(bump)
+
+    @classmethod
+    def update_filter_counts(cls, unit_ids):
+        """Recalculates the pending suggestion and active check counts of
+        units, which allow filtering units without joining suggestions or
+        quality checks.
+
+        :param unit_ids: IDs of the units to recalculate counts for.
+        :return: a dictionary of `{unit_id: {field_name: count}}`.
+        """
+        result = {}
+        for ids in chunked(sorted(set(unit_ids)),
+                           cls.FILTER_COUNTS_CHUNK_SIZE):
+            counts = {
+                unit_id: dict.fromkeys(cls.FILTER_COUNT_FIELDS, 0)
+                for unit_id in ids
+            }
+            suggestions = (
+                Suggestion.objects.filter(unit_id__in=ids,
+                                          state=SuggestionStates.PENDING)
+                                  .order_by().values('unit_id')
+                                  .annotate(count=Count('id'))
+            )
+            for item in suggestions:
+                counts[item['unit_id']]['suggestion_count'] = item['count']
+
+            checks = (
+                QualityCheck.objects.filter(unit_id__in=ids,
+                                            false_positive=False)
+                                    .order_by().values('unit_id', 'category')
+                                    .annotate(count=Count('id'))
+            )
+            for item in checks:
+                unit_counts = counts[item['unit_id']]
+                unit_counts['check_count'] += item['count']
+                if item['category'] == Category.CRITICAL:
+                    unit_counts['critical_check_count'] += item['count']
+
+            # Units sharing the same new counts are updated at once
+            changed = {}
+            current = cls.simple_objects.filter(id__in=ids).values_list(
+                'id', *cls.FILTER_COUNT_FIELDS)
+            for row in current:
+                values = tuple(counts[row[0]][field]
+                               for field in cls.FILTER_COUNT_FIELDS)
+                if values != tuple(row[1:]):
+                    changed.setdefault(values, []).append(row[0])
+
+            for values, changed_ids in changed.iteritems():
+                cls.simple_objects.filter(id__in=changed_ids).update(
+                    **dict(zip(cls.FILTER_COUNT_FIELDS, values)))
+
+            result.update(counts)
+
+        cls.bump_filter_counts_version()
+        return result
+
     # # # # # # # # # # # # # #  Methods # # # # # # # # # # # # # # # # # # #
 
     def __unicode__(self):
@@ -297,6 +422,7 @@ class Unit(models.Model, base.TranslationUnit):
         self._target_updated = False
         self._state_updated = False
         self._comment_updated = False
+        self._notes_updated = False
         self._auto_translated = False
         self._encoding = 'UTF-8'
 
@@ -344,33 +470,10 @@ class Unit(models.Model, base.TranslationUnit):
                                   CachedMethods.LAST_UPDATED)
 
         if self._source_updated:
-            # update source related fields
-            self.source_hash = md5(self.source_f.encode("utf-8")).hexdigest()
-            self.source_length = len(self.source_f)
-            self.update_wordcount(auto_translate=True)
+            self.update_source_fields()
 
         if self._target_updated:
-            # update target related fields
-            self.target_wordcount = count_words(self.target_f.strings)
-            self.target_length = len(self.target_f)
-            self.store.mark_dirty(CachedMethods.LAST_ACTION)
-            if filter(None, self.target_f.strings):
-                if self.state == UNTRANSLATED:
-                    self.state = TRANSLATED
-                    self.store.mark_dirty(CachedMethods.WORDCOUNT_STATS)
-
-                    if not hasattr(self, '_save_action'):
-                        self._save_action = TRANSLATION_ADDED
-                else:
-                    if not hasattr(self, '_save_action'):
-                        self._save_action = TRANSLATION_CHANGED
-            else:
-                if not hasattr(self, '_save_action'):
-                    self._save_action = TRANSLATION_DELETED
-                # if it was TRANSLATED then set to UNTRANSLATED
-                if self.state > FUZZY:
-                    self.state = UNTRANSLATED
-                    self.store.mark_dirty(CachedMethods.WORDCOUNT_STATS)
+            self.update_target_fields()
 
         # Updating unit from the .po file set its revision property to
         # a new value (the same for all units during its store updated)
@@ -390,24 +493,19 @@ class Unit(models.Model, base.TranslationUnit):
                        unit=self.id, translation=self.target_f,
                        path=self.store.pootle_path)
 
-        if (self._state_updated and self.state == TRANSLATED and
-            self._save_action == TRANSLATION_CHANGED and
-            not self._target_updated):
-            # set reviewer data if FUZZY has been removed only and
-            # translation hasn't been updated
-            self.reviewed_on = timezone.now()
-            self.reviewed_by = self._log_user
-        elif self.state == FUZZY:
-            # clear reviewer data if unit has been marked as FUZZY
-            self.reviewed_on = None
-            self.reviewed_by = None
-        elif self.state == UNTRANSLATED:
-            # clear reviewer and translator data if translation
-            # has been deleted
-            self.reviewed_on = None
-            self.reviewed_by = None
-            self.submitted_by = None
-            self.submitted_on = None
+        self.update_review_fields()
+
+        if (not created and kwargs.get('update_fields') is None and
+            not kwargs.get('force_insert')):
+            # Counts are kept up to date in bulk, so the ones loaded along
+            # with the unit may be stale by now
+            deferred_fields = self.get_deferred_fields()
+            kwargs['update_fields'] = [
+                field.attname for field in self._meta.concrete_fields
+                if not (field.primary_key or
+                        field.attname in deferred_fields or
+                        field.name in self.FILTER_COUNT_FIELDS)
+            ]
 
         super(Unit, self).save(*args, **kwargs)
 
@@ -429,18 +527,81 @@ class Unit(models.Model, base.TranslationUnit):
             if self.istranslated():
                 self.update_tmserver()
 
+        if (created or self._source_updated or self._target_updated or
+                self._comment_updated or self._notes_updated):
+            get_text_search_class().index_units([self])
+
         # done processing source/target update remove flag
-        self._source_updated = False
-        self._target_updated = False
-        self._state_updated = False
-        self._comment_updated = False
-        self._auto_translated = False
+        self.reset_update_flags()
 
         # update cache only if we are updating a single unit
         if self.store.state >= PARSED:
             self.store.mark_dirty(CachedMethods.MTIME)
             self.store.update_dirty_cache()
 
+    def update_source_fields(self):
+        """Updates the fields derived from the unit's source."""
+        self.source_hash = md5(self.source_f.encode("utf-8")).hexdigest()
+        self.source_length = len(self.source_f)
+        self.update_wordcount(auto_translate=True)
+
+    def update_target_fields(self):
+        """Updates the fields derived from the unit's target, adjusting
+        the unit's state accordingly.
+        """
+        self.target_wordcount = count_words(self.target_f.strings)
+        self.target_length = len(self.target_f)
+        self.store.mark_dirty(CachedMethods.LAST_ACTION)
+        if filter(None, self.target_f.strings):
+            if self.state == UNTRANSLATED:
+                self.state = TRANSLATED
+                self.store.mark_dirty(CachedMethods.WORDCOUNT_STATS)
+
+                if not hasattr(self, '_save_action'):
+                    self._save_action = TRANSLATION_ADDED
+            else:
+                if not hasattr(self, '_save_action'):
+                    self._save_action = TRANSLATION_CHANGED
+        else:
+            if not hasattr(self, '_save_action'):
+                self._save_action = TRANSLATION_DELETED
+            # if it was TRANSLATED then set to UNTRANSLATED
+            if self.state > FUZZY:
+                self.state = UNTRANSLATED
+                self.store.mark_dirty(CachedMethods.WORDCOUNT_STATS)
+
+    def update_review_fields(self):
+        """Sets or clears reviewer and translator data depending on the
+        unit's state.
+        """
+        if (self._state_updated and self.state == TRANSLATED and
+            self._save_action == TRANSLATION_CHANGED and
+            not self._target_updated):
+            # set reviewer data if FUZZY has been removed only and
+            # translation hasn't been updated
+            self.reviewed_on = timezone.now()
+            self.reviewed_by = self._log_user
+        elif self.state == FUZZY:
+            # clear reviewer data if unit has been marked as FUZZY
+            self.reviewed_on = None
+            self.reviewed_by = None
+        elif self.state == UNTRANSLATED:
+            # clear reviewer and translator data if translation
+            # has been deleted
+            self.reviewed_on = None
+            self.reviewed_by = None
+            self.submitted_by = None
+            self.submitted_on = None
+
+    def reset_update_flags(self):
+        """Clears the flags tracking updates made since the last save."""
+        self._source_updated = False
+        self._target_updated = False
+        self._state_updated = False
+        self._comment_updated = False
+        self._notes_updated = False
+        self._auto_translated = False
+
     def get_absolute_url(self):
         return self.store.get_absolute_url()
 
@@ -475,9 +636,12 @@ class Unit(models.Model, base.TranslationUnit):
         user_projects = Project.accessible_by_user(user)
         return self.store.translation_project.project.code in user_projects
 
-    def add_initial_submission(self, user=None):
+    def get_initial_submission(self, user=None):
+        """Returns the (unsaved) submission recording the creation of the
+        unit, or `None` if the unit has no translation.
+        """
         if self.istranslated() or self.isfuzzy():
-            Submission.objects.create(
+            return Submission(
                 creation_time=self.creation_time,
                 translation_project=self.store.translation_project,
                 submitter=user or self._log_user,
@@ -488,6 +652,13 @@ class Unit(models.Model, base.TranslationUnit):
                 new_value=self.target,
             )
 
+        return None
+
+    def add_initial_submission(self, user=None):
+        submission = self.get_initial_submission(user=user)
+        if submission is not None:
+            submission.save()
+
     @cached_property
     def unit_syncer(self):
         return self.store.syncer.unit_sync_class(self)
@@ -582,6 +753,7 @@ class Unit(models.Model, base.TranslationUnit):
             (self.developer_comment or notes)):
             self.developer_comment = notes or None
             changed = True
+            self._notes_updated = True
 
         notes = unit.getnotes(origin="translator")
 
@@ -595,6 +767,7 @@ class Unit(models.Model, base.TranslationUnit):
         if self.locations != locations and (self.locations or locations):
             self.locations = locations or None
             changed = True
+            self._notes_updated = True
 
         context = unit.getcontext()
         if self.context != unit.getcontext() and (self.context or context):
@@ -666,6 +839,7 @@ class Unit(models.Model, base.TranslationUnit):
             if existing:
                 self.store.mark_dirty(CachedMethods.CHECKS)
                 self.qualitycheck_set.all().delete()
+                self.refresh_filter_counts()
                 return True
 
             return False
@@ -705,7 +879,10 @@ class Unit(models.Model, base.TranslationUnit):
             self.store.mark_dirty(CachedMethods.CHECKS)
             self.qualitycheck_set.filter(name__in=existing).delete()
 
-        return result or bool(unmute_list) or bool(existing)
+        result = result or bool(unmute_list) or bool(existing)
+        if result:
+            self.refresh_filter_counts()
+        return result
 
     def get_qualitychecks(self):
         return self.qualitycheck_set.all()
@@ -723,6 +900,12 @@ class Unit(models.Model, base.TranslationUnit):
     def get_active_qualitychecks(self):
         return self.qualitycheck_set.filter(false_positive=False)
 
+    def refresh_filter_counts(self):
+        """Recalculates the unit's suggestion and check counts."""
+        counts = self.update_filter_counts([self.id])[self.id]
+        for field, value in counts.iteritems():
+            setattr(self, field, value)
+
 # # # # # # # # # # # Related Submissions # # # # # # # # # # # #
 
     def get_edits(self):
@@ -739,7 +922,8 @@ class Unit(models.Model, base.TranslationUnit):
 
 # # # # # # # # # # # TranslationUnit # # # # # # # # # # # # # #
 
-    def update_tmserver(self):
+    def get_tmserver_obj(self):
+        """Returns the document indexing the unit in the TM server."""
         obj = {
             'id': self.id,
             # 'revision' must be an integer for statistical queries to work
@@ -765,8 +949,11 @@ class Unit(models.Model, base.TranslationUnit):
                 'email_md5': md5(self.submitted_by.email).hexdigest(),
             })
 
-        get_tm_broker().update(self.store.translation_project.language.code,
-                               obj)
+        return obj
+
+    def update_tmserver(self):
+        tm_update_queue.push(self.store.translation_project.language.code,
+                             [self.get_tmserver_obj()])
 
     def get_tm_suggestions(self):
         return get_tm_broker().search(self)
@@ -945,6 +1132,7 @@ class Unit(models.Model, base.TranslationUnit):
             )
             suggestion.target = translation
             suggestion.save()
+            self.refresh_filter_counts()
 
             sub = Submission(
                 creation_time=suggestion.creation_time,
@@ -988,6 +1176,7 @@ class Unit(models.Model, base.TranslationUnit):
         suggestion.reviewer = reviewer
         suggestion.review_time = current_time
         suggestion.save()
+        self.refresh_filter_counts()
 
         create_subs = OrderedDict()
         if old_state != self.state:
@@ -1036,6 +1225,7 @@ class Unit(models.Model, base.TranslationUnit):
         suggestion.review_time = timezone.now()
         suggestion.reviewer = reviewer
         suggestion.save()
+        self.refresh_filter_counts()
 
         sub = Submission(
             creation_time=suggestion.review_time,
@@ -1066,6 +1256,7 @@ class Unit(models.Model, base.TranslationUnit):
 
         check.false_positive = false_positive
         check.save()
+        self.refresh_filter_counts()
 
         self.store.mark_dirty(CachedMethods.CHECKS,
                               CachedMethods.LAST_ACTION)
@@ -1096,6 +1287,35 @@ class Unit(models.Model, base.TranslationUnit):
         return int(dateformat.format(self.creation_time, 'U'))
 
 
+# # # # # # # # # # #  Search index # # # # # # # # # # # # # #
+
+
+class SearchToken(models.Model):
+    """Lowercased word found in the text of units."""
+
+    #: Maximum length of a token
+    MAX_LENGTH = 64
+
+    text = models.CharField(max_length=MAX_LENGTH, unique=True)
+
+    def __unicode__(self):
+        return self.text
+
+
+class UnitSearchToken(models.Model):
+    """Occurrence of a token in one of the searchable fields of a unit,
+    as indexed by `InvertedIndexUnitSearch`.
+    """
+
+    unit = models.ForeignKey(Unit, related_name='search_tokens')
+    token = models.ForeignKey(SearchToken, related_name='units')
+    #: Position of the field in `UnitTextSearch.search_fields`
+    field = models.PositiveSmallIntegerField()
+
+    class Meta(object):
+        unique_together = ('token', 'field', 'unit')
+
+
 # # # # # # # # # # #  Store # # # # # # # # # # # # # #
 
 
@@ -1117,6 +1337,10 @@ class Store(models.Model, CachedTreeItem, base.TranslationStore):
     UnitClass = Unit
     Name = "Model Store"
 
+    #: Maximum number of rows to be inserted per query when adding units
+    #: in bulk
+    BULK_CREATE_BATCH_SIZE = 500
+
     file = TranslationStoreField(max_length=255, storage=fs, db_index=True,
                                  null=False, editable=False)
 
@@ -1194,7 +1418,7 @@ class Store(models.Model, CachedTreeItem, base.TranslationStore):
         return unicode(self.pootle_path)
 
     def __str__(self):
-        return str(self.syncer.convert())
+        return self.serialize()
 
     def save(self, *args, **kwargs):
         created = not self.id
@@ -1264,12 +1488,7 @@ class Store(models.Model, CachedTreeItem, base.TranslationStore):
                 yield unit
 
     def get_file_mtime(self):
-        disk_mtime = datetime.datetime.fromtimestamp(self.file.getpomtime()[0])
-        # set microsecond to 0 for comparing with a time value without
-        # microseconds
-        disk_mtime = make_aware(disk_mtime.replace(microsecond=0))
-
-        return disk_mtime
+        return get_mtime_datetime(self.file.getpomtime()[0])
 
     def update_index(self, start, delta):
         Unit.objects.filter(store_id=self.id, index__gte=start).update(
@@ -1374,7 +1593,9 @@ class Store(models.Model, CachedTreeItem, base.TranslationStore):
         return getobject(buffered_data)
 
     def serialize(self):
-        return str(self)
+        out = io.BytesIO()
+        self.syncer.serialize(out)
+        return out.getvalue()
 
     def sync(self, update_structure=False, conservative=True,
              user=None, skip_missing=False, only_newer=True):
@@ -1411,6 +1632,126 @@ class Store(models.Model, CachedTreeItem, base.TranslationStore):
             newunit.save(revision=update_revision, user=user)
         return newunit
 
+    def add_units(self, units, user=None, update_revision=None):
+        """Adds many new units to the store at once.
+
+        This is the bulk counterpart of `addunit()`: units, their initial
+        submissions and their quality checks are created with a few
+        queries per batch rather than a few queries per unit, and new
+        translations are sent to the TM server in one go.
+
+        :param units: list of `(unit, index)` tuples, where `unit` is a
+            translation unit to be added at position `index`.
+        :param user: user to attribute additions to.
+        :param update_revision: revision to set to the new units. Units
+            that need further syncing share a single new revision.
+        :return: list of created `Unit` objects.
+        """
+        if not units:
+            return []
+
+        if user is None:
+            User = get_user_model()
+            user = User.objects.get_system_user()
+
+        submitted_on = timezone.now()
+        new_units = []
+        for unit, index in units:
+            newunit = self.UnitClass(store=self, index=index)
+            newunit.update(unit, user=user)
+            if newunit._target_updated or newunit.istranslated():
+                newunit.submitted_by = user
+                newunit.submitted_on = submitted_on
+            newunit._log_user = user
+            newunit._save_action = UNIT_ADDED
+            if newunit._source_updated:
+                newunit.update_source_fields()
+            if newunit._target_updated:
+                newunit.update_target_fields()
+            newunit.update_review_fields()
+            new_units.append(newunit)
+
+        # Mirror `Unit.save()`, but allocate a single revision for all the
+        # units requiring one rather than a revision per unit
+        revision = None
+        for newunit in new_units:
+            if update_revision is not None and not newunit._auto_translated:
+                newunit.revision = update_revision
+            elif (newunit._target_updated or
+                  newunit._state_updated or
+                  newunit._comment_updated):
+                if revision is None:
+                    revision = Revision.incr()
+                newunit.revision = revision
+
+        for batch in chunked(new_units, self.BULK_CREATE_BATCH_SIZE):
+            Unit.objects.bulk_create(batch)
+
+        # `bulk_create()` doesn't set primary keys on every DB backend
+        unitid_hashes = [newunit.unitid_hash for newunit in new_units]
+        unit_ids = {}
+        for batch in chunked(unitid_hashes, self.BULK_CREATE_BATCH_SIZE):
+            unit_ids.update(
+                self.unit_set.filter(unitid_hash__in=batch)
+                             .values_list('unitid_hash', 'id')
+            )
+
+        lang_code = self.translation_project.language.code
+        checker = self.translation_project.checker
+        submissions = []
+        checks = []
+        tm_objs = []
+        for newunit in new_units:
+            newunit.id = unit_ids[newunit.unitid_hash]
+            if newunit.state == FUZZY:
+                self.mark_dirty(CachedMethods.WORDCOUNT_STATS)
+
+            action_log(user=user, action=UNIT_ADDED, lang=lang_code,
+                       unit=newunit.id, translation=newunit.target_f,
+                       path=self.pootle_path)
+
+            submission = newunit.get_initial_submission(user=user)
+            if submission is not None:
+                submissions.append(submission)
+
+            if newunit.state != UNTRANSLATED and newunit.target:
+                qc_failures = checker.run_filters(newunit, categorised=True)
+                for name, failure in qc_failures.iteritems():
+                    checks.append(QualityCheck(
+                        unit=newunit,
+                        name=name,
+                        message=failure['message'],
+                        category=failure['category'],
+                    ))
+
+            if newunit.istranslated():
+                tm_objs.append(newunit.get_tmserver_obj())
+
+            newunit.reset_update_flags()
+
+        # Initial submissions never produce score logs, hence there's no
+        # need to go through `Submission.save()`
+        for batch in chunked(submissions, self.BULK_CREATE_BATCH_SIZE):
+            Submission.objects.bulk_create(batch)
+        UserDailyStats.add_submissions(submissions)
+
+        if checks:
+            self.mark_dirty(CachedMethods.CHECKS)
+            for batch in chunked(checks, self.BULK_CREATE_BATCH_SIZE):
+                QualityCheck.objects.bulk_create(batch)
+            Unit.update_filter_counts(set(check.unit_id for check in checks))
+
+        if tm_objs:
+            tm_update_queue.push(lang_code, tm_objs)
+
+        get_text_search_class().index_units(new_units)
+
+        self.mark_dirty(CachedMethods.WORDCOUNT_STATS,
+                        CachedMethods.LAST_UPDATED,
+                        CachedMethods.MTIME)
+
+        return new_units
+
     def findunits(self, source, obsolete=False):
         if not obsolete and hasattr(self, "sourceindex"):
             return super(Store, self).findunits(source)
@@ -1452,6 +1793,11 @@ class Store(models.Model, CachedTreeItem, base.TranslationStore):
     def can_be_updated(self):
         return not self.obsolete
 
+    @classmethod
+    def get_stats_calculator(cls, stores):
+        from .stats import StoreStatsCalculator
+        return StoreStatsCalculator(stores)
+
     def get_parent(self):
         if self.parent.is_translationproject():
             return self.translation_project
@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) Zing contributors.
+#
+# This file is a part of the Zing project. It is distributed under the GPL3
+# or later license. See the LICENSE file for a copy of the license and the
+# AUTHORS file for copyright and authorship information.
+
+"""On-disk cache of parsed translation files, shared by all processes."""
+
+import cPickle as pickle
+import hashlib
+import logging
+import os
+import tempfile
+
+from translate.__version__ import sver as toolkit_version
+
+from django.conf import settings
+
+from .util import get_file_digest
+
+
+#: Bump whenever the format of the cached entries changes
+CACHE_VERSION = 1
+
+
+logger = logging.getLogger(__name__)
+
+
+class ParseCacheStats(object):
+    """Counts lookups in the parse cache."""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        #: Number of files loaded from the cache
+        self.hits = 0
+        #: Number of files which had to be parsed
+        self.misses = 0
+
+    def __repr__(self):
+        return '<ParseCacheStats: %d hits, %d misses>' % (
+            self.hits, self.misses,
+        )
+
+
+stats = ParseCacheStats()
+
+
+def is_enabled():
+    return bool(getattr(settings, 'POOTLE_PARSE_CACHE_DIRECTORY', None))
+
+
+def get_cache_path(path):
+    """Returns the path the parsed file `path` is cached at."""
+    key = hashlib.sha1(os.path.realpath(path)).hexdigest()
+    return os.path.join(settings.POOTLE_PARSE_CACHE_DIRECTORY,
+                        key[:2], key + '.pickle')
+
+
+def get_fingerprint(path):
+    """Returns the fingerprint a cached parse of `path` is valid for."""
+    return (CACHE_VERSION, toolkit_version, get_file_digest(path))
+
+
+def load(path, fingerprint):
+    """Returns the cached translation store for `path`, or `None` if it
+    wasn't cached for the file contents matching `fingerprint`.
+    """
+    try:
+        with open(get_cache_path(path), 'rb') as f:
+            # The fingerprint is pickled on its own so stale entries can
+            # be told without loading the whole store
+            if pickle.load(f) != fingerprint:
+                return None
+            return pickle.load(f)
+    except IOError:
+        return None
+    except Exception:
+        logger.warning(u"Can't load the parse cache for %s", path,
+                       exc_info=True)
+        return None
+
+
+def save(path, fingerprint, store):
+    """Caches the translation `store` parsed from `path`, whose contents
+    match `fingerprint`.
+    """
+    cache_path = get_cache_path(path)
+    cache_dir = os.path.dirname(cache_path)
+    try:
+        try:
+            os.makedirs(cache_dir)
+        except OSError:
+            if not os.path.isdir(cache_dir):
+                raise
+
+        fd, tmp_path = tempfile.mkstemp(dir=cache_dir, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                pickle.dump(fingerprint, f, pickle.HIGHEST_PROTOCOL)
+                pickle.dump(store, f, pickle.HIGHEST_PROTOCOL)
+            # Readers only ever see complete entries
+            os.rename(tmp_path, cache_path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+    except Exception:
+        logger.warning(u"Can't update the parse cache for %s", path,
+                       exc_info=True)
@@ -0,0 +1,198 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) Zing contributors.
+#
+# This file is a part of the Zing project. It is distributed under the GPL3
+# or later license. See the LICENSE file for a copy of the license and the
+# AUTHORS file for copyright and authorship information.
+
+from translate.filters.decorators import Category
+
+from django.db.models import Count, Max, Sum
+
+from pootle.core.mixins import CachedMethods
+from pootle.core.utils import dateformat
+from pootle.core.utils.list import chunked
+from pootle.core.utils.timezone import datetime_min
+from pootle_statistics.models import Submission, SubmissionTypes
+
+from .constants import FUZZY, OBSOLETE, TRANSLATED, UNTRANSLATED
+from .models import QualityCheck, Store, Suggestion, Unit
+from .util import SuggestionStates
+
+
+class StoreStatsCalculator(object):
+    """Calculates the stats of many stores at once.
+
+    Each metric is retrieved for all the stores with a query grouped by
+    store, rather than running a query per store. Values match the ones
+    calculated by the `Store._get_*` methods.
+    """
+
+    #: Maximum number of stores to be included in a single query
+    CHUNK_SIZE = 500
+
+    def __init__(self, stores):
+        """:param stores: iterable of `Store` objects or their IDs."""
+        self.store_ids = sorted(set(
+            store.pk if isinstance(store, Store) else store
+            for store in stores
+        ))
+
+    @classmethod
+    def for_translation_project(cls, translation_project):
+        return cls(Store.objects.live().filter(
+            translation_project=translation_project,
+        ).values_list('id', flat=True))
+
+    @classmethod
+    def for_project(cls, project):
+        return cls(Store.objects.live().filter(
+            translation_project__project=project,
+        ).values_list('id', flat=True))
+
+    def calculate(self, keys=None):
+        """Calculate stats for all stores.
+
+        :param keys: `CachedMethods` names to calculate, all of them if
+            omitted.
+        :return: a dictionary of `{store_id: {key: value}}`.
+        """
+        keys = keys or CachedMethods.get_all()
+        result = {store_id: {} for store_id in self.store_ids}
+        for key in keys:
+            for store_id, value in getattr(self, key)().iteritems():
+                result[store_id][key] = value
+
+        return result
+
+    def _chunks(self):
+        return chunked(self.store_ids, self.CHUNK_SIZE)
+
+    def get_wordcount_stats(self):
+        result = {
+            store_id: {'total': 0, 'translated': 0, 'fuzzy': 0}
+            for store_id in self.store_ids
+        }
+        for store_ids in self._chunks():
+            # XXX: `order_by()` here is important as it removes the default
+            # ordering for units. See #3897 for reference.
+            res = (
+                Unit.objects.filter(store_id__in=store_ids,
+                                    state__gt=OBSOLETE)
+                            .order_by().values('store_id', 'state')
+                            .annotate(wordcount=Sum('source_wordcount'))
+            )
+            for item in res:
+                stats = result[item['store_id']]
+                stats['total'] += item['wordcount']
+                if item['state'] == TRANSLATED:
+                    stats['translated'] = item['wordcount']
+                elif item['state'] == FUZZY:
+                    stats['fuzzy'] = item['wordcount']
+
+        return result
+
+    def get_checks(self):
+        result = {
+            store_id: {'unit_critical_error_count': 0, 'checks': {}}
+            for store_id in self.store_ids
+        }
+        for store_ids in self._chunks():
+            checks = QualityCheck.objects.filter(
+                unit__store_id__in=store_ids, unit__state__gt=UNTRANSLATED,
+                false_positive=False,
+            ).order_by()
+
+            res = (
+                checks.values('unit__store_id', 'name')
+                      .annotate(count=Count('id'))
+            )
+            for item in res:
+                result[item['unit__store_id']]['checks'][item['name']] = \
+                    item['count']
+
+            res = (
+                checks.filter(category=Category.CRITICAL)
+                      .values('unit__store_id')
+                      .annotate(count=Count('unit', distinct=True))
+            )
+            for item in res:
+                result[item['unit__store_id']]['unit_critical_error_count'] = \
+                    item['count']
+
+        return result
+
+    def get_suggestion_count(self):
+        result = dict.fromkeys(self.store_ids, 0)
+        for store_ids in self._chunks():
+            res = (
+                Suggestion.objects.filter(
+                    unit__store_id__in=store_ids, unit__state__gt=OBSOLETE,
+                    state=SuggestionStates.PENDING,
+                ).order_by().values('unit__store_id')
+                 .annotate(count=Count('id'))
+            )
+            for item in res:
+                result[item['unit__store_id']] = item['count']
+
+        return result
+
+    def get_mtime(self):
+        result = dict.fromkeys(self.store_ids, datetime_min)
+        for store_ids in self._chunks():
+            res = (
+                Unit.objects.filter(store_id__in=store_ids)
+                            .order_by().values('store_id')
+                            .annotate(mtime=Max('mtime'))
+            )
+            for item in res:
+                if item['mtime'] is not None:
+                    result[item['store_id']] = item['mtime']
+
+        return result
+
+    def get_last_updated(self):
+        result = dict.fromkeys(self.store_ids, 0)
+        for store_ids in self._chunks():
+            res = (
+                Unit.objects.filter(store_id__in=store_ids)
+                            .order_by().values('store_id')
+                            .annotate(creation_time=Max('creation_time'))
+            )
+            for item in res:
+                if item['creation_time'] is not None:
+                    result[item['store_id']] = int(
+                        dateformat.format(item['creation_time'], 'U'))
+
+        return result
+
+    def get_last_action(self):
+        result = {store_id: {'mtime': 0} for store_id in self.store_ids}
+        for store_ids in self._chunks():
+            submissions = (
+                Submission.simple_objects.filter(store_id__in=store_ids)
+                                         .exclude(type=SubmissionTypes.UNIT_CREATE)
+            )
+            latest = dict(
+                submissions.order_by().values('store_id')
+                           .annotate(latest=Max('creation_time'))
+                           .values_list('store_id', 'latest')
+            )
+            if not latest:
+                continue
+
+            latest_subs = {}
+            candidates = submissions.filter(
+                creation_time__in=set(latest.values()),
+            ).select_related(
+                'unit', 'quality_check', 'submitter', 'suggestion__reviewer',
+            )
+            for sub in candidates.iterator():
+                if sub.creation_time == latest[sub.store_id]:
+                    latest_subs[sub.store_id] = sub
+
+            for store_id, sub in latest_subs.iteritems():
+                result[store_id] = sub.get_submission_info()
+
+        return result
@@ -9,6 +9,8 @@
 
 import logging
 import os
+import shutil
+from itertools import chain
 
 from translate.storage import poheader
 from translate.storage.factory import getclass
@@ -20,10 +22,12 @@ from django.utils.functional import cached_property
 from pootle.core.log import log
 from pootle.core.mixins import CachedMethods
 from pootle.core.url_helpers import split_pootle_path
+from pootle.core.utils import ptempfile as tempfile
 from pootle.core.utils.timezone import datetime_min
 from pootle.core.utils.version import get_major_minor_version
 from pootle_statistics.models import Submission
 
+from .constants import FUZZY, OBSOLETE
 from .util import get_change_str
 
 
@@ -120,8 +124,57 @@ class UnitSyncer(object):
         newunit.setid(self.unitid)
 
 
+class UnitValuesSyncer(UnitSyncer):
+    """Converts units retrieved with `values()`, sparing the creation of
+    `Unit` instances.
+    """
+
+    #: Unit fields required for the conversion
+    fields = (
+        'unitid', 'source_f', 'target_f', 'state', 'context', 'locations',
+        'developer_comment', 'translator_comment',
+    )
+
+    @property
+    def context(self):
+        return self.unit['context']
+
+    @property
+    def developer_notes(self):
+        return self.unit['developer_comment'] or ''
+
+    @property
+    def isfuzzy(self):
+        return self.unit['state'] == FUZZY
+
+    @property
+    def isobsolete(self):
+        return self.unit['state'] == OBSOLETE
+
+    @property
+    def locations(self):
+        return filter(None, (self.unit['locations'] or '').split('\n'))
+
+    @property
+    def source(self):
+        return self.unit['source_f']
+
+    @property
+    def target(self):
+        return self.unit['target_f']
+
+    @property
+    def translator_notes(self):
+        return self.unit['translator_comment'] or ''
+
+    @property
+    def unitid(self):
+        return self.unit['unitid']
+
+
 class StoreSyncer(object):
     unit_sync_class = UnitSyncer
+    unit_values_sync_class = UnitValuesSyncer
 
     def __init__(self, store):
         self.store = store
@@ -166,6 +219,12 @@ class StoreSyncer(object):
     def file_class(self):
         return self._getclass(self.store)
 
+    def create_output(self, fileclass=None):
+        """Returns a new, empty translation store of `fileclass`."""
+        output = (fileclass or self.file_class)()
+        output.settargetlanguage(self.language.code)
+        return output
+
     def convert(self, fileclass=None):
         """export to fileclass"""
         fileclass = fileclass or self.file_class
@@ -173,14 +232,34 @@ class StoreSyncer(object):
             u"Converting %s to %s",
             self.store.pootle_path,
             fileclass)
-        output = fileclass()
-        output.settargetlanguage(self.language.code)
+        output = self.create_output(fileclass)
         # FIXME: we should add some headers
         for unit in self.store.units.iterator():
             output.addunit(
                 self.unit_sync_class(unit).convert(output.UnitClass))
         return output
 
+    def convert_units(self, unitclass):
+        """Yields the store's units converted to `unitclass`, reading them
+        from the DB as they are consumed.
+        """
+        units = self.store.units.values(
+            *self.unit_values_sync_class.fields).iterator()
+        for unit in units:
+            yield self.unit_values_sync_class(unit).convert(unitclass)
+
+    def serialize(self, out, output=None):
+        """Writes the store's units as a file to `out`.
+
+        :param output: the translation store to add the units to, as
+            returned by `create_output()`.
+        """
+        if output is None:
+            output = self.create_output()
+        for unit in self.convert_units(output.UnitClass):
+            output.addunit(unit)
+        output.serialize(out)
+
     def _getclass(self, obj):
         try:
             return getclass(obj)
@@ -231,15 +310,20 @@ class StoreSyncer(object):
 
     def create_store_file(self, last_revision, user):
         logging.debug(u"Creating file %s", self.store.pootle_path)
-        store = self.convert()
         if not os.path.exists(os.path.dirname(self.store_file_path)):
             os.makedirs(os.path.dirname(self.store_file_path))
         self.store.file = self.relative_file_path
-        store.savefile(self.store_file_path)
+
+        # Headers are set up front, so that units can be written as they
+        # are read from the DB
+        output = self.create_output()
+        self.update_store_header(user=user, disk_store=output)
+        tmpfile, tmpfilename = tempfile.mkstemp(suffix=self.store.name)
+        with os.fdopen(tmpfile, 'wb') as f:
+            self.serialize(f, output=output)
+        shutil.move(tmpfilename, self.store_file_path)
         log(u"Created file for %s [revision: %d]" %
             (self.store.pootle_path, last_revision))
-        self.update_store_header(user=user)
-        self.store.file.savestore()
         self.store.file_mtime = self.store.get_file_mtime()
         self.store.last_sync_revision = last_revision
         self.store.save()
@@ -360,9 +444,11 @@ class StoreSyncer(object):
                     updated += 1
         return updated
 
-    def update_store_header(self, **kwargs_):
-        self.disk_store.settargetlanguage(self.language.code)
-        self.disk_store.setsourcelanguage(self.source_language.code)
+    def update_store_header(self, disk_store=None, **kwargs_):
+        if disk_store is None:
+            disk_store = self.disk_store
+        disk_store.settargetlanguage(self.language.code)
+        disk_store.setsourcelanguage(self.source_language.code)
 
 
 class PoStoreSyncer(StoreSyncer):
@@ -413,19 +499,23 @@ class PoStoreSyncer(StoreSyncer):
         )
         return headerupdates
 
-    def update_po_headers(self, mtime, user_displayname, user_email):
-        self.disk_store.updateheader(
+    def update_po_headers(self, mtime, user_displayname, user_email,
+                          disk_store=None):
+        if disk_store is None:
+            disk_store = self.disk_store
+        disk_store.updateheader(
             add=True,
             **self.get_po_headers(mtime, user_displayname, user_email)
         )
         if self.language.nplurals and self.language.pluralequation:
-            self.disk_store.updateheaderplural(
+            disk_store.updateheaderplural(
                 self.language.nplurals,
                 self.language.pluralequation
             )
 
-    def update_store_header(self, **kwargs):
-        super(PoStoreSyncer, self).update_store_header(**kwargs)
+    def update_store_header(self, disk_store=None, **kwargs):
+        super(PoStoreSyncer, self).update_store_header(
+            disk_store=disk_store, **kwargs)
         user = kwargs.get("user")
         mtime = self.store.get_cached_value(CachedMethods.MTIME)
         if mtime is None or mtime == datetime_min:
@@ -439,4 +529,17 @@ class PoStoreSyncer(StoreSyncer):
         elif user.is_authenticated:
             user_displayname = user.display_name
             user_email = user.email
-        self.update_po_headers(mtime, user_displayname, user_email)
+        self.update_po_headers(mtime, user_displayname, user_email,
+                               disk_store=disk_store)
+
+    def serialize(self, out, output=None):
+        """Writes the store's units as a PO file to `out`, one unit at a
+        time, as `pofile.serialize()` would.
+        """
+        if output is None:
+            output = self.create_output()
+        units = chain(output.units, self.convert_units(output.UnitClass))
+        for i, unit in enumerate(units):
+            if i:
+                out.write(b'\n')
+            out.write(unit._getoutput().encode(output.encoding))
@@ -6,7 +6,12 @@
 # or later license. See the LICENSE file for a copy of the license and the
 # AUTHORS file for copyright and authorship information.
 
+from django.core.cache import cache
+
+from pootle.core.utils.aggregate import max_column
+from pootle.core.utils.list import chunked
 from pootle.i18n.gettext import language_dir
+from pootle_store.constants import TRANSLATED
 from pootle_store.templatetags.store_tags import pluralize_target
 
 from .proxy import UnitProxy
@@ -60,3 +65,106 @@ class AltSrcUnits(object):
     @property
     def units(self):
         return [AltSrcUnitProxy(x) for x in self.qs.values(*self.fields)]
+
+
+class AltSrcFinder(object):
+    """Finds alternative sources for many units of a store at once.
+
+    Alternative sources of a unit are its translations into other
+    languages of the same project, i.e. translated units with the same
+    `unitid_hash` living in the stores with the same path in other
+    translation projects. Results are cached until any unit of the
+    alternative source stores changes.
+    """
+
+    #: Seconds results are kept in the cache
+    CACHE_TIMEOUT = 60 * 60
+
+    #: Maximum number of units to look up in a single query
+    CHUNK_SIZE = 500
+
+    def __init__(self, store, languages):
+        """:param languages: alternative source languages."""
+        self.store = store
+        self.language_codes = sorted(
+            language.code for language in languages
+        )
+
+    @property
+    def alt_pootle_paths(self):
+        project_code = self.store.translation_project.project.code
+        return [
+            '/%s/%s/%s' % (language_code, project_code, self.store.path)
+            for language_code in self.language_codes
+        ]
+
+    def get_revision(self):
+        """Returns the latest revision of the alternative source units."""
+        from pootle_store.models import Unit
+
+        return max_column(
+            Unit.objects.filter(store__pootle_path__in=self.alt_pootle_paths),
+            'revision', 0,
+        )
+
+    def get_cache_key(self, revision, unitid_hash):
+        return 'altsrcs:%s:%s:%s:%s' % (
+            self.store.pk, ','.join(self.language_codes), revision,
+            unitid_hash,
+        )
+
+    def find(self, units):
+        """Finds the alternative sources of `units`.
+
+        :param units: `Unit`s belonging to the store.
+        :return: a dictionary of `{unit_id: [AltSrcUnitProxy, ...]}`.
+        """
+        if not self.language_codes:
+            return {unit.id: [] for unit in units}
+
+        revision = self.get_revision()
+        cache_keys = {
+            unit.unitid_hash: self.get_cache_key(revision, unit.unitid_hash)
+            for unit in units
+        }
+        cached = cache.get_many(cache_keys.values())
+
+        values = {}
+        missing = []
+        for unitid_hash, cache_key in cache_keys.iteritems():
+            if cache_key in cached:
+                values[unitid_hash] = cached[cache_key]
+            else:
+                missing.append(unitid_hash)
+
+        if missing:
+            found = self.find_values(missing)
+            values.update(found)
+            cache.set_many({
+                cache_keys[unitid_hash]: found[unitid_hash]
+                for unitid_hash in missing
+            }, self.CACHE_TIMEOUT)
+
+        return {
+            unit.id: [AltSrcUnitProxy(x) for x in values[unit.unitid_hash]]
+            for unit in units
+        }
+
+    def find_values(self, unitid_hashes):
+        """Retrieves the values of the alternative source units matching
+        `unitid_hashes`, looking alternative stores up by their path.
+        """
+        from pootle_store.models import Unit
+
+        result = {unitid_hash: [] for unitid_hash in unitid_hashes}
+        fields = AltSrcUnits.fields | {'unitid_hash'}
+        for chunk in chunked(unitid_hashes, self.CHUNK_SIZE):
+            altsrcs_qs = Unit.objects.filter(
+                store__pootle_path__in=self.alt_pootle_paths,
+                unitid_hash__in=chunk,
+                state=TRANSLATED,
+            ).order_by('store__translation_project__language__code')
+            for values in altsrcs_qs.values(*fields):
+                result[values.pop('unitid_hash')].append(values)
+
+        return result
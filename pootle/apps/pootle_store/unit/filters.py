@@ -7,8 +7,12 @@
 # or later license. See the LICENSE file for a copy of the license and the
 # AUTHORS file for copyright and authorship information.
 
+from translate.filters.decorators import Category
+
+from django.conf import settings
 from django.db.models import Q
 
+from pootle_misc.util import import_func
 from pootle_statistics.models import SubmissionTypes
 from pootle_store.constants import FUZZY, TRANSLATED, UNTRANSLATED
 from pootle_store.util import SuggestionStates
@@ -39,19 +43,22 @@ class UnitChecksFilter(BaseUnitFilter):
         self.category = kwargs.get("category")
 
     def filter_checks(self):
+        # Only units with active checks need to be joined with them
+        qs = self.qs.filter(check_count__gt=0)
         if self.checks:
-            return self.qs.filter(
+            return qs.filter(
                 qualitycheck__false_positive=False,
                 qualitycheck__name__in=self.checks).distinct()
 
+        if self.category == Category.CRITICAL:
+            return self.qs.filter(critical_check_count__gt=0)
+
         if self.category:
-            return self.qs.filter(
+            return qs.filter(
                 qualitycheck__false_positive=False,
                 qualitycheck__category=self.category).distinct()
 
-        return self.qs.filter(
-            qualitycheck__false_positive=False,
-        ).distinct()
+        return qs
 
 
 class UnitStateFilter(BaseUnitFilter):
@@ -82,13 +89,13 @@ class UnitContributionFilter(BaseUnitFilter):
         self.user = kwargs.get("user")
 
     def filter_suggestions(self):
-        return self.qs.filter(
-            suggestion__state=SuggestionStates.PENDING).distinct()
+        return self.qs.filter(suggestion_count__gt=0)
 
     def filter_user_suggestions(self):
         if not self.user:
             return self.qs.none()
         return self.qs.filter(
+            suggestion_count__gt=0,
             suggestion__user=self.user,
             suggestion__state=SuggestionStates.PENDING).distinct()
 
@@ -147,8 +154,19 @@ class UnitSearchFilter(object):
         return qs.none()
 
 
+def get_text_search_class():
+    """Returns the unit text search backend set in
+    `POOTLE_UNIT_TEXT_SEARCH`.
+    """
+    return import_func(settings.POOTLE_UNIT_TEXT_SEARCH)
+
+
 class UnitTextSearch(object):
     """Search Unit's fields for text strings
+
+    Fields are scanned for each of the words, which doesn't need any
+    index. Subclasses can narrow the scan down using an index, as long as
+    the matching units are the same.
     """
 
     search_fields = (
@@ -162,6 +180,16 @@ class UnitTextSearch(object):
     def __init__(self, qs):
         self.qs = qs
 
+    @classmethod
+    def create_indexes(cls):
+        """Creates the DB indexes searches rely on, if any."""
+        pass
+
+    @classmethod
+    def index_units(cls, units):
+        """Updates the index for the text of `units`, if any."""
+        pass
+
     def get_search_fields(self, sfields):
         search_fields = set()
         for field in sfields:
@@ -7,16 +7,25 @@
 # or later license. See the LICENSE file for a copy of the license and the
 # AUTHORS file for copyright and authorship information.
 
-from django.db.models import Max
+from hashlib import md5
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Max, Q
+from django.utils.encoding import force_bytes
 from django.utils.functional import cached_property
 
+from pootle.core.models import Revision
 from pootle_store.constants import SIMPLY_SORTED
 from pootle_store.models import Unit
-from pootle_store.unit.filters import UnitSearchFilter, UnitTextSearch
+from pootle_store.unit.filters import UnitSearchFilter, get_text_search_class
 
 
 MAX_RESULTS = 500
 
+#: Search arguments which don't affect the set of matching units
+NON_FILTER_KWARGS = ('uid', 'uids', 'headers', 'initial')
+
 
 class DBSearchBackend(object):
 
@@ -119,7 +128,7 @@ class DBSearchBackend(object):
                     submitted_on__lte=month[1]).distinct()
 
         if sfields and search:
-            qs = UnitTextSearch(qs).search(
+            qs = get_text_search_class()(qs).search(
                 search, sfields, exact=exact)
         return qs
 
@@ -127,16 +136,85 @@ class DBSearchBackend(object):
     def results(self):
         return self.sort_qs(self.filter_qs(self.units_qs))
 
+    @property
+    def is_default_ordered(self):
+        """Whether results are sorted by the default order, which allows
+        paginating them by ranges over `default_order` fields.
+        """
+        return not (self.unit_filter and self.sort_by is not None)
+
+    @property
+    def total_cache_key(self):
+        """Cache key for the total of results, which is tied to the
+        current revision and filter counts version so that it's invalidated
+        whenever units, their suggestions or their checks change.
+        """
+        signature = repr(sorted(
+            (key, value) for key, value in self.kwargs.iteritems()
+            if key not in NON_FILTER_KWARGS
+        ))
+        return 'unit_search:total:%s:%s:%s:%s' % (
+            self.request_user.pk,
+            Revision.get(),
+            Unit.get_filter_counts_version(),
+            md5(force_bytes(signature)).hexdigest(),
+        )
+
+    def get_total(self):
+        key = self.total_cache_key
+        total = cache.get(key)
+        if total is None:
+            total = self.results.count()
+            cache.set(key, total, settings.POOTLE_CACHE_TIMEOUT)
+
+        return total
+
     def search(self):
-        total = self.results.count()
+        total = self.get_total()
 
         start = 0
         end = min(MAX_RESULTS, total)
 
         return total, start, end, self.results[start:end]
 
+    def get_uid_window(self, total):
+        """Retrieves the window of results around `self.uid` by means of
+        range queries on the default order fields, avoiding scanning all
+        preceding results.
+
+        :return: a `(begin, end, uids)` tuple, or `None` if the unit is not
+            part of the results.
+        """
+        try:
+            pootle_path, index = self.results.filter(pk=self.uid).values_list(
+                'store__pootle_path', 'index',
+            )[0]
+        except IndexError:
+            return None
+
+        preceding = Q(store__pootle_path__lt=pootle_path) | Q(
+            store__pootle_path=pootle_path, index__lt=index,
+        )
+        position = self.results.filter(preceding).count()
+
+        begin = max(position - MAX_RESULTS / 2, 0)
+        end = min(begin + MAX_RESULTS, total)
+
+        before = list(
+            self.results.filter(preceding)
+                        .order_by('-store__pootle_path', '-index')
+                        .values_list('pk', 'store_id')[:position - begin]
+        )
+        before.reverse()
+        after = list(
+            self.results.exclude(preceding)
+                        .values_list('pk', 'store_id')[:end - position]
+        )
+
+        return begin, end, before + after
+
     def get_uids(self):
-        total = self.results.count()
+        total = self.get_total()
 
         begin = 0
         end = min(MAX_RESULTS, total)
@@ -152,13 +230,20 @@ class DBSearchBackend(object):
             self.project_code and
             self.filename and
             self.uid):
-            # find the uid in the Store
-            uid_results = list(self.results.values_list('pk', 'store_id'))
-            uid_list = [result[0] for result in uid_results]
-            if self.uid in uid_list:
-                begin = max(uid_list.index(self.uid) - MAX_RESULTS / 2, 0)
-                end = min(begin + MAX_RESULTS, total)
-                uids = uid_results[begin:end]
+            if self.is_default_ordered:
+                window = self.get_uid_window(total)
+                if window is not None:
+                    begin, end, uids = window
+            else:
+                # find the uid in the Store
+                uid_results = list(self.results.values_list('pk',
+                                                            'store_id'))
+                uid_list = [result[0] for result in uid_results]
+                if self.uid in uid_list:
+                    begin = max(uid_list.index(self.uid) - MAX_RESULTS / 2,
+                                0)
+                    end = min(begin + MAX_RESULTS, total)
+                    uids = uid_results[begin:end]
 
         if not uids:
             uids = list(self.results[begin:end].values_list('pk', 'store_id'))
@@ -0,0 +1,224 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) Zing contributors.
+#
+# This file is a part of the Zing project. It is distributed under the GPL3
+# or later license. See the LICENSE file for a copy of the license and the
+# AUTHORS file for copyright and authorship information.
+
+import re
+import unicodedata
+
+from django.db import IntegrityError, connection, transaction
+from django.utils.encoding import force_text
+
+from pootle.core.utils.list import chunked
+from pootle_store.models import SearchToken, Unit, UnitSearchToken
+from pootle_store.unit.filters import UnitTextSearch
+
+
+WORD_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def get_tokens(text):
+    """Returns the lowercased words in `text`, with accents stripped.
+
+    Any substring of a word in `text` is also a substring of one of
+    the tokens, which allows using tokens to find candidate matches for
+    `icontains` lookups, even if the DB collation ignores accents.
+    """
+    if not text:
+        return []
+
+    text = unicodedata.normalize('NFKD', force_text(text).lower())
+    text = u''.join(char for char in text if not unicodedata.combining(char))
+    return WORD_RE.findall(text)
+
+
+class FullTextUnitSearch(UnitTextSearch):
+    """Search Unit's fields with the help of the DB full-text indexes
+
+    On PostgreSQL the `icontains` lookups are served by the trigram
+    indexes created for the search fields, so queries are left as is. On
+    MySQL, units are narrowed down with the n-gram `FULLTEXT` indexes of
+    the search fields before being scanned.
+    """
+
+    #: Shortest word MySQL's n-gram parser can find (`ngram_token_size`)
+    NGRAM_SIZE = 2
+
+    @staticmethod
+    def get_index_name(field):
+        return 'pootle_store_unit_%s_search' % field
+
+    @classmethod
+    def create_indexes(cls):
+        """Creates the full-text indexes of the search fields which don't
+        exist yet.
+
+        On PostgreSQL this requires the `pg_trgm` extension, which is
+        created unless it already is, and needs superuser rights.
+        """
+        qn = connection.ops.quote_name
+        table = Unit._meta.db_table
+
+        with connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                cursor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+                cursor.execute(
+                    "SELECT relname FROM pg_class WHERE relkind = 'i'")
+                existing = set(row[0] for row in cursor.fetchall())
+                sql = ('CREATE INDEX %(index)s ON %(table)s '
+                       'USING gin (UPPER(%(field)s) gin_trgm_ops)')
+            elif (connection.vendor == 'mysql' and
+                  connection.mysql_version >= (5, 7, 6)):
+                # The n-gram parser is only available since MySQL 5.7.6
+                cursor.execute('SHOW INDEX FROM %s' % qn(table))
+                existing = set(row[2] for row in cursor.fetchall())
+                sql = ('ALTER TABLE %(table)s ADD FULLTEXT INDEX '
+                       '%(index)s (%(field)s) WITH PARSER ngram')
+            else:
+                return
+
+            for field in cls.search_fields:
+                index_name = cls.get_index_name(field)
+                if index_name in existing:
+                    continue
+                cursor.execute(sql % {
+                    'index': qn(index_name),
+                    'table': qn(table),
+                    'field': qn(field),
+                })
+
+    def search_field(self, k, words):
+        subresult = super(FullTextUnitSearch, self).search_field(k, words)
+        if connection.vendor != 'mysql':
+            return subresult
+
+        # Phrases match the word's n-grams in a row, so every unit
+        # containing the word also matches the phrase
+        phrases = [
+            '+"%s"' % token
+            for word in words
+            for token in get_tokens(word)
+            if len(token) >= self.NGRAM_SIZE
+        ]
+        if not phrases:
+            return subresult
+
+        column = '%s.%s' % (connection.ops.quote_name(Unit._meta.db_table),
+                            connection.ops.quote_name(k))
+        return subresult.extra(
+            where=['MATCH (%s) AGAINST (%%s IN BOOLEAN MODE)' % column],
+            params=[' '.join(phrases)],
+        )
+
+
+class InvertedIndexUnitSearch(UnitTextSearch):
+    """Search Unit's fields with the help of an inverted index
+
+    Tokens found in each search field are stored in the DB and updated
+    as units are saved. Searches look up the (much smaller) set of
+    tokens containing the search words and only scan the units these
+    tokens belong to.
+    """
+
+    #: Maximum number of units to be indexed in a single query
+    CHUNK_SIZE = 500
+
+    #: Tokens longer than this are indexed as overlapping chunks of
+    #: `SearchToken.MAX_LENGTH` characters, which contain any of their
+    #: substrings of up to this length
+    MAX_SEARCH_LENGTH = SearchToken.MAX_LENGTH / 2
+
+    @classmethod
+    def get_field_tokens(cls, value):
+        tokens = set()
+        for token in get_tokens(value):
+            if len(token) <= SearchToken.MAX_LENGTH:
+                tokens.add(token)
+                continue
+
+            for i in range(0, len(token) - cls.MAX_SEARCH_LENGTH,
+                           cls.MAX_SEARCH_LENGTH):
+                tokens.add(token[i:i + SearchToken.MAX_LENGTH])
+
+        return tokens
+
+    @classmethod
+    def get_token_ids(cls, texts):
+        """Returns a dictionary of `{text: token_id}`, adding the tokens
+        which are not in the DB yet.
+        """
+        token_ids = {}
+        for batch in chunked(sorted(texts), cls.CHUNK_SIZE):
+            token_ids.update(
+                SearchToken.objects.filter(text__in=batch)
+                                   .values_list('text', 'id')
+            )
+
+        missing = texts - set(token_ids)
+        if not missing:
+            return token_ids
+
+        try:
+            with transaction.atomic():
+                SearchToken.objects.bulk_create(
+                    [SearchToken(text=text) for text in missing]
+                )
+        except IntegrityError:
+            # Some of the tokens were added concurrently
+            for text in missing:
+                SearchToken.objects.get_or_create(text=text)
+
+        # `bulk_create()` doesn't set primary keys on every DB backend
+        for batch in chunked(sorted(missing), cls.CHUNK_SIZE):
+            token_ids.update(
+                SearchToken.objects.filter(text__in=batch)
+                                   .values_list('text', 'id')
+            )
+        return token_ids
+
+    @classmethod
+    def index_units(cls, units):
+        for batch in chunked([unit for unit in units if unit.id],
+                             cls.CHUNK_SIZE):
+            unit_tokens = []
+            for unit in batch:
+                for field, name in enumerate(cls.search_fields):
+                    # Index the value as stored in the DB, which is what
+                    # the text is matched against
+                    value = Unit._meta.get_field(name).get_prep_value(
+                        getattr(unit, name))
+                    for text in cls.get_field_tokens(value):
+                        unit_tokens.append((unit.id, field, text))
+
+            token_ids = cls.get_token_ids(
+                set(text for unit_id_, field_, text in unit_tokens)
+            )
+            UnitSearchToken.objects.filter(
+                unit_id__in=[unit.id for unit in batch],
+            ).delete()
+            UnitSearchToken.objects.bulk_create([
+                UnitSearchToken(unit_id=unit_id, field=field,
+                                token_id=token_ids[text])
+                for unit_id, field, text in unit_tokens
+            ])
+
+    def search_field(self, k, words):
+        subresult = super(InvertedIndexUnitSearch, self).search_field(
+            k, words)
+        field = self.search_fields.index(k)
+        for word in words:
+            for token in get_tokens(word):
+                if len(token) > self.MAX_SEARCH_LENGTH:
+                    # Not all of the units containing it can be found
+                    continue
+
+                subresult = subresult.filter(
+                    id__in=UnitSearchToken.objects.filter(
+                        field=field,
+                        token__text__contains=token,
+                    ).values('unit_id')
+                )
+        return subresult
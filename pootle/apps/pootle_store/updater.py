@@ -303,11 +303,9 @@ class StoreUpdater(object):
             self.target_store.update_index(start=start, delta=delta)
 
         # Add new units
-        for unit, new_unit_index in to_change["add"]:
-            self.target_store.addunit(
-                unit, new_unit_index, user=user,
-                update_revision=update_revision,
-            )
+        self.target_store.add_units(
+            to_change["add"], user=user, update_revision=update_revision,
+        )
         changes["added"] = len(to_change["add"])
 
         # Obsolete units
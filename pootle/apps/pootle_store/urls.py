@@ -36,6 +36,9 @@ urlpatterns = [
     url(r'^xhr/units/?$',
         views.get_units,
         name='pootle-xhr-units'),
+    url(r'^xhr/units/tm/prefetch/?$',
+        views.prefetch_tm_suggestions,
+        name='pootle-xhr-units-tm-prefetch'),
     url(r'^xhr/units/(?P<uid>[0-9]+)/?$',
         views.submit,
         name='pootle-xhr-units-submit'),
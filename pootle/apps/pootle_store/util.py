@@ -7,12 +7,16 @@
 # or later license. See the LICENSE file for a copy of the license and the
 # AUTHORS file for copyright and authorship information.
 
+import datetime
+import hashlib
 import os
 
 from django.conf import settings
 
-from .constants import STATES_NAMES, TRANSLATED
-from .unit.altsrc import AltSrcUnits
+from pootle.core.utils.timezone import make_aware
+
+from .constants import STATES_NAMES
+from .unit.altsrc import AltSrcFinder
 
 
 class SuggestionStates(object):
@@ -30,6 +34,25 @@ def add_trailing_slash(path):
         return path + os.sep
 
 
+def get_mtime_datetime(mtime):
+    """Returns the aware datetime for the file modification time `mtime`,
+    as stored in `Store.file_mtime`.
+    """
+    disk_mtime = datetime.datetime.fromtimestamp(mtime)
+    # set microsecond to 0 for comparing with a time value without
+    # microseconds
+    return make_aware(disk_mtime.replace(microsecond=0))
+
+
+def get_file_digest(filename):
+    """Returns the SHA-1 hex digest of the contents of `filename`."""
+    digest = hashlib.sha1()
+    with open(filename, 'rb') as f:
+        for chunk in iter(lambda: f.read(65536), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
 def relative_real_path(p):
     if p.startswith(settings.POOTLE_TRANSLATION_DIRECTORY):
         return p[len(add_trailing_slash(
@@ -45,27 +68,12 @@ def absolute_real_path(p):
         return p
 
 
-def find_altsrcs(unit, alt_src_langs, store=None, project=None):
-    from pootle_store.models import Unit
-
+def find_altsrcs(unit, alt_src_langs, store=None):
     if not alt_src_langs:
         return []
 
     store = store or unit.store
-    project = project or store.translation_project.project
-
-    language_regex = '(%s)' % '|'.join([x.code for x in alt_src_langs])
-    pootle_path = "/%s/%s/%s$" % (language_regex, project.code, store.path)
-
-    altsrcs_qs = Unit.objects.filter(
-        unitid_hash=unit.unitid_hash,
-        store__pootle_path__regex=pootle_path,
-        store__translation_project__project=project,
-        store__translation_project__language__in=alt_src_langs,
-        state=TRANSLATED,
-    )
-
-    return AltSrcUnits(altsrcs_qs).units
+    return AltSrcFinder(store, alt_src_langs).find([unit])[unit.id]
 
 
 def get_change_str(changes):
@@ -8,6 +8,7 @@
 # AUTHORS file for copyright and authorship information.
 
 import copy
+from collections import OrderedDict
 
 from translate.lang import data
 
@@ -47,7 +48,8 @@ from pootle_translationproject.views import TPBrowseStoreView, TPBrowseView
 from .decorators import get_unit_context
 from .forms import (UnitSearchForm, UnitViewRowsForm,
                     unit_comment_form_factory, unit_form_factory)
-from .models import Unit
+from .models import Unit, create_prefetch_tm_suggestions_job
+from .unit.altsrc import AltSrcFinder
 from .unit.results import CtxRowResults, ViewRowResults
 from .unit.timeline import Timeline
 from .util import find_altsrcs
@@ -55,6 +57,8 @@ from .util import find_altsrcs
 
 # The amount of TM results that will be provided
 MAX_TM_RESULTS = 3
+#: Maximum number of units whose TM suggestions can be prefetched at once
+MAX_TM_PREFETCH = 10
 
 
 def get_alt_src_langs(request, user, translation_project):
@@ -118,6 +122,25 @@ def _get_critical_checks_snippet(request, unit):
     return template.render(context=ctx, request=request)
 
 
+def preload_alt_srcs(request, units):
+    """Caches the alternative sources of `units` in bulk, so they are
+    readily available when units are opened in the editor.
+    """
+    units_by_store = OrderedDict()
+    for unit in units.only('id', 'unitid_hash', 'store'):
+        units_by_store.setdefault(unit.store, []).append(unit)
+
+    alt_src_langs = {}
+    for store, store_units in units_by_store.iteritems():
+        tp = store.translation_project
+        if tp.id not in alt_src_langs:
+            alt_src_langs[tp.id] = list(
+                get_alt_src_langs(request, request.user, tp)
+            )
+        if alt_src_langs[tp.id]:
+            AltSrcFinder(store, alt_src_langs[tp.id]).find(store_units)
+
+
 @ajax_required
 def get_uids(request):
     """Gets all uids based on search criteria
@@ -183,10 +206,40 @@ def get_units(request):
     units = search_backend.get(Unit)(
         request.user, **form.cleaned_data
     ).get_units()
+    preload_alt_srcs(request, units)
 
     return JsonResponse(ViewRowResults(units, form.cleaned_data['headers']).data)
 
 
+@ajax_required
+def prefetch_tm_suggestions(request):
+    """Warms up the TM suggestions cache for the given units in the
+    background, so they are readily available once the units are opened.
+
+    :return: A JSON-encoded string containing the list of uids whose TM
+        suggestions are being prefetched.
+    """
+    form = UnitViewRowsForm(request.GET, user=request.user)
+
+    if not form.is_valid():
+        errors = form.errors.as_data()
+        if 'uids' in errors:
+            for error in errors['uids']:
+                if error.code in ['invalid', 'required']:
+                    raise Http400(error.message)
+        raise Http404(forms.ValidationError(form.errors).messages)
+
+    uids = list(
+        Unit.objects.get_translatable(request.user).filter(
+            id__in=form.cleaned_data['uids'][:MAX_TM_PREFETCH],
+        ).values_list('id', flat=True)
+    )
+    if uids:
+        create_prefetch_tm_suggestions_job(uids)
+
+    return JsonResponse({'uids': uids})
+
+
 @ajax_required
 @get_unit_context('view')
 def get_context_units(request, unit):
@@ -410,13 +463,12 @@ class UnitEditJSON(PootleUnitJSON):
         comment_form_class = unit_comment_form_factory(self.language)
         return comment_form_class({}, instance=self.object, request=self.request)
 
-    @lru_cache()
-    def get_alt_srcs(self):
+    @cached_property
+    def alt_srcs(self):
         return find_altsrcs(
             self.object,
             get_alt_src_langs(self.request, self.request.user, self.tp),
-            store=self.store,
-            project=self.project)
+            store=self.store)
 
     def get_queryset(self):
         return Unit.objects.get_translatable(self.request.user).select_related(
@@ -431,7 +483,7 @@ class UnitEditJSON(PootleUnitJSON):
     def get_sources(self):
         sources = {
             unit.language_code: unit.target.strings
-            for unit in self.get_alt_srcs()}
+            for unit in self.alt_srcs}
         sources[self.source_language.code] = self.object.source_f.strings
         return sources
 
@@ -448,20 +500,25 @@ class UnitEditJSON(PootleUnitJSON):
             'source_language': self.source_language,
             'cantranslate': check_user_permission(self.request.user,
                                                   "translate",
-                                                  self.directory),
+                                                  self.directory,
+                                                  request=self.request),
             'cantranslatexlang': check_user_permission(self.request.user,
                                                        "administrate",
-                                                       self.project.directory),
+                                                       self.project.directory,
+                                                       request=self.request),
             'cansuggest': check_user_permission(self.request.user,
                                                 "suggest",
-                                                self.directory),
+                                                self.directory,
+                                                request=self.request),
             'canreview': check_user_permission(self.request.user,
                                                "review",
-                                               self.directory),
+                                               self.directory,
+                                               request=self.request),
             'has_admin_access': check_user_permission(self.request.user,
                                                       'administrate',
-                                                      self.directory),
-            'altsrcs': {x.id: x.data for x in self.get_alt_srcs()},
+                                                      self.directory,
+                                                      request=self.request),
+            'altsrcs': {x.id: x.data for x in self.alt_srcs},
             'unit_values': self.get_unit_values(),
             'target_nplurals': self.get_target_nplurals(),
             'has_plurals': self.object.hasplural(),
@@ -8,6 +8,7 @@
 # AUTHORS file for copyright and authorship information.
 
 import logging
+import os
 
 from translate.misc.lru import LRUCachingDict
 
@@ -18,10 +19,11 @@ from django.dispatch import receiver
 from django.urls import reverse
 from django.utils.functional import cached_property
 
-from pootle.core.mixins import CachedMethods, CachedTreeItem
+from pootle.core.mixins import CachedMethods, CachedTreeItem, stats_batch
 from pootle.core.url_helpers import get_editor_filter, split_pootle_path
 from pootle_app.models.directory import Directory
-from pootle_app.project_tree import (does_not_exist,
+from pootle_app.project_tree import (ScanManifest, does_not_exist,
+                                     get_translation_files,
                                      get_translation_project_dir,
                                      translation_project_dir_exists)
 from pootle_language.models import Language
@@ -299,36 +301,86 @@ class TranslationProject(models.Model, CachedTreeItem):
     def update_from_disk(self, force=False, overwrite=False):
         """Update all stores to reflect state on disk.
 
+        The directory tree is only scanned if files or directories were
+        added or removed, and files are only parsed if they changed since
+        they were last imported or synced, unless `force` is set.
+
         :return: `True` if any of the existing stores were updated.
             FIXME note: `scan_files()` doesn't report whether something
             changed or not, but it can obsolete dirs/stores. Hence if that
             happened the return value will be `False`, which is misleading.
         """
-        changed = False
 
-        logging.info(u"Scanning for new files in %s", self)
-        # Create new, make obsolete in-DB stores to reflect state on disk
-        self.scan_files()
+        # Stats for all the updated stores are recalculated by a single job
+        with stats_batch():
+            disk_files = get_translation_files(self.real_path)
+            stores = (self.stores.live().select_related('parent')
+                                        .exclude(file=''))
+
+            # Only scan the directory tree if it changed
+            if force or self.is_scan_needed(disk_files):
+                logging.info(u"Scanning for new files in %s", self)
+                # Create new, make obsolete in-DB stores to reflect state on
+                # disk
+                self.scan_files()
+
+            manifest = ScanManifest(self)
+            # Update store content from disk store
+            changed = self.update_stores_from_disk(
+                stores, disk_files, force=force, overwrite=overwrite,
+                manifest=manifest)
+            manifest.prune(disk_files)
+            manifest.save()
+
+            # If this TP has no stores, cache should be updated forcibly.
+            if not changed and stores.count() == 0:
+                self.update_all_cache()
+
+        return changed
+
+    def update_stores_from_disk(self, stores, disk_files, force=False,
+                                overwrite=False, manifest=None):
+        """Update `stores` of the translation project to reflect the state
+        of their files on disk.
+
+        :param disk_files: translation files on disk, as returned by
+            `get_translation_files()`. Stores whose file is missing are
+            left untouched.
+        :param manifest: `ScanManifest` to check and record the files in;
+            if not provided, it is loaded and saved here.
+        :return: `True` if any of the stores were updated.
+        """
+        changed = False
+        save_manifest = manifest is None
+        if manifest is None:
+            manifest = ScanManifest(self)
 
-        stores = self.stores.live().select_related('parent').exclude(file='')
-        # Update store content from disk store
         for store in stores.iterator():
-            if not store.file:
+            if not store.file or store.file.name not in disk_files:
                 continue
-            disk_mtime = store.get_file_mtime()
+            disk_mtime, size = disk_files[store.file.name]
             if not force and disk_mtime == store.file_mtime:
                 # The file on disk wasn't changed since the last sync
                 logging.debug(u"File didn't change since last sync, "
                               u"skipping %s", store.pootle_path)
                 continue
 
+            if not force and manifest.is_unchanged(store, size):
+                logging.debug(u"File was touched but didn't change, "
+                              u"skipping %s", store.pootle_path)
+                store.file_mtime = disk_mtime
+                Store.objects.filter(id=store.id).update(
+                    file_mtime=disk_mtime)
+                manifest.touch(store)
+                continue
+
             changed = (
                 store.updater.update_from_disk(overwrite=overwrite)
                 or changed)
+            manifest.add(store, size)
 
-        # If this TP has no stores, cache should be updated forcibly.
-        if not changed and stores.count() == 0:
-            self.update_all_cache()
+        if save_manifest:
+            manifest.save()
 
         return changed
 
@@ -347,6 +399,10 @@ class TranslationProject(models.Model, CachedTreeItem):
     def get_parent(self):
         return self.project
 
+    def get_stats_token_paths(self):
+        lang_code, proj_code = split_pootle_path(self.pootle_path)[:2]
+        return ['/%s/' % lang_code, '/projects/%s/' % proj_code]
+
     # # # /TreeItem
 
     def directory_exists_on_disk(self):
@@ -355,6 +411,33 @@ class TranslationProject(models.Model, CachedTreeItem):
         """
         return not does_not_exist(self.abs_real_path)
 
+    def is_scan_needed(self, disk_files):
+        """Tells whether scanning files would add or obsolete any stores or
+        directories of the translation project.
+
+        :param disk_files: translation files on disk, as returned by
+            `get_translation_files()`.
+        """
+        db_files = set(self.stores.live().exclude(file='')
+                                         .values_list('file', flat=True))
+        if set(disk_files) != db_files:
+            return True
+
+        # Directories are live as long as they have files
+        disk_dirs = set()
+        for name in disk_files:
+            path = os.path.dirname(os.path.relpath(name, self.real_path))
+            while path:
+                disk_dirs.add(u'%s%s/' % (self.pootle_path, path))
+                path = os.path.dirname(path)
+            disk_dirs.add(self.pootle_path)
+
+        db_dirs = set(
+            Directory.objects.live()
+                             .filter(pootle_path__startswith=self.pootle_path)
+                             .values_list('pootle_path', flat=True))
+        return disk_dirs != db_dirs
+
     def scan_files(self):
         """Scans the file system and returns a list of translation files.
         """
@@ -60,7 +60,8 @@ def redirect_to_tp_on_404(f):
         try:
             request.permissions = get_matching_permissions(
                 request.user,
-                self.permission_context) or []
+                self.permission_context,
+                request=request) or []
         except Http404 as e:
             # Test if lang code is not canonical but valid
             lang = Language.get_canonical(kwargs['language_code'])
@@ -11,6 +11,7 @@
 import os
 
 from datetime import datetime
+from multiprocessing.pool import ThreadPool
 
 # This must be run before importing Django.
 os.environ['DJANGO_SETTINGS_MODULE'] = 'pootle.settings'
@@ -19,6 +20,7 @@ from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.core.exceptions import ImproperlyConfigured
 from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
 
 from pootle.core.utils.docs import get_docs_url
 
@@ -29,6 +31,16 @@ from ...reporters import JSONReporter
 User = get_user_model()
 
 
+def generate_invoice(invoice):
+    """Generates `invoice`, to be run in a worker thread."""
+    try:
+        invoice.generate()
+    finally:
+        # Worker threads get their own DB connections
+        connections.close_all()
+    return invoice
+
+
 class Command(BaseCommand):
     help = "Generate invoices and send them via e-mail."
 
@@ -49,6 +61,12 @@ class Command(BaseCommand):
             ),
             default=None,
         )
+        parser.add_argument(
+            '--jobs',
+            type=int,
+            default=1,
+            help=u"Number of invoices to generate in parallel",
+        )
 
         email_group = parser.add_argument_group(
             'E-mail',
@@ -129,6 +147,7 @@ class Command(BaseCommand):
                     raise ImproperlyConfigured('User %s not found.' % username)
 
         reporter = JSONReporter()
+        invoices = []
         for username, user_conf in users:
             subcontractors = [
                 user_dict[subcontractor_name]
@@ -138,13 +157,41 @@ class Command(BaseCommand):
                               subcontractors=subcontractors,
                               add_correction=month is None)
             reporter.add(invoice)
+            invoices.append(invoice)
 
-            fullname = user_conf['name']
+        if options['jobs'] > 1:
+            pool = ThreadPool(options['jobs'])
+            try:
+                self.handle_invoices(pool.imap(generate_invoice, invoices),
+                                     **options)
+                pool.close()
+            except BaseException:
+                pool.terminate()
+                raise
+            finally:
+                pool.join()
+        else:
+            self.handle_invoices(self.generate_invoices(invoices),
+                                 **options)
+
+        if options['generate_report']:
+            reporter.generate()
+            self.stdout.write('JSON report written to %s.' % reporter.filepath)
 
-            self.stdout.write('Generating invoices for %s...' % fullname)
+    def generate_invoices(self, invoices):
+        for invoice in invoices:
             invoice.generate()
+            yield invoice
 
-            if not send_emails:
+    def handle_invoices(self, invoices, **options):
+        """Reports on and optionally sends the `invoices` as they are
+        generated.
+        """
+        for invoice in invoices:
+            fullname = invoice.conf['name']
+            self.stdout.write('Generated invoices for %s' % fullname)
+
+            if not options['send_emails']:
                 continue
 
             self.stdout.write('Sending email to %s...' % fullname)
@@ -155,7 +202,3 @@ class Command(BaseCommand):
                 self.stdout.write('Email sent')
             else:
                 self.stdout.write('ERROR: sending failed')
-
-        if options['generate_report']:
-            reporter.generate()
-            self.stdout.write('JSON report written to %s.' % reporter.filepath)
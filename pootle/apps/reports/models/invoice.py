@@ -19,7 +19,7 @@ from pootle_misc.util import get_date_interval
 from pootle_statistics.models import ScoreLog
 
 from ..generators import HTMLGenerator, PDFGenerator
-from ..utils import get_grouped_word_stats
+from ..utils import get_paid_wordcount_totals
 from .paidtask import PaidTask, PaidTaskTypes
 from .payment_email import (AccountingPaymentEmail, UserNoPaymentEmail,
                             UserPaymentEmail)
@@ -223,10 +223,9 @@ class Invoice(object):
 
         scores = ScoreLog.objects.for_user_in_range(user, self.month_start,
                                                     self.month_end)
-        scores = scores.order_by('submission__translation_project')
-        for row in get_grouped_word_stats(scores):
-            translated_words += row['translated']
-            reviewed_words += row['reviewed']
+        translated, reviewed, suggested_ = get_paid_wordcount_totals(scores)
+        translated_words += sum(translated.itervalues())
+        reviewed_words += sum(reviewed.itervalues())
 
         tasks = PaidTask.objects.for_user_in_range(user, self.month_start,
                                                    self.month_end)
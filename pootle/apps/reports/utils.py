@@ -6,52 +6,161 @@
 # or later license. See the LICENSE file for a copy of the license and the
 # AUTHORS file for copyright and authorship information.
 
+from django.conf import settings
+from django.db.models import (Case, ExpressionWrapper, F, FloatField, Q, Sum,
+                              Value, When)
+
+from pootle_statistics.models import (SIMILARITY_THRESHOLD,
+                                      TranslationActionCodes)
+from pootle_translationproject.models import TranslationProject
+
+
+def get_paid_wordcount_filters():
+    """Returns a tuple of filters matching the score logs which account for
+    translated and reviewed words, respectively.
+
+    These mirror `ScoreLog.get_paid_wordcounts()` so the paid wordcounts
+    can be aggregated by the DB.
+    """
+    own_suggestion = Q(submission__suggestion__user=F('submission__submitter'))
+    similar = Q(similarity__gte=SIMILARITY_THRESHOLD)
+
+    translated = (
+        Q(action_code=TranslationActionCodes.NEW) |
+        Q(~similar, action_code=TranslationActionCodes.EDITED) |
+        Q(~own_suggestion,
+          action_code=TranslationActionCodes.SUGG_ACCEPTED,
+          submission__old_value='') |
+        Q(own_suggestion,
+          action_code=TranslationActionCodes.SUGG_REVIEWED_ACCEPTED,
+          submission__old_value='')
+    )
+    reviewed = (
+        Q(action_code=TranslationActionCodes.REVIEWED) |
+        Q(similar, action_code=TranslationActionCodes.EDITED) |
+        Q(~own_suggestion,
+          action_code=TranslationActionCodes.SUGG_REVIEWED_ACCEPTED)
+    )
+    return translated, reviewed
+
+
+def get_translated_wordcount_expression():
+    """Returns an expression calculating the translated wordcount of score
+    logs, as `ScoreLog.get_paid_wordcounts()` does.
+    """
+    EDIT_COEF = settings.POOTLE_SCORE_COEFFICIENTS['EDIT']
+    REVIEW_COEF = settings.POOTLE_SCORE_COEFFICIENTS['REVIEW']
+
+    rate = Case(
+        When(rate=0, then=Value(EDIT_COEF + REVIEW_COEF)),
+        default=F('rate'),
+        output_field=FloatField(),
+    )
+    review_rate = Case(
+        When(rate=0, then=Value(REVIEW_COEF)),
+        default=F('review_rate'),
+        output_field=FloatField(),
+    )
+    similarity = Case(
+        When(similarity__gte=SIMILARITY_THRESHOLD, then=F('similarity')),
+        default=Value(0.0),
+        output_field=FloatField(),
+    )
+    return ExpressionWrapper(
+        (F('wordcount') * (Value(1.0) - similarity) * (rate - review_rate) +
+         F('wordcount') * review_rate) / rate,
+        output_field=FloatField(),
+    )
+
+
+def get_paid_wordcount_totals(scores):
+    """Aggregates the paid wordcounts of `scores` by rate.
+
+    :return: a tuple of `({rate: translated_words}, {review_rate:
+        reviewed_words}, suggested_words)`.
+    """
+    translated_filter, reviewed_filter = get_paid_wordcount_filters()
+
+    translated = {
+        rate: round(words, 4)
+        for rate, words in scores.filter(translated_filter)
+                                 .order_by()
+                                 .values('rate')
+                                 .annotate(
+                                     words=Sum(
+                                         get_translated_wordcount_expression()
+                                     ))
+                                 .values_list('rate', 'words')
+    }
+    reviewed = dict(
+        scores.filter(reviewed_filter)
+              .order_by()
+              .values('review_rate')
+              .annotate(words=Sum('wordcount'))
+              .values_list('review_rate', 'words')
+    )
+    suggested = scores.filter(
+        action_code=TranslationActionCodes.SUGG_ADDED,
+    ).aggregate(words=Sum('wordcount'))['words'] or 0
+
+    return translated, reviewed, suggested
+
 
 def get_grouped_word_stats(scores, user=None, month=None):
+    translated_filter, reviewed_filter = get_paid_wordcount_filters()
+    tp_field = 'submission__translation_project'
+    scores = scores.order_by().values(tp_field)
+
+    def get_totals(queryset, expression):
+        return dict(
+            queryset.annotate(total=Sum(expression))
+                    .values_list(tp_field, 'total')
+        )
+
+    score_deltas = get_totals(scores, 'score_delta')
+    translated = get_totals(scores.filter(translated_filter),
+                            get_translated_wordcount_expression())
+    reviewed = get_totals(scores.filter(reviewed_filter), 'wordcount')
+    suggested = get_totals(
+        scores.filter(action_code=TranslationActionCodes.SUGG_ADDED),
+        'wordcount',
+    )
+
+    tps = TranslationProject.objects.select_related(
+        'project', 'language',
+    ).in_bulk(score_deltas.keys())
+
     result = []
-    tp = None
-    for score in scores:
-        if tp != score.submission.translation_project:
-            tp = score.submission.translation_project
-            row = {
-                'translation_project': u'%s / %s' % (tp.project.fullname,
-                                                     tp.language.fullname),
-                'project_code': tp.project.code,
-                'score_delta': 0,
-                'translated': 0,
-                'reviewed': 0,
-                'suggested': 0,
+    for tp_id, score_delta in score_deltas.iteritems():
+        tp = tps[tp_id]
+        row = {
+            'translation_project': u'%s / %s' % (tp.project.fullname,
+                                                 tp.language.fullname),
+            'project_code': tp.project.code,
+            'score_delta': score_delta,
+            'translated': round(translated.get(tp_id, 0), 4),
+            'reviewed': reviewed.get(tp_id, 0),
+            'suggested': suggested.get(tp_id, 0),
+        }
+        if user is not None:
+            submissions_filter = {
+                'state': 'user-submissions',
+                'user': user.username,
+            }
+            suggestions_filter = {
+                'state': 'user-suggestions',
+                'user': user.username,
             }
-            if user is not None:
-                submissions_filter = {
-                    'state': 'user-submissions',
-                    'user': user.username,
-                }
-                suggestions_filter = {
-                    'state': 'user-suggestions',
-                    'user': user.username,
-                }
-                if month is not None:
-                    submissions_filter['month'] = month
-                    suggestions_filter['month'] = month
-
-                row['tp_browse_url'] = tp.get_absolute_url()
-                row['tp_submissions_translate_url'] = \
-                    tp.get_translate_url(**submissions_filter)
-                row['tp_suggestions_translate_url'] = \
-                    tp.get_translate_url(**suggestions_filter)
-
-            result.append(row)
-
-        translated_words, reviewed_words = score.get_paid_wordcounts()
-        if translated_words is not None:
-            row['translated'] += translated_words
-        if reviewed_words is not None:
-            row['reviewed'] += reviewed_words
-        row['score_delta'] += score.score_delta
-
-        suggested_words = score.get_suggested_wordcount()
-        if suggested_words is not None:
-            row['suggested'] += suggested_words
+            if month is not None:
+                submissions_filter['month'] = month
+                suggestions_filter['month'] = month
+
+            row['tp_browse_url'] = tp.get_absolute_url()
+            row['tp_submissions_translate_url'] = \
+                tp.get_translate_url(**submissions_filter)
+            row['tp_suggestions_translate_url'] = \
+                tp.get_translate_url(**suggestions_filter)
+
+        result.append(row)
 
     return sorted(result, key=lambda x: x['translation_project'])
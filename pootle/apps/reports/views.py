@@ -15,6 +15,7 @@ from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.contrib.auth.decorators import login_required
 from django.core.exceptions import ImproperlyConfigured
+from django.db.models import Q
 from django.shortcuts import render
 from django.urls import reverse
 from django.utils import timezone
@@ -27,21 +28,26 @@ from pootle.core.decorators import admin_required
 from pootle.core.http import (JsonResponse, JsonResponseBadRequest,
                               JsonResponseNotFound)
 from pootle.core.log import PAID_TASK_ADDED, PAID_TASK_DELETED, log
+from pootle.core.paginator import paginate
 from pootle.core.utils.timezone import make_aware, make_naive
 from pootle.core.views.mixins import (AjaxResponseMixin, NoDefaultUserMixin,
                                       TestUserFieldMixin, UserObjectMixin)
 from pootle_misc.util import (ajax_required, get_date_interval,
                               get_max_month_datetime, import_func)
-from pootle_statistics.models import ScoreLog
+from pootle_statistics.models import ScoreLog, TranslationActionCodes
 
 from .forms import PaidTaskForm, UserRatesForm
 from .models import PaidTask, PaidTaskTypes, ReportActionTypes
-from .utils import get_grouped_word_stats
+from .utils import (get_grouped_word_stats, get_paid_wordcount_filters,
+                    get_paid_wordcount_totals)
 
 
 STAT_FIELDS = ['n1']
 INITIAL_STATES = ['new', 'edit']
 
+#: Number of score log entries listed per page in detailed reports
+REPORT_ITEMS_PER_PAGE = 500
+
 
 class UserStatsView(NoDefaultUserMixin, UserObjectMixin, DetailView):
     template_name = 'user/stats.html'
@@ -91,7 +97,8 @@ class UserDetailedStatsView(NoDefaultUserMixin, UserObjectMixin, DetailView):
     def get_context_data(self, **kwargs):
         ctx = super(UserDetailedStatsView, self).get_context_data(**kwargs)
         ob = self.get_object()
-        ctx.update(get_detailed_report_context(user=ob, month=self.month))
+        ctx.update(get_detailed_report_context(self.request, user=ob,
+                                               month=self.month))
         ctx.update({'own_report': ob.username == self.user.username})
         return ctx
 
@@ -138,28 +145,36 @@ def reports(request):
     return render(request, 'admin/reports.html', ctx)
 
 
-def get_detailed_report_context(user, month):
+def get_detailed_report_context(request, user, month):
     [start, end] = get_date_interval(month)
 
     totals = {'translated': {}, 'reviewed': {}, 'suggested': 0,
               'paid_tasks': {},
               'all': 0}
     items = []
+    page = None
 
     if user and start and end:
-        scores = ScoreLog.objects \
-            .select_related('submission__unit__store') \
-            .filter(user=user,
-                    creation_time__gte=start,
-                    creation_time__lte=end) \
-            .order_by('creation_time')
-
-        tasks = PaidTask.objects.filter(user=user, datetime__gte=start,
-                                        datetime__lte=end).order_by('datetime')
-
-        items = []
-
-        for score in scores.iterator():
+        scores = ScoreLog.objects.filter(user=user,
+                                         creation_time__gte=start,
+                                         creation_time__lte=end)
+        translated_filter, reviewed_filter = get_paid_wordcount_filters()
+
+        # Only the entries shown in the current page are loaded, totals
+        # are aggregated by the DB
+        page = paginate(
+            request,
+            scores.filter(
+                translated_filter | reviewed_filter |
+                Q(action_code=TranslationActionCodes.SUGG_ADDED)
+            ).select_related(
+                'submission__unit__store',
+                'submission__suggestion',
+            ).order_by('creation_time', 'id'),
+            items=REPORT_ITEMS_PER_PAGE,
+        )
+
+        for score in page:
             action = None
             subtotal = None
             wordcount = None
@@ -178,28 +193,17 @@ def get_detailed_report_context(user, month):
                      translated_details['raw_rate'])
                 translated_details['review_subtotal'] = \
                     score.wordcount * score.review_rate
-                if score.rate in totals['translated']:
-                    totals['translated'][score.rate]['words'] += translated
-                else:
-                    totals['translated'][score.rate] = {'words': translated}
 
             elif reviewed is not None:
                 action = ReportActionTypes.REVIEW
                 subtotal = score.review_rate * reviewed
                 wordcount = reviewed
 
-                if score.review_rate in totals['reviewed']:
-                    totals['reviewed'][score.review_rate]['words'] += reviewed
-                else:
-                    totals['reviewed'][score.review_rate] = {'words': reviewed}
-
             suggested = score.get_suggested_wordcount()
             if suggested is not None:
                 action = ReportActionTypes.SUGGESTION
                 wordcount = suggested
 
-                totals['suggested'] += suggested
-
             if action is not None:
                 items.append({
                     'score': score,
@@ -213,17 +217,39 @@ def get_detailed_report_context(user, month):
                     'creation_time': score.creation_time,
                 })
 
-        paid_tasks = totals['paid_tasks']
-        for task in tasks.iterator():
-            subtotal = task.amount * task.rate
+        (translated_totals, reviewed_totals,
+         totals['suggested']) = get_paid_wordcount_totals(scores)
+        for rate, words in translated_totals.iteritems():
+            totals['translated'][rate] = {'words': words}
+        for rate, words in reviewed_totals.iteritems():
+            totals['reviewed'][rate] = {'words': words}
+
+        tasks = PaidTask.objects.filter(user=user, datetime__gte=start,
+                                        datetime__lte=end).order_by('datetime')
+
+        # Tasks are listed in the page spanning the time they were added at
+        tasks_in_page = tasks
+        if page.has_previous():
+            tasks_in_page = tasks_in_page.filter(
+                datetime__gte=page[0].creation_time,
+            )
+        if page.has_next():
+            next_score = page.paginator.object_list[page.end_index()]
+            tasks_in_page = tasks_in_page.filter(
+                datetime__lt=next_score.creation_time,
+            )
+        for task in tasks_in_page.iterator():
             items.append({
                 'action': task.task_type,
                 'action_name': PaidTask.get_task_type_title(task.task_type),
-                'subtotal': subtotal,
+                'subtotal': task.amount * task.rate,
                 'task': task,
                 'creation_time': task.datetime,
             })
 
+        paid_tasks = totals['paid_tasks']
+        for task in tasks.iterator():
+            subtotal = task.amount * task.rate
             totals['all'] += subtotal
 
             if task.task_type not in paid_tasks:
@@ -263,6 +289,7 @@ def get_detailed_report_context(user, month):
 
     return {
         'items': items,
+        'items_page': page,
         'object': user,
         'start': start,
         'end': end,
@@ -285,7 +312,7 @@ def reports_detailed(request):
     except User.DoesNotExist:
         user = ''
 
-    ctx = get_detailed_report_context(user=user, month=month)
+    ctx = get_detailed_report_context(request, user=user, month=month)
     ctx.update({'admin_report': True})
 
     return render(request, 'admin/detailed_reports.html', ctx)
@@ -416,9 +443,9 @@ def get_activity_data(request, user, month):
 
     if user != '':
         scores = ScoreLog.objects.for_user_in_range(user, start, end)
-        scores = list(scores.order_by('submission__translation_project'))
         json['grouped'] = get_grouped_word_stats(scores, user, month)
-        scores.sort(key=lambda x: x.creation_time)
+        scores = list(scores.select_related('submission__suggestion')
+                            .order_by('creation_time'))
         json['daily'] = get_daily_activity(user, scores, start, end)
         json['summary'] = get_summary(scores, start, end)
         tasks = get_paid_tasks(user, start, end)
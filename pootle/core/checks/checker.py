@@ -13,8 +13,9 @@ from django.utils import timezone
 from django.utils.functional import cached_property
 from django.utils.lru_cache import lru_cache
 
-from pootle.core.mixins.treeitem import CachedMethods
-from pootle_misc.checks import run_given_filters
+from pootle.core.mixins.treeitem import CachedMethods, stats_batch
+from pootle.core.utils.list import chunked
+from pootle_misc.checks import fingerprint_cache, run_given_filters
 from pootle_store.constants import OBSOLETE
 from pootle_store.models import QualityCheck, Store, Unit
 from pootle_store.unit import UnitProxy
@@ -66,7 +67,6 @@ class UnitQualityCheck(object):
         self.original_checks = original_checks
         self.check_names = check_names
         self.keep_false_positives = keep_false_positives
-        self.unmute_list = []
 
     @cached_property
     def check_failures(self):
@@ -78,83 +78,45 @@ class UnitQualityCheck(object):
         return run_given_filters(
             self.checker, self.unit, self.check_names)
 
-    @cached_property
-    def checks_qs(self):
-        """QualityCheck queryset for the Unit
-        """
-        return QualityCheck.objects.filter(unit=self.unit.id)
-
-    def delete_checks(self, checks):
-        """Delete checks that are no longer used.
-        """
-        to_delete = self.checks_qs.filter(name__in=checks)
-        if to_delete.exists():
-            to_delete.delete()
-            return True
-        return False
-
-    def unmute_checks(self, checks):
-        """Unmute checks that should no longer be muted
-        """
-        to_unmute = self.checks_qs.filter(
-            name__in=checks, false_positive=True)
-        if to_unmute.exists():
-            to_unmute.update(false_positive=False)
-            return True
-        return False
-
-    def update(self):
-        """Update QualityChecks for a Unit, deleting and unmuting as appropriate.
-        """
-        # update the checks for this unit
-        updated = self.update_checks()
-
-        # delete any remaining checks that were only in the original list
-        deleted = (
-            self.original_checks and self.delete_checks(self.original_checks))
-
-        # unmute any checks that have been marked for unmuting
-        unmuted = (
-            self.unmute_list and self.unmute_checks(self.unmute_list))
+    def get_changes(self):
+        """Compare self.original_checks to the Units calculated QualityCheck
+        failures, without writing anything to the DB.
 
-        return (updated or deleted or unmuted)
-
-    def update_checks(self):
-        """Compare self.original_checks to the Units calculated QualityCheck failures.
-
-        Removes members of self.original_checks as they have been compared.
+        :return: a tuple of unsaved new `QualityCheck`s, and the IDs of the
+            checks to be deleted and unmuted.
         """
-        updated = False
+        original_checks = dict(self.original_checks)
         new_checks = []
-        for name in self.check_failures.iterkeys():
-            if name in self.original_checks:
+        unmute_ids = []
+        for name, failure in self.check_failures.iteritems():
+            if name in original_checks:
+                check = original_checks.pop(name)
                 # keep false-positive checks if check is active
-                unmute = (
-                    self.original_checks[name]['false_positive']
-                    and not self.keep_false_positives)
-                if unmute:
-                    self.unmute_list.append(name)
-                # if the check is valid remove from the list and continue
-                del self.original_checks[name]
+                if check['false_positive'] and not self.keep_false_positives:
+                    unmute_ids.append(check['id'])
                 continue
 
-            # the check didnt exist previously - so create it
             new_checks.append(
-                self.checks_qs.model(
+                QualityCheck(
                     unit_id=self.unit.id,
                     name=name,
-                    message=self.check_failures[name]['message'],
-                    category=self.check_failures[name]['category']))
-            updated = True
-        if new_checks:
-            self.checks_qs.bulk_create(new_checks)
-        return updated
+                    message=failure['message'],
+                    category=failure['category']))
+
+        delete_ids = [c['id'] for c in original_checks.itervalues()]
+        return new_checks, delete_ids, unmute_ids
 
 
 class QualityCheckUpdater(object):
 
+    #: Number of updated units whose check changes are written at once
+    BATCH_SIZE = 1000
+
+    #: Maximum number of IDs to be included in a single query
+    CHUNK_SIZE = 500
+
     def __init__(self, check_names=None, translation_project=None,
-                 keep_false_positives=True):
+                 keep_false_positives=True, unit_ids=None):
         """Refreshes QualityChecks for Units
 
         :param check_names: limit checks to given list of quality check names.
@@ -162,13 +124,14 @@ class QualityCheckUpdater(object):
             restrict the update to.
         :param keep_false_positives: when set to `False`, it will unmute any
             existing false positive checks.
+        :param unit_ids: list of IDs of the units to restrict the update to.
         """
 
         self.check_names = check_names
         self.translation_project = translation_project
+        self.unit_ids = unit_ids
         self.keep_false_positives = keep_false_positives
-        self.stores = set()
-        self._store_to_expire = None
+        self._reset_changes()
 
     @cached_property
     def checks(self):
@@ -190,7 +153,8 @@ class QualityCheckUpdater(object):
 
     @cached_property
     def checks_qs(self):
-        """QualityCheck queryset for all units, restricted to TP if set
+        """QualityCheck queryset for all units, restricted to TP and unit IDs
+        if set
         """
         checks_qs = QualityCheck.objects.all()
 
@@ -198,16 +162,20 @@ class QualityCheckUpdater(object):
             tp_pk = self.translation_project.pk
             checks_qs = checks_qs.filter(
                 unit__store__translation_project__pk=tp_pk)
+        if self.unit_ids is not None:
+            checks_qs = checks_qs.filter(unit_id__in=self.unit_ids)
         return checks_qs
 
     @cached_property
     def units(self):
-        """Result set of Units, restricted to TP if set
+        """Result set of Units, restricted to TP and unit IDs if set
         """
         units = Unit.simple_objects.all()
         if self.translation_project is not None:
             units = units.filter(
                 store__translation_project=self.translation_project)
+        if self.unit_ids is not None:
+            units = units.filter(id__in=self.unit_ids)
         return units
 
     def clear_checks(self):
@@ -225,36 +193,51 @@ class QualityCheckUpdater(object):
             logger.error("Missing TP (pk '%s'). No checker retrieved.", tp_pk)
             return None
 
-    def expire_store_cache(self, store_pk=None):
-        """Whenever a store_pk is found it is queued for cache expiry
-
-        if a new store_pk is called the old one has its cache expired,
-        and the new store_pk is saved
+    def _reset_changes(self):
+        self.new_checks = []
+        self.delete_ids = []
+        self.unmute_ids = []
+        self.updated_unit_ids = []
+        self.stores = set()
 
-        call with None to expire the current Store's cache
+    def write_changes(self):
+        """Write pending check changes in bulk, and expire the caches of the
+        affected Stores.
         """
-        if self._store_to_expire is None:
-            # there is no Store set - queue it for expiry
-            self._store_to_expire = store_pk
-            return
-        if store_pk == self._store_to_expire:
-            # its the same Store that we saw last time
+        if not self.updated_unit_ids:
             return
-        # there was a _store_to_expire set and its changed - expire the cache
-        self.update_store_caches([self._store_to_expire])
 
-        # remember the new store_pk
-        self._store_to_expire = store_pk
+        QualityCheck.objects.bulk_create(self.new_checks,
+                                         batch_size=self.CHUNK_SIZE)
+        for ids in chunked(self.delete_ids, self.CHUNK_SIZE):
+            QualityCheck.objects.filter(id__in=ids).delete()
+        for ids in chunked(self.unmute_ids, self.CHUNK_SIZE):
+            QualityCheck.objects.filter(id__in=ids).update(
+                false_positive=False)
 
-    def update(self):
+        mtime = timezone.now()
+        for ids in chunked(self.updated_unit_ids, self.CHUNK_SIZE):
+            Unit.simple_objects.filter(id__in=ids).update(mtime=mtime)
+        Unit.update_filter_counts(self.updated_unit_ids)
+
+        self.update_store_caches(self.stores)
+        self._reset_changes()
+
+    def update(self, clear_unknown=True):
         """Update/purge all QualityChecks for Units, and expire Store caches.
+
+        :param clear_unknown: whether checks unknown to the checkers should
+            be deleted. As this is not restricted to the translation project,
+            it can be skipped when updating many of them.
+        :return: the number of translated units whose checks were updated.
         """
-        start = time.time()
-        logger.debug("Clearing unknown checks...")
-        self.clear_checks()
-        logger.debug(
-            "Cleared unknown checks in %s seconds",
-            (time.time() - start))
+        if clear_unknown:
+            start = time.time()
+            logger.debug("Clearing unknown checks...")
+            self.clear_checks()
+            logger.debug(
+                "Cleared unknown checks in %s seconds",
+                (time.time() - start))
 
         start = time.time()
         logger.debug("Deleting checks for untranslated units...")
@@ -269,13 +252,21 @@ class QualityCheckUpdater(object):
         logger.debug(
             "Updated checks for %s units in %s seconds",
             trans, (time.time() - start))
+        logger.debug(
+            "Fingerprint cache: %s hits, %s misses, %s items",
+            fingerprint_cache.hits, fingerprint_cache.misses,
+            len(fingerprint_cache))
+        return trans
 
     def update_store_caches(self, stores):
         """After completing QualityCheck updates expire caches for affected Stores.
         """
-        for store in Store.objects.filter(pk__in=stores):
-            store.mark_dirty(CachedMethods.CHECKS, CachedMethods.MTIME)
-            store.update_dirty_cache()
+        with stats_batch():
+            for store_pks in chunked(list(stores), self.CHUNK_SIZE):
+                for store in Store.objects.filter(pk__in=store_pks):
+                    store.mark_dirty(CachedMethods.CHECKS,
+                                     CachedMethods.MTIME)
+                    store.update_dirty_cache()
 
     def update_translated_unit(self, unit, checker=None):
         """Update checks for a translated Unit
@@ -287,11 +278,18 @@ class QualityCheckUpdater(object):
             self.checks.get(unit.id, {}),
             self.check_names,
             self.keep_false_positives)
-        if checker.update():
-            self.expire_store_cache(unit.store)
-            self.units.filter(id=unit.id).update(mtime=timezone.now())
-            return True
-        return False
+        new_checks, delete_ids, unmute_ids = checker.get_changes()
+        if not (new_checks or delete_ids or unmute_ids):
+            return False
+
+        self.new_checks.extend(new_checks)
+        self.delete_ids.extend(delete_ids)
+        self.unmute_ids.extend(unmute_ids)
+        self.updated_unit_ids.append(unit.id)
+        self.stores.add(unit.store)
+        if len(self.updated_unit_ids) >= self.BATCH_SIZE:
+            self.write_changes()
+        return True
 
     def update_translated(self):
         """Update checks for translated Units
@@ -318,12 +316,12 @@ class QualityCheckUpdater(object):
             if self.translation_project is not None:
                 # if TP is set then manually add TP.id to the Unit value dict
                 unit[tp_key] = self.translation_project.id
-            if checker is None:
+            else:
                 checker = self.get_checker(unit[tp_key])
             if checker and self.update_translated_unit(unit, checker=checker):
                 updated_count += 1
-        # clear the cache of the remaining Store
-        self.expire_store_cache()
+        # write the remaining changes
+        self.write_changes()
         return updated_count
 
     def update_untranslated(self):
@@ -332,6 +330,8 @@ class QualityCheckUpdater(object):
         checks_qs = self.checks_qs.exclude(unit__state__gte=OBSOLETE)
         self.update_store_caches(
             set(checks_qs.values_list("unit__store__pk", flat=True).distinct()))
+        unit_ids = list(checks_qs.values_list("unit_id", flat=True).distinct())
         deleted = checks_qs.count()
         checks_qs.delete()
+        Unit.update_filter_counts(unit_ids)
         return deleted
@@ -299,7 +299,8 @@ def permission_required(permission_code):
             setattr(request, attr_name, path_obj)
 
             request.permissions = get_matching_permissions(request.user,
-                                                           directory)
+                                                           directory,
+                                                           request=request)
 
             if not permission_code:
                 return func(request, *args, **kwargs)
@@ -8,13 +8,19 @@
 # AUTHORS file for copyright and authorship information.
 
 import logging
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
 from datetime import datetime
+from hashlib import md5
+from uuid import uuid4
 
 from redis import WatchError
 from rq import get_current_job
 from rq.job import Job, JobStatus, dumps, loads
 from rq.utils import utcnow
 
+from django.conf import settings
 from django.db import connection
 from django.utils.encoding import iri_to_uri
 
@@ -26,23 +32,134 @@ from pootle.core.utils.timezone import datetime_min
 from pootle_misc.util import dictsum
 
 
-__all__ = ('TreeItem', 'CachedTreeItem', 'CachedMethods')
+__all__ = ('TreeItem', 'CachedTreeItem', 'CachedMethods', 'stats_batch')
 
 
 POOTLE_DIRTY_TREEITEMS = 'pootle:dirty:treeitems'
 POOTLE_REFRESH_STATS = 'pootle:refresh:stats'
 POOTLE_STATS_LAST_JOB_PREFIX = "pootle:stats:lastjob:"
 POOTLE_STATS_JOB_PARAMS_PREFIX = "pootle:stats:job.params:"
+POOTLE_STATS_TOKEN = 'stats_token'
 
 
 logger = logging.getLogger('stats')
 cache = get_cache('stats')
 
+_stats_batch = threading.local()
+
 
 class NoCachedStats(Exception):
     pass
 
 
+def get_cached_many(items, name):
+    """Retrieve the cached `name` value for all `items` at once.
+
+    :raise NoCachedStats: if the value is missing for any of the items.
+    """
+    keys = [item.make_cache_key(name) for item in items]
+    values = cache.get_many(keys)
+
+    missing = [key for key in keys if values.get(key) is None]
+    if missing:
+        logger.debug(u'Cache miss %s for %s', name, u', '.join(missing))
+        raise NoCachedStats
+
+    return [values[key] for key in keys]
+
+
+def is_path_being_refreshed(key, path):
+    """Checks if `key` is affected by a stats refresh of `path`."""
+    if path is None:
+        return False
+
+    if path == '/':
+        return True
+
+    proj_code = split_pootle_path(path)[1]
+    return key in path or path in key or key in '/projects/%s/' % proj_code
+
+
+def get_dirty_many(items):
+    """Checks which of `items` are registered as dirty or being refreshed,
+    using a single Redis round-trip.
+
+    :return: list of booleans, in the same order as `items`.
+    """
+    if not items:
+        return []
+
+    r_con = get_connection()
+    with r_con.pipeline(transaction=False) as pipe:
+        pipe.get(POOTLE_REFRESH_STATS)
+        for item in items:
+            pipe.zscore(POOTLE_DIRTY_TREEITEMS, item.cache_key)
+        results = pipe.execute()
+
+    refresh_path = results[0]
+    return [
+        score > 0 or is_path_being_refreshed(item.cache_key, refresh_path)
+        for item, score in zip(items, results[1:])
+    ]
+
+
+def get_stats_many(items):
+    """Get stats for many cached items at once, excluding their children.
+
+    All cached values are retrieved with a single `get_many` call, and the
+    dirty status with a single Redis pipeline.
+
+    :return: list of stats dictionaries, in the same order as `items`.
+    """
+    names = (CachedMethods.WORDCOUNT_STATS, CachedMethods.SUGGESTIONS,
+             CachedMethods.LAST_ACTION, CachedMethods.CHECKS,
+             CachedMethods.LAST_UPDATED)
+    keys = [item.make_cache_key(name) for item in items for name in names]
+    values = cache.get_many(keys)
+
+    result = []
+    for item, is_dirty in zip(items, get_dirty_many(items)):
+        item_values = dict(
+            (name, values.get(item.make_cache_key(name))) for name in names
+        )
+        stats = {
+            'total': None,
+            'translated': None,
+            'fuzzy': None,
+            'suggestions': item_values[CachedMethods.SUGGESTIONS],
+            'lastaction': item_values[CachedMethods.LAST_ACTION],
+            'critical': None,
+            'lastupdated': item_values[CachedMethods.LAST_UPDATED],
+            'is_dirty': is_dirty,
+        }
+        if item_values[CachedMethods.WORDCOUNT_STATS] is not None:
+            stats.update(item_values[CachedMethods.WORDCOUNT_STATS])
+        if item_values[CachedMethods.CHECKS] is not None:
+            stats['critical'] = item_values[CachedMethods.CHECKS].get(
+                'unit_critical_error_count', 0
+            )
+        result.append(stats)
+
+    return result
+
+
+def get_stats_token_key(path):
+    return iri_to_uri('%s:%s' % (path, POOTLE_STATS_TOKEN))
+
+
+def touch_stats_tokens(paths):
+    """Invalidate the aggregated stats cached for items depending on any
+    of `paths` (see `TreeItem.get_stats_token_path`).
+    """
+    if not paths:
+        return
+
+    cache.set_many(
+        dict((get_stats_token_key(path), uuid4().hex) for path in paths),
+        None
+    )
+
+
 class CachedMethods(object):
     """Cached method names."""
 
@@ -83,6 +200,14 @@ class TreeItem(object):
         """This method will be overridden in descendants"""
         return None
 
+    def get_stats_token_path(self):
+        """Path of the stats token which invalidates the aggregated stats
+        of this item, or `None` if these shouldn't be cached.
+
+        This method will be overridden in descendants
+        """
+        return None
+
     @classmethod
     def _get_wordcount_stats(cls):
         """This method will be overridden in descendants"""
@@ -115,7 +240,7 @@ class TreeItem(object):
 
     def is_dirty(self):
         """Checks if any of children is registered as dirty"""
-        return any(map(lambda x: x.is_dirty(), self.children))
+        return any(get_dirty_many(list(self.children)))
 
     def initialize_children(self):
         if self.initialized:
@@ -128,56 +253,47 @@ class TreeItem(object):
         self.initialize_children()
         return self._children
 
-    def _calc_suggestion_count(self):
+    def get_children_cached(self, name):
+        """Get the cached `name` value of every child, fetched at once."""
         self.initialize_children()
+        return get_cached_many(list(self.children), name)
+
+    def _calc_suggestion_count(self):
         return (self._get_suggestion_count() +
-                sum([item.get_cached(CachedMethods.SUGGESTIONS)
-                     for item in self.children]))
+                sum(self.get_children_cached(CachedMethods.SUGGESTIONS)))
 
     def _calc_wordcount_stats(self):
         result = self._get_wordcount_stats()
-        self.initialize_children()
-        for item in self.children:
-            result = dictsum(
-                result,
-                item.get_cached(CachedMethods.WORDCOUNT_STATS)
-            )
+        for item_res in self.get_children_cached(
+                CachedMethods.WORDCOUNT_STATS):
+            result = dictsum(result, item_res)
 
         return result
 
     def _calc_last_action(self):
-        self.initialize_children()
-
         return max(
             [self._get_last_action()] +
-            [item.get_cached(CachedMethods.LAST_ACTION)
-             for item in self.children],
+            self.get_children_cached(CachedMethods.LAST_ACTION),
             key=lambda x: x['mtime'] if 'mtime' in x else 0
         )
 
     def _calc_mtime(self):
         """get latest modification time"""
-        self.initialize_children()
         return max(
             [self._get_mtime()] +
-            [item.get_cached(CachedMethods.MTIME)
-             for item in self.children]
+            self.get_children_cached(CachedMethods.MTIME)
         )
 
     def _calc_last_updated(self):
         """get last updated"""
-        self.initialize_children()
         return max(
             [self._get_last_updated()] +
-            [item.get_cached(CachedMethods.LAST_UPDATED)
-             for item in self.children],
+            self.get_children_cached(CachedMethods.LAST_UPDATED)
         )
 
     def _calc_checks(self):
         result = self._get_checks()
-        self.initialize_children()
-        for item in self.children:
-            item_res = item.get_cached(CachedMethods.CHECKS)
+        for item_res in self.get_children_cached(CachedMethods.CHECKS):
             result['checks'] = dictsum(result['checks'], item_res['checks'])
             result['unit_critical_error_count'] += \
                 item_res['unit_critical_error_count']
@@ -188,13 +304,62 @@ class TreeItem(object):
         """Get stats for this particular tree item.
 
         Note objects using `TreeItem` don't have their own cached fields;
-        these are aggregated based on the existing children stats. This
+        these are aggregated based on the existing children stats, and
+        cached for each set of children if the item has a stats token. This
         is why children need to be unconditionally initialized.
 
         :param include_children: whether stats for children items should be
             included or not.
         """
         self.initialize_children()
+        children = list(self.children)
+        if include_children:
+            children_stats = get_stats_many(children)
+            is_dirty = any(stats['is_dirty'] for stats in children_stats)
+        else:
+            is_dirty = any(get_dirty_many(children))
+
+        result = self.get_aggregated_stats(children)
+        result['is_dirty'] = is_dirty
+
+        if include_children:
+            result['children'] = children_stats
+
+        return result
+
+    def get_aggregated_stats_key(self, children):
+        """Cache key for the stats aggregated from `children`.
+
+        The key changes whenever the stats token is touched, and it is
+        different for every set of children, so variants filtered per user
+        are cached separately.
+        """
+        token_path = self.get_stats_token_path()
+        if token_path is None:
+            return None
+
+        token_key = get_stats_token_key(token_path)
+        token = cache.get(token_key)
+        if token is None:
+            token = uuid4().hex
+            cache.set(token_key, token, None)
+
+        children_key = md5(u'\n'.join(
+            sorted(child.cache_key for child in children)
+        ).encode('utf-8')).hexdigest()
+        return iri_to_uri('%s:stats:%s:%s' % (self.cache_key, token,
+                                              children_key))
+
+    def get_aggregated_stats(self, children):
+        """Get the stats of this item aggregated from `children`, excluding
+        the dirty status.
+        """
+        key = self.get_aggregated_stats_key(children)
+        if key is not None:
+            result = cache.get(key)
+            if result is not None:
+                return result
+
         result = {
             'total': None,
             'translated': None,
@@ -203,7 +368,6 @@ class TreeItem(object):
             'lastaction': None,
             'critical': None,
             'lastupdated': None,
-            'is_dirty': self.is_dirty(),
         }
 
         try:
@@ -231,10 +395,8 @@ class TreeItem(object):
         except NoCachedStats:
             pass
 
-        if include_children:
-            result['children'] = [
-                item.get_stats(include_children=False) for item in self.children
-            ]
+        if key is not None and None not in result.values():
+            cache.set(key, result, settings.POOTLE_CACHE_TIMEOUT)
 
         return result
 
@@ -264,6 +426,27 @@ class CachedTreeItem(TreeItem):
         """This method will be overridden in descendants"""
         return True
 
+    def get_stats_token_paths(self):
+        """Paths of the stats tokens to be touched whenever the cached stats
+        of this item are updated.
+
+        This method will be overridden in descendants
+        """
+        return []
+
+    @classmethod
+    def get_stats_calculator(cls, items):
+        """Get an object able to calculate the stats of many `items` at
+        once, if any.
+
+        Calculators must implement `calculate(keys)`, which returns the
+        `{pk: {key: value}}` values to be cached for `items`, therefore
+        they only make sense for leaf items.
+
+        This method will be overridden in descendants.
+        """
+        return None
+
     def set_cached_value(self, name, value):
         return cache.set(self.make_cache_key(name), value, None)
 
@@ -318,51 +501,20 @@ class CachedTreeItem(TreeItem):
     def get_stats(self, include_children=True):
         """Get stats for this particular tree item.
 
+        Stats for the item and its children are retrieved all at once.
+
         :param include_children: whether stats for children items should be
             included or not.
         """
+        items = [self]
         if include_children:
             self.initialize_children()
-        result = {
-            'total': None,
-            'translated': None,
-            'fuzzy': None,
-            'suggestions': None,
-            'lastaction': None,
-            'critical': None,
-            'lastupdated': None,
-            'is_dirty': self.is_dirty(),
-        }
-
-        try:
-            result.update(self.get_cached(CachedMethods.WORDCOUNT_STATS))
-        except NoCachedStats:
-            pass
-
-        try:
-            result['suggestions'] = self.get_cached(CachedMethods.SUGGESTIONS)
-        except NoCachedStats:
-            pass
-
-        try:
-            result['lastaction'] = self.get_cached(CachedMethods.LAST_ACTION)
-        except NoCachedStats:
-            pass
-
-        try:
-            result['critical'] = self.get_error_unit_count()
-        except NoCachedStats:
-            pass
-
-        try:
-            result['lastupdated'] = self.get_cached(CachedMethods.LAST_UPDATED)
-        except NoCachedStats:
-            pass
+            items.extend(self.children)
 
+        stats = get_stats_many(items)
+        result = stats[0]
         if include_children:
-            result['children'] = [
-                item.get_stats(include_children=False) for item in self.children
-            ]
+            result['children'] = stats[1:]
 
         return result
 
@@ -406,18 +558,8 @@ class CachedTreeItem(TreeItem):
     def is_being_refreshed(self):
         """Checks if current TreeItem is being refreshed"""
         r_con = get_connection()
-        path = r_con.get(POOTLE_REFRESH_STATS)
-
-        if path is None:
-            return False
-
-        if path == '/':
-            return True
-
-        proj_code = split_pootle_path(path)[1]
-        key = self.cache_key
-
-        return key in path or path in key or key in '/projects/%s/' % proj_code
+        return is_path_being_refreshed(self.cache_key,
+                                       r_con.get(POOTLE_REFRESH_STATS))
 
     def register_all_dirty(self):
         """Register current TreeItem and all parent paths as dirty
@@ -466,6 +608,11 @@ class CachedTreeItem(TreeItem):
         _dirty = self._dirty_cache.copy()
         if _dirty:
             self._dirty_cache = set()
+            batch = get_stats_batch()
+            if batch is not None:
+                batch.add(self, _dirty)
+                return
+
             self.register_all_dirty()
             create_update_cache_job_wrapper(self, _dirty)
 
@@ -492,6 +639,8 @@ class CachedTreeItem(TreeItem):
                 except NoCachedStats:
                     keys_for_parent.remove(key)
 
+            touch_stats_tokens(self.get_stats_token_paths())
+
             if keys_for_parent:
                 parent = self.get_parent()
                 if parent is not None:
@@ -722,3 +871,214 @@ def create_update_cache_job(queue, instance, keys, decrement=1):
     logger.debug('ENQUEUE %s (job_id=%s)', last_job_key, job_wrapper.id)
 
     queue.push_job_id(job_wrapper.id)
+
+
+# # # # # # # # # # # # # #  Batched stats updates # # # # # # # # # # # # #
+
+
+class StatsBatch(object):
+    """Collects tree items whose cached stats need to be updated, so that
+    all of them can be recalculated at once by a single job.
+    """
+
+    def __init__(self):
+        self.items = OrderedDict()
+        self.dirty_paths = set()
+
+    def __len__(self):
+        return len(self.items)
+
+    def add(self, instance, keys):
+        """Add `keys` of `instance` to the batch and collect the paths
+        affected by them, which are registered as dirty when the batch is
+        flushed.
+        """
+        key = instance.cache_key
+        if key in self.items:
+            self.items[key][1].update(keys)
+        else:
+            self.items[key] = (instance, set(keys))
+
+        self.dirty_paths.update(instance.all_pootle_paths())
+
+    def flush(self):
+        """Schedule the update of all the collected items."""
+        if not self.items:
+            return
+
+        create_update_cache_batch_job_wrapper(self.items.values(),
+                                              self.dirty_paths)
+        self.items = OrderedDict()
+        self.dirty_paths = set()
+
+
+def get_stats_batch():
+    """Get the stats batch active in the current thread, if any."""
+    return getattr(_stats_batch, 'current', None)
+
+
+@contextmanager
+def stats_batch():
+    """Defer all stats updates requested within the block to a single job.
+
+    Instead of enqueuing one job per dirty tree item (which in turn enqueues
+    one job per parent), the collected items and their ancestors are
+    recalculated bottom-up once the block is done. Nested blocks join the
+    outermost batch.
+    """
+    batch = get_stats_batch()
+    if batch is not None:
+        yield batch
+        return
+
+    batch = StatsBatch()
+    _stats_batch.current = batch
+    try:
+        yield batch
+    finally:
+        _stats_batch.current = None
+        batch.flush()
+
+
+def register_dirty_paths(paths, increment=1):
+    r_con = get_connection()
+    with r_con.pipeline() as pipe:
+        for path in paths:
+            pipe.zincrby(POOTLE_DIRTY_TREEITEMS, path, increment)
+        pipe.execute()
+
+
+def unregister_dirty_paths(paths, decrement=1):
+    logger.debug('UNREGISTER %s paths (-%s)', len(paths), decrement)
+    register_dirty_paths(paths, 0 - decrement)
+
+
+def update_cache_batch(items, dirty_paths=None):
+    """Recalculate the cached stats of a batch of tree items.
+
+    Every item and all of its ancestors are updated exactly once, deepest
+    nodes first, so that parents are aggregated from their children's
+    freshly-cached values.
+
+    :param items: iterable of `(instance, keys)` tuples.
+    :param dirty_paths: paths registered as dirty on behalf of the batch,
+        these will be unregistered once all items have been updated.
+    """
+    nodes = OrderedDict()
+    for instance, keys in items:
+        keys = set(keys)
+        while instance is not None:
+            key = instance.cache_key
+            if key in nodes:
+                instance, node_keys = nodes[key]
+                if keys <= node_keys:
+                    break
+                node_keys.update(keys)
+            else:
+                nodes[key] = (instance, set(keys))
+            instance = instance.get_parent()
+
+    start = datetime.now()
+
+    ordered_nodes = sorted(nodes.values(),
+                           key=lambda node: len(node[0].all_pootle_paths()),
+                           reverse=True)
+    updatable_nodes = []
+    for instance, keys in ordered_nodes:
+        if instance.can_be_updated():
+            updatable_nodes.append((instance, keys))
+        else:
+            logger.warning('Cache for %s object cannot be updated.', instance)
+
+    precalculated = precalculate_cache_batch(updatable_nodes)
+
+    token_paths = set()
+    for instance, keys in updatable_nodes:
+        token_paths.update(instance.get_stats_token_paths())
+        if instance.cache_key in precalculated:
+            continue
+
+        # children should be recalculated to avoid using of obsolete
+        # directories or stores which could be saved in `children` property
+        instance.initialized = False
+        instance.initialize_children()
+        for key in keys:
+            try:
+                instance.update_cached(key)
+            except NoCachedStats:
+                pass
+
+    touch_stats_tokens(token_paths)
+
+    logger.debug('update_cache_batch\t%s\t%s items',
+                 datetime.now() - start, len(ordered_nodes))
+
+    if dirty_paths:
+        unregister_dirty_paths(dirty_paths)
+
+
+def precalculate_cache_batch(nodes):
+    """Calculate and cache the values of items of the same class at once,
+    for classes providing a stats calculator.
+
+    :param nodes: list of `(instance, keys)` tuples.
+    :return: set of cache keys of the items which have been updated.
+    """
+    nodes_by_class = OrderedDict()
+    for instance, keys in nodes:
+        nodes_by_class.setdefault(instance.__class__, []).append(
+            (instance, keys)
+        )
+
+    precalculated = set()
+    for cls, cls_nodes in nodes_by_class.iteritems():
+        if len(cls_nodes) < 2:
+            continue
+
+        calculator = cls.get_stats_calculator(
+            [instance for instance, keys_ in cls_nodes]
+        )
+        if calculator is None:
+            continue
+
+        all_keys = set()
+        for instance_, keys in cls_nodes:
+            all_keys.update(keys)
+
+        start = datetime.now()
+        values = calculator.calculate(all_keys)
+
+        data = {}
+        for instance, keys in cls_nodes:
+            for key in keys:
+                data[instance.make_cache_key(key)] = values[instance.pk][key]
+            precalculated.add(instance.cache_key)
+        cache.set_many(data, None)
+
+        logger.debug('precalculate_cache_batch(%s)\t%s\t%s items',
+                     cls.__name__, datetime.now() - start, len(cls_nodes))
+
+    return precalculated
+
+
+def update_cache_batch_job(items, dirty_paths):
+    """RQ job"""
+    connection.close_if_unusable_or_obsolete()
+    update_cache_batch(items, dirty_paths)
+    connection.close_if_unusable_or_obsolete()
+
+
+def create_update_cache_batch_job_wrapper(items, dirty_paths):
+    items = list(items)
+    queue = get_queue('default')
+    if queue._async:
+
+        def _create_update_cache_batch_job():
+            # Paths are only registered once the job is sure to run, so
+            # that rolled back batches don't leave them dirty forever
+            register_dirty_paths(dirty_paths)
+            queue.enqueue(update_cache_batch_job, items, dirty_paths)
+        connection.on_commit(_create_update_cache_batch_job)
+    else:
+        register_dirty_paths(dirty_paths)
+        update_cache_batch(items, dirty_paths)
@@ -6,6 +6,8 @@
 # or later license. See the LICENSE file for a copy of the license and the
 # AUTHORS file for copyright and authorship information.
 
+import threading
+
 from ..cache import get_cache
 
 
@@ -16,6 +18,31 @@ class NoRevision(Exception):
     pass
 
 
+class RevisionStats(object):
+    """Counts revision allocations, as a means to spot code paths
+    hitting Redis for every single revision.
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        #: Number of revisions allocated, one round-trip to Redis each
+        self.calls = 0
+
+    def __repr__(self):
+        return '<RevisionStats: %d calls>' % self.calls
+
+
+class RevisionState(threading.local):
+
+    def __init__(self):
+        self.stats = RevisionStats()
+
+
+_state = RevisionState()
+
+
 class Revision(object):
     """Wrapper around the revision counter stored in Redis."""
 
@@ -70,6 +97,18 @@ class Revision(object):
             initial number if there's no revision stored yet.
         """
         try:
-            return cache.incr(cls.CACHE_KEY)
+            revision = cache.incr(cls.CACHE_KEY)
         except ValueError:
             raise NoRevision()
+
+        _state.stats.calls += 1
+        return revision
+
+    @classmethod
+    def get_stats(cls):
+        """Returns the allocation stats for the current thread."""
+        return _state.stats
+
+    @classmethod
+    def reset_stats(cls):
+        _state.stats.reset()
@@ -9,6 +9,7 @@
 from __future__ import absolute_import
 
 import logging
+from hashlib import md5
 
 import Levenshtein
 
@@ -18,7 +19,10 @@ try:
 except ImportError:
     Elasticsearch = None
 
+from django.core.cache import cache
+
 from ..base import SearchBackend
+from ..index import get_index_revision
 
 
 __all__ = ('ElasticSearchBackend',)
@@ -64,6 +68,10 @@ def filter_hits_by_distance(hits, source_text,
 
 
 class ElasticSearchBackend(SearchBackend):
+
+    #: Seconds TM hits are kept in the cache
+    CACHE_TIMEOUT = 60 * 60
+
     def __init__(self, config_name):
         super(ElasticSearchBackend, self).__init__(config_name)
         self._es = self._get_es_server()
@@ -102,6 +110,53 @@ class ElasticSearchBackend(SearchBackend):
         counter = {}
         res = []
         language = unit.store.translation_project.language.code
+        hits = self.get_hits(language, unit.source)
+        for hit in hits:
+            if self._is_valuable_hit(unit, hit):
+                body = hit['_source']
+                translation_pair = body['source'] + body['target']
+                if translation_pair not in counter:
+                    counter[translation_pair] = 1
+                    res.append({
+                        'unit_id': hit['_id'],
+                        'source': body['source'],
+                        'target': body['target'],
+                        'project': body['project'],
+                        'path': body['path'],
+                        'username': body['username'],
+                        'fullname': body['fullname'],
+                        'email_md5': body['email_md5'],
+                        'mtime': body.get('mtime', None),
+                        'score': hit['_score'] * self.weight,
+                    })
+                else:
+                    counter[translation_pair] += 1
+
+        for item in res:
+            item['count'] = counter[item['source']+item['target']]
+
+        return res
+
+    def get_hits(self, language, source):
+        """Returns the TM hits for `source` in `language`.
+
+        Hits are cached until translations in `language` get indexed.
+        """
+        cache_key = 'tm:hits:%s:%s:%s:%s' % (
+            self._settings['INDEX_NAME'], language,
+            get_index_revision(language),
+            md5(unicode(source).encode('utf-8')).hexdigest(),
+        )
+        hits = cache.get(cache_key)
+        if hits is None:
+            hits = self._search(language, source)
+            if hits is None:
+                return []
+            cache.set(cache_key, hits, self.CACHE_TIMEOUT)
+
+        return hits
+
+    def _search(self, language, source):
         es_res = self._es_call(
             "search",
             index=self._settings['INDEX_NAME'],
@@ -110,7 +165,7 @@ class ElasticSearchBackend(SearchBackend):
                 "query": {
                     "match": {
                         "source": {
-                            "query": unit.source,
+                            "query": source,
                             "fuzziness": 'AUTO',
                         }
                     }
@@ -120,46 +175,21 @@ class ElasticSearchBackend(SearchBackend):
 
         if es_res is None:
             # ElasticsearchException - eg ConnectionError.
-            return []
+            return None
         elif es_res == "":
             # There seems to be an issue with urllib where an empty string is
             # returned
             logger.error("Elasticsearch search (%s:%s) returned an empty "
                          "string: %s", self._settings["HOST"],
-                         self._settings["PORT"], unit)
-            return []
+                         self._settings["PORT"], source)
+            return None
 
-        hits = filter_hits_by_distance(
+        return filter_hits_by_distance(
             es_res['hits']['hits'],
-            unit.source,
+            source,
             min_similarity=self._settings.get('MIN_SIMILARITY',
                                               DEFAULT_MIN_SIMILARITY)
         )
-        for hit in hits:
-            if self._is_valuable_hit(unit, hit):
-                body = hit['_source']
-                translation_pair = body['source'] + body['target']
-                if translation_pair not in counter:
-                    counter[translation_pair] = 1
-                    res.append({
-                        'unit_id': hit['_id'],
-                        'source': body['source'],
-                        'target': body['target'],
-                        'project': body['project'],
-                        'path': body['path'],
-                        'username': body['username'],
-                        'fullname': body['fullname'],
-                        'email_md5': body['email_md5'],
-                        'mtime': body.get('mtime', None),
-                        'score': hit['_score'] * self.weight,
-                    })
-                else:
-                    counter[translation_pair] += 1
-
-        for item in res:
-            item['count'] = counter[item['source']+item['target']]
-
-        return res
 
     def update(self, language, obj):
         self._es_call(
@@ -169,3 +199,20 @@ class ElasticSearchBackend(SearchBackend):
             body=obj,
             id=obj['id']
         )
+
+    def update_many(self, language, objs):
+        if not objs:
+            return
+
+        body = []
+        for obj in objs:
+            body.append({
+                'index': {
+                    '_index': self._settings['INDEX_NAME'],
+                    '_type': language,
+                    '_id': obj['id'],
+                },
+            })
+            body.append(obj)
+
+        self._es_call("bulk", body=body)
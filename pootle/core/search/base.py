@@ -48,3 +48,12 @@ class SearchBackend(object):
     def update(self, language, obj):
         """Add a unit to the backend"""
         pass
+
+    def update_many(self, language, objs):
+        """Add many units to the backend at once.
+
+        Backends able to index several documents in a single request
+        should override this.
+        """
+        for obj in objs:
+            self.update(language, obj)
@@ -8,14 +8,22 @@
 
 import importlib
 import logging
+import threading
+import time
 
 from . import SearchBackend
 
 
+#: Seconds to wait for a TM server to answer, unless it sets its `TIMEOUT`
+DEFAULT_TIMEOUT = 5
+
+
 class SearchBroker(SearchBackend):
     def __init__(self, config_name=None):
         super(SearchBroker, self).__init__(config_name)
         self._servers = {}
+        self._stats = {}
+        self._stats_lock = threading.Lock()
 
         if self._settings is None:
             return
@@ -43,14 +51,92 @@ class SearchBroker(SearchBackend):
                     logging.warning("Search backend '%s'. Cannot import '%s'",
                                     server, _module)
 
+    @property
+    def has_servers(self):
+        """Whether any TM server is configured."""
+        return bool(self._servers)
+
+    def _get_timeout(self, server):
+        return self._settings[server].get('TIMEOUT', DEFAULT_TIMEOUT)
+
+    def _record(self, server, stat, elapsed=None):
+        with self._stats_lock:
+            stats = self._stats.setdefault(server, {
+                'calls': 0, 'errors': 0, 'timeouts': 0, 'time': 0.0,
+            })
+            stats[stat] += 1
+            if elapsed is not None:
+                stats['time'] += elapsed
+
+    def _search_server(self, server, unit):
+        start = time.time()
+        try:
+            results = self._servers[server].search(unit)
+        except Exception:
+            logging.exception("Search backend '%s' failed", server)
+            self._record(server, 'errors', time.time() - start)
+            return []
+
+        self._record(server, 'calls', time.time() - start)
+        return results
+
+    def get_stats(self):
+        """Returns per-server search stats: the number of successful
+        calls, errors and timeouts, and the time spent on searches.
+        """
+        with self._stats_lock:
+            return {
+                server: dict(stats) for server, stats in self._stats.items()
+            }
+
+    def search_servers(self, unit):
+        """Queries all servers concurrently.
+
+        :return: a dictionary of `{server: results}`, omitting servers
+            which didn't answer within their `TIMEOUT`.
+        """
+        # Avoid hitting the DB from the worker threads
+        unit.store.translation_project.language
+
+        # Every search gets its own threads, so servers which hang don't
+        # hold up concurrent searches: the threads are left to finish in
+        # the background once their server timed out
+        answers = {}
+
+        def search_server(server):
+            answers[server] = self._search_server(server, unit)
+
+        threads = {}
+        for server in self._servers:
+            thread = threading.Thread(target=search_server, args=(server,),
+                                      name='tm-search-%s' % server)
+            thread.daemon = True
+            thread.start()
+            threads[server] = thread
+
+        results = {}
+        deadline = time.time() + max(
+            self._get_timeout(server) for server in self._servers
+        )
+        for server, thread in threads.iteritems():
+            thread.join(min(self._get_timeout(server),
+                            max(deadline - time.time(), 0)))
+            if server in answers:
+                results[server] = answers[server]
+            else:
+                logging.warning("Search backend '%s' timed out", server)
+                self._record(server, 'timeouts')
+
+        return results
+
     def search(self, unit):
         if not self._servers:
             return []
 
         results = []
         counter = {}
-        for server in self._servers:
-            for result in self._servers[server].search(unit):
+        for server_results in self.search_servers(unit).itervalues():
+            for result in server_results:
                 translation_pair = result['source'] + result['target']
                 if translation_pair not in counter:
                     counter[translation_pair] = result['count']
@@ -72,3 +158,8 @@ class SearchBroker(SearchBackend):
         for server in self._servers:
             if self._servers[server].is_auto_updatable:
                 self._servers[server].update(language, obj)
+
+    def update_many(self, language, objs):
+        for server in self._servers:
+            if self._servers[server].is_auto_updatable:
+                self._servers[server].update_many(language, objs)
@@ -0,0 +1,31 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) Zing contributors.
+#
+# This file is a part of the Zing project. It is distributed under the GPL3
+# or later license. See the LICENSE file for a copy of the license and the
+# AUTHORS file for copyright and authorship information.
+
+from django_rq.queues import get_connection
+
+
+POOTLE_TM_INDEX_REVISION = 'pootle:tm:index_revision'
+
+
+def get_index_revision(language):
+    """Returns the revision of the TM index for `language`, which changes
+    every time translations in that language are indexed.
+    """
+    r_con = get_connection()
+    return int(r_con.hget(POOTLE_TM_INDEX_REVISION, language) or 0)
+
+
+def bump_index_revision(*languages):
+    """Marks the TM index for `languages` as changed, invalidating any
+    results cached for them.
+    """
+    r_con = get_connection()
+    with r_con.pipeline(transaction=False) as pipe:
+        for language in languages:
+            pipe.hincrby(POOTLE_TM_INDEX_REVISION, language)
+        pipe.execute()
@@ -0,0 +1,189 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) Zing contributors.
+#
+# This file is a part of the Zing project. It is distributed under the GPL3
+# or later license. See the LICENSE file for a copy of the license and the
+# AUTHORS file for copyright and authorship information.
+
+import json
+import logging
+from collections import defaultdict
+
+from redis.exceptions import ResponseError
+
+from django.conf import settings
+from django.db import connection
+
+from django_rq.queues import get_connection, get_queue
+
+from .base import SERVER_SETTINGS_NAME
+from .broker import SearchBroker
+from .index import bump_index_revision
+
+
+__all__ = ('TMUpdateQueue', 'tm_update_queue')
+
+
+logger = logging.getLogger(__name__)
+
+
+POOTLE_TM_UPDATES = 'pootle:tm:updates'
+POOTLE_TM_UPDATES_PROCESSING = 'pootle:tm:updates:processing'
+POOTLE_TM_FLUSH_SCHEDULED = 'pootle:tm:flush_scheduled'
+POOTLE_TM_FLUSH_LOCK = 'pootle:tm:flush_lock'
+
+
+def flush_tm_updates_job():
+    """RQ job"""
+    tm_update_queue.flush()
+
+
+class TMUpdateQueue(object):
+    """Queue of pending updates to the local TM.
+
+    Updates are kept in a Redis hash keyed by language and unit ID, so
+    pushing several updates for the same unit before they are flushed
+    only indexes the latest one. Pending updates are flushed to the TM
+    servers in batches by an RQ job.
+    """
+
+    #: Maximum number of units sent to the TM server per request
+    BATCH_SIZE = 500
+
+    #: Seconds after which a flush is considered to have died
+    LOCK_TIMEOUT = 600
+
+    def __init__(self):
+        self._broker = None
+
+    @property
+    def broker(self):
+        if self._broker is None:
+            self._broker = SearchBroker()
+        return self._broker
+
+    @property
+    def is_enabled(self):
+        """Whether there is a local TM to be kept up to date."""
+        return 'local' in (getattr(settings, SERVER_SETTINGS_NAME, None) or {})
+
+    def add(self, language, objs):
+        """Queues TM updates, without scheduling them to be flushed.
+
+        :param language: code of the language the units belong to.
+        :param objs: list of TM documents, as returned by
+            `Unit.get_tmserver_obj()`.
+        :return: `True` if any updates were queued.
+        """
+        if not objs or not self.is_enabled:
+            return False
+
+        r_con = get_connection()
+        r_con.hmset(POOTLE_TM_UPDATES, {
+            '%s:%s' % (language, obj['id']): json.dumps([language, obj])
+            for obj in objs
+        })
+        return True
+
+    def push(self, language, objs):
+        """Queues TM updates and schedules them to be flushed, once the
+        current transaction commits.
+
+        See `add()` for the parameters.
+        """
+        if not objs or not self.is_enabled:
+            return
+
+        def _push():
+            if self.add(language, objs):
+                self.schedule_flush()
+        connection.on_commit(_push)
+
+    def schedule_flush(self):
+        queue = get_queue('default')
+        if not queue._async:
+            self.flush()
+            return
+
+        # The flag expires in case the job is lost, so that later pushes
+        # can schedule a new one
+        r_con = get_connection()
+        if r_con.set(POOTLE_TM_FLUSH_SCHEDULED, 1, nx=True,
+                     ex=self.LOCK_TIMEOUT):
+            queue.enqueue(flush_tm_updates_job)
+
+    def get_pending_count(self):
+        r_con = get_connection()
+        return (r_con.hlen(POOTLE_TM_UPDATES) +
+                r_con.hlen(POOTLE_TM_UPDATES_PROCESSING))
+
+    def flush(self):
+        """Sends all pending updates to the TM servers.
+
+        :return: the number of units sent.
+        """
+        r_con = get_connection()
+        sent = 0
+        while True:
+            if not r_con.set(POOTLE_TM_FLUSH_LOCK, 1, nx=True,
+                             ex=self.LOCK_TIMEOUT):
+                # Another flush is in progress and will pick up pending
+                # updates once it's done
+                return sent
+
+            try:
+                # Updates pushed from now on need to schedule a new flush
+                r_con.delete(POOTLE_TM_FLUSH_SCHEDULED)
+                sent += self._flush_pending(r_con)
+            finally:
+                r_con.delete(POOTLE_TM_FLUSH_LOCK)
+
+            # Flushes scheduled while the lock was held gave up on the
+            # updates pushed in the meantime
+            if not r_con.exists(POOTLE_TM_UPDATES):
+                return sent
+
+    def _flush_pending(self, r_con):
+        # Updates left over by a flush which died half-way are sent before
+        # the ones pushed since
+        sent = self._flush_processing(r_con)
+        try:
+            r_con.rename(POOTLE_TM_UPDATES, POOTLE_TM_UPDATES_PROCESSING)
+        except ResponseError:
+            # No pending updates
+            return sent
+
+        return sent + self._flush_processing(r_con)
+
+    def _flush_processing(self, r_con):
+        sent = 0
+        cursor = 0
+        while True:
+            cursor, items = r_con.hscan(POOTLE_TM_UPDATES_PROCESSING, cursor,
+                                        count=self.BATCH_SIZE)
+            if items:
+                self._send(items.values())
+                sent += len(items)
+
+            if not cursor:
+                break
+
+        r_con.delete(POOTLE_TM_UPDATES_PROCESSING)
+        if sent:
+            logger.debug('Sent %d updates to the TM servers', sent)
+        return sent
+
+    def _send(self, items):
+        objs_by_language = defaultdict(list)
+        for item in items:
+            language, obj = json.loads(item)
+            objs_by_language[language].append(obj)
+
+        for language, objs in objs_by_language.iteritems():
+            self.broker.update_many(language, objs)
+
+        bump_index_revision(*objs_by_language.keys())
+
+
+tm_update_queue = TMUpdateQueue()
@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) Zing contributors.
+#
+# This file is a part of the Zing project. It is distributed under the GPL3
+# or later license. See the LICENSE file for a copy of the license and the
+# AUTHORS file for copyright and authorship information.
+
+"""Minimal bindings to the Linux inotify API."""
+
+import ctypes
+import ctypes.util
+import errno
+import os
+import select
+import struct
+from collections import namedtuple
+
+
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = 0o2000000
+
+#: Layout of `struct inotify_event`, without the trailing name
+EVENT_HEADER = struct.Struct('iIII')
+
+
+Event = namedtuple('Event', ['wd', 'mask', 'cookie', 'name'])
+
+
+_libc = None
+
+
+def _get_libc():
+    global _libc
+    if _libc is None:
+        _libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        if not hasattr(_libc, 'inotify_init1'):
+            raise OSError(errno.ENOSYS, "inotify is not available")
+    return _libc
+
+
+def _check(result):
+    if result < 0:
+        error = ctypes.get_errno()
+        raise OSError(error, os.strerror(error))
+    return result
+
+
+def parse_events(data):
+    """Yields the events contained in the `data` read from an inotify
+    file descriptor.
+    """
+    offset = 0
+    while offset + EVENT_HEADER.size <= len(data):
+        wd, mask, cookie, length = EVENT_HEADER.unpack_from(data, offset)
+        offset += EVENT_HEADER.size
+        name = data[offset:offset + length].rstrip(b'\0')
+        offset += length
+        yield Event(wd, mask, cookie, name)
+
+
+class Inotify(object):
+    """An inotify instance, watching files and directories for changes."""
+
+    #: Size of the buffer events are read into
+    BUFFER_SIZE = 64 * 1024
+
+    def __init__(self):
+        self.libc = _get_libc()
+        self.fd = _check(self.libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC))
+
+    def fileno(self):
+        return self.fd
+
+    def add_watch(self, path, mask):
+        """Watches `path` for the events in `mask`.
+
+        :return: the watch descriptor events for `path` are reported with.
+        """
+        if isinstance(path, unicode):
+            path = path.encode('utf-8')
+        return _check(self.libc.inotify_add_watch(self.fd, path, mask))
+
+    def rm_watch(self, wd):
+        _check(self.libc.inotify_rm_watch(self.fd, wd))
+
+    def read_events(self, timeout=None):
+        """Returns the pending events, waiting up to `timeout` seconds for
+        them to happen (forever if `None`).
+        """
+        try:
+            readable, w_, x_ = select.select([self.fd], [], [], timeout)
+        except select.error as e:
+            if e.args[0] == errno.EINTR:
+                return []
+            raise
+
+        if not readable:
+            return []
+
+        try:
+            data = os.read(self.fd, self.BUFFER_SIZE)
+        except OSError as e:
+            if e.errno in (errno.EAGAIN, errno.EINTR):
+                return []
+            raise
+        return list(parse_events(data))
+
+    def close(self):
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
@@ -20,3 +20,9 @@ def flatten(elements):
                 yield sub
         else:
             yield element
+
+
+def chunked(elements, size):
+    """Split a sequence in consecutive lists of at most `size` elements."""
+    for i in xrange(0, len(elements), size):
+        yield elements[i:i+size]
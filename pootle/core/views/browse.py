@@ -67,7 +67,8 @@ class BrowseDataViewMixin(object):
 
         has_admin_access = check_user_permission(self.request.user,
                                                  'administrate',
-                                                 self.permission_context)
+                                                 self.permission_context,
+                                                 request=self.request)
         if 'total' not in browsing_data and not has_admin_access:
             raise Http404
 
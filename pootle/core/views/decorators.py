@@ -44,7 +44,8 @@ def set_permissions(f):
     def method_wrapper(self, request, *args, **kwargs):
         request.permissions = get_matching_permissions(
             request.user,
-            self.permission_context) or []
+            self.permission_context,
+            request=request) or []
         return f(self, request, *args, **kwargs)
     return method_wrapper
 
@@ -0,0 +1,27 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) Zing contributors.
+#
+# This file is a part of the Zing project. It is distributed under the GPL3
+# or later license. See the LICENSE file for a copy of the license and the
+# AUTHORS file for copyright and authorship information.
+
+import logging
+
+from django.utils.deprecation import MiddlewareMixin
+
+from pootle.core.models import Revision
+
+
+class RevisionStatsMiddleware(MiddlewareMixin):
+    """Logs the number of revisions allocated for each request."""
+
+    def process_request(self, request):
+        Revision.reset_stats()
+
+    def process_response(self, request, response):
+        stats = Revision.get_stats()
+        if stats.calls:
+            logging.debug(u"%s %s: allocated %d revisions",
+                          request.method, request.path, stats.calls)
+        return response
@@ -26,6 +26,7 @@ class UnitsList {
     this.visibleRowsBefore = 10;
     this.visibleRowsAfter = 31;
     this.prefetchRows = 5; // extra rows around visible ones
+    this.tmPrefetchRows = 3; // upcoming rows to prefetch TM results for
 
     this.props = props;
   }
@@ -127,6 +128,7 @@ class UnitsList {
         }
         this.unit.provideFullData(fullUnitData);
         this.handleUnitChange(uid);
+        this.prefetchTMSuggestions();
       },
       (xhr, status) => this.handleFetchError(xhr, status)
     );
@@ -272,6 +274,16 @@ class UnitsList {
     );
   }
 
+  prefetchTMSuggestions() {
+    const uids = this.uids.slice(this.idx + 1, this.idx + 1 + this.tmPrefetchRows);
+    if (!uids.length) {
+      return;
+    }
+
+    // Fire and forget: results are warmed up in the server's cache
+    UnitAPI.prefetchTMSuggestions({ uids });
+  }
+
   cleanupUnusedUnits() {
     const aboveStart = 0;
     const aboveEnd = this.firstUnitInVicinity(
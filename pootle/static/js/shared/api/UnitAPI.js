@@ -28,6 +28,13 @@ const UnitAPI = {
     });
   },
 
+  prefetchTMSuggestions(body) {
+    return fetch({
+      body,
+      url: `${this.apiRoot}tm/prefetch/`,
+    });
+  },
+
   fetchFullUnitData(uId) {
     return fetch({
       queue: 'unitWidget',
@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) Zing contributors.
+#
+# This file is a part of the Zing project. It is distributed under the GPL3
+# or later license. See the LICENSE file for a copy of the license and the
+# AUTHORS file for copyright and authorship information.
+
+"""Benchmarks diffing of stores of different sizes.
+
+Run with: py.test --run-benchmarks -s tests/benchmarks/store_diff.py
+"""
+
+import time
+from collections import OrderedDict
+
+import pytest
+from translate.storage.po import pofile
+
+from pootle_store.constants import OBSOLETE, TRANSLATED
+from pootle_store.diff import DBStore, StoreDiff
+
+
+pytestmark = pytest.mark.benchmark
+
+
+class BenchmarkDBStore(DBStore):
+
+    def __init__(self, units):
+        super(BenchmarkDBStore, self).__init__(None)
+        self.units = units
+
+
+class BenchmarkStoreDiff(StoreDiff):
+
+    def __init__(self, target, source_store, source_revision):
+        self.target = target
+        self.target_revision = max(
+            unit['revision'] for unit in target.units.itervalues()
+        )
+        self.source_store = source_store
+        self.source_revision = source_revision
+
+
+def make_db_units(size):
+    units = OrderedDict()
+    for i in xrange(size):
+        unitid = u'Source string %d' % i
+        units[unitid] = {
+            'unitid': unitid,
+            'state': TRANSLATED,
+            'id': i + 1,
+            'index': i,
+            'revision': i % 100,
+            'source_f': unitid,
+            'target_f': u'Target string %d' % i,
+            'developer_comment': None,
+            'translator_comment': None,
+            'locations': None,
+            'context': None,
+        }
+
+    return units
+
+
+def make_file_store(db_units):
+    """Creates a file store out of `db_units`, with 1% of the units
+    changed, removed, added and moved around.
+    """
+    store = pofile()
+    uids = [unitid for unitid in db_units.iterkeys()]
+    step = 100
+    for i, unitid in enumerate(uids):
+        if i % step == 1:
+            # removed unit
+            continue
+
+        if i % step == 2:
+            store.addsourceunit(u'New string %d' % i).target = u'New %d' % i
+
+        unit = db_units[unitid]
+        target = unit['target_f']
+        if i % step == 3:
+            target = u'Changed %s' % target
+        store.addsourceunit(unit['source_f']).target = target
+
+    # move a unit from the beginning to the end
+    store.units.append(store.units.pop(0))
+    return store
+
+
+@pytest.mark.parametrize('size', [1000, 10000, 100000])
+def test_store_diff_benchmark(size):
+    db_units = make_db_units(size)
+    file_store = make_file_store(db_units)
+    # obsolete units shouldn't be taken into account
+    db_units.values()[-1]['state'] = OBSOLETE
+
+    start = time.time()
+    differ = BenchmarkStoreDiff(BenchmarkDBStore(db_units), file_store, 100)
+    result = differ.diff()
+    elapsed = time.time() - start
+
+    print('\nDiffing %d units: %.3f seconds' % (size, elapsed))
+    assert len(result['obsolete']) == size / 100
+    assert len(result['add']) == size / 100
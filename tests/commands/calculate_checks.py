@@ -10,6 +10,8 @@ import pytest
 
 from django.core.management import call_command
 
+from pootle.core.checks.checker import QualityCheckUpdater
+
 
 @pytest.mark.cmd
 @pytest.mark.django_db
@@ -40,3 +42,72 @@ def test_calculate_checks_language(capfd, project1):
     call_command('calculate_checks', '--language=language0')
     out, err = capfd.readouterr()
     assert 'Running calculate_checks for /language0/project0/' in out
+
+
+def _break_checks(tp):
+    """Removes some of the checks of `tp` and adds a stale one for every
+    unit.
+
+    :return: the checks of `tp`, and the `(unit_id, name)` pairs expected
+        once they are recalculated.
+    """
+    from pootle_store.models import QualityCheck, Unit
+
+    checks = QualityCheck.objects.filter(
+        unit__store__translation_project=tp)
+    expected = sorted(checks.values_list('unit_id', 'name'))
+    assert expected
+
+    checks.filter(name='printf').delete()
+    QualityCheck.objects.bulk_create([
+        QualityCheck(unit_id=unit_id, name='stale_check', category=0)
+        for unit_id in Unit.objects.filter(
+            store__translation_project=tp).values_list('id', flat=True)
+    ])
+    return checks, expected
+
+
+@pytest.mark.cmd
+@pytest.mark.django_db
+def test_calculate_checks_bulk_update(capfd, tp0):
+    checks, expected = _break_checks(tp0)
+
+    call_command('calculate_checks', '--language=language0',
+                 '--project=project0')
+    out, err = capfd.readouterr()
+    assert 'Running calculate_checks for /language0/project0/' in out
+    assert sorted(checks.values_list('unit_id', 'name')) == expected
+
+
+@pytest.mark.cmd
+@pytest.mark.django_db
+def test_calculate_checks_jobs(capfd, tp0):
+    checks, expected = _break_checks(tp0)
+
+    call_command('calculate_checks', '--project=project0', '--jobs=2')
+    out, err = capfd.readouterr()
+    tp_count = tp0.project.translationproject_set.live().count()
+    assert (
+        'Running calculate_checks for %d translation projects in 2 '
+        'processes' % tp_count) in out
+    assert 'in %s (' % tp0.pootle_path in out
+    assert sorted(checks.values_list('unit_id', 'name')) == expected
+
+
+@pytest.mark.cmd
+@pytest.mark.django_db
+def test_calculate_checks_jobs_failure(capfd, monkeypatch, tp0):
+    update = QualityCheckUpdater.update
+
+    def update_or_fail(self, *args, **kwargs):
+        if self.translation_project.pk == tp0.pk:
+            raise ValueError('Failed')
+        return update(self, *args, **kwargs)
+
+    monkeypatch.setattr(QualityCheckUpdater, 'update', update_or_fail)
+    call_command('calculate_checks', '--project=project0', '--jobs=2')
+    out, err = capfd.readouterr()
+    assert 'FAILED %s (' % tp0.pootle_path in out
+    other_tps = tp0.project.translationproject_set.live().exclude(pk=tp0.pk)
+    for tp in other_tps:
+        assert 'in %s (' % tp.pootle_path in out
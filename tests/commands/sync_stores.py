@@ -24,3 +24,20 @@ def test_sync_stores_noargs(capfd, project0, project1):
     # FIXME we should work out how to get something here
     assert out == ''
     assert err == ''
+
+
+@pytest.mark.cmd
+@pytest.mark.django_db
+def test_sync_stores_jobs(capfd, project0_disk):
+    """sync_stores distributes TPs across worker processes"""
+    capfd.readouterr()
+    call_command('sync_stores', '--project=%s' % project0_disk.code,
+                 '--jobs=2')
+    out, err = capfd.readouterr()
+    tp_count = project0_disk.translationproject_set.live().count()
+    assert (
+        'Running sync_stores for %d translation projects in 2 processes'
+        % tp_count) in out
+    for tp in project0_disk.translationproject_set.live():
+        assert 'Processed %s' % tp.pootle_path in out
+    assert ', 0 failed' in out
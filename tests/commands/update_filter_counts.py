@@ -0,0 +1,30 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) Zing contributors.
+#
+# This file is a part of the Zing project. It is distributed under the GPL3
+# or later license. See the LICENSE file for a copy of the license and the
+# AUTHORS file for copyright and authorship information.
+
+import pytest
+
+from django.core.management import call_command
+
+from pootle_store.models import Unit
+from pootle_store.util import SuggestionStates
+
+
+@pytest.mark.cmd
+@pytest.mark.django_db
+def test_update_filter_counts(tp0):
+    units = Unit.objects.filter(store__translation_project=tp0)
+    units.update(suggestion_count=0)
+
+    call_command('update_filter_counts', '--project=project0',
+                 '--language=language0')
+    expected = units.filter(
+        suggestion__state=SuggestionStates.PENDING,
+    ).distinct()
+    assert expected.exists()
+    assert (set(units.filter(suggestion_count__gt=0))
+            == set(expected))
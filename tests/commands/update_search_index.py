@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) Zing contributors.
+#
+# This file is a part of the Zing project. It is distributed under the GPL3
+# or later license. See the LICENSE file for a copy of the license and the
+# AUTHORS file for copyright and authorship information.
+
+import pytest
+
+from django.core.management import call_command
+
+from pootle_store.models import Unit, UnitSearchToken
+from pootle_store.unit.textsearch import FullTextUnitSearch
+
+
+@pytest.mark.cmd
+@pytest.mark.django_db
+def test_update_search_index(settings, tp0):
+    settings.POOTLE_UNIT_TEXT_SEARCH = (
+        'pootle_store.unit.textsearch.InvertedIndexUnitSearch')
+    units = Unit.objects.filter(store__translation_project=tp0)
+    UnitSearchToken.objects.all().delete()
+
+    call_command('update_search_index', '--project=project0',
+                 '--language=language0')
+    indexed = set(UnitSearchToken.objects.values_list('unit_id', flat=True))
+    expected = units.exclude(source_f='').values_list('id', flat=True)
+    assert indexed == set(expected)
+
+
+@pytest.mark.cmd
+@pytest.mark.django_db
+def test_update_search_index_unindexed(tp0):
+    UnitSearchToken.objects.all().delete()
+    call_command('update_search_index', '--project=project0',
+                 '--language=language0')
+    assert not UnitSearchToken.objects.exists()
+
+
+@pytest.mark.cmd
+@pytest.mark.django_db
+def test_update_search_index_create_indexes(monkeypatch, settings):
+    settings.POOTLE_UNIT_TEXT_SEARCH = (
+        'pootle_store.unit.textsearch.FullTextUnitSearch')
+    created = []
+    monkeypatch.setattr(FullTextUnitSearch, 'create_indexes',
+                        classmethod(lambda cls: created.append(cls)))
+    UnitSearchToken.objects.all().delete()
+
+    call_command('update_search_index')
+    assert created == [FullTextUnitSearch]
+    assert not UnitSearchToken.objects.exists()
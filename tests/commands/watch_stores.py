@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) Zing contributors.
+#
+# This file is a part of the Zing project. It is distributed under the GPL3
+# or later license. See the LICENSE file for a copy of the license and the
+# AUTHORS file for copyright and authorship information.
+
+import os
+import shutil
+
+import pytest
+
+from pootle.core.utils import inotify
+from pootle_app.management.commands.watch_stores import Command
+
+
+@pytest.fixture
+def watch_stores(project0_disk, tp0):
+    command = Command()
+    command.projects = [tp0.project.code]
+    command.languages = [tp0.language.code]
+    command.inotify = inotify.Inotify()
+    command.watch_translation_projects()
+    yield command
+    command.inotify.close()
+
+
+def _handle_events(command):
+    events = command.inotify.read_events(1)
+    while events:
+        for event in events:
+            command.handle_event(event)
+        events = command.inotify.read_events(0.1)
+
+
+@pytest.mark.cmd
+@pytest.mark.django_db
+def test_watch_stores_files(tp0, store0, watch_stores):
+    sources = sorted(store0.units.values_list('source_f', flat=True))
+    store0.sync()
+    _handle_events(watch_stores)
+    watch_stores.process_pending(overwrite=False)
+
+    new_path = os.path.join(os.path.dirname(store0.file.path), 'new.po')
+    shutil.copy(store0.file.path, new_path)
+    os.remove(store0.file.path)
+    _handle_events(watch_stores)
+    assert watch_stores.scans == set([tp0.id])
+    assert watch_stores.changed == {
+        tp0.id: set([os.path.join(tp0.real_path, 'new.po'),
+                     store0.file.name]),
+    }
+
+    watch_stores.process_pending(overwrite=False)
+    assert not watch_stores.has_pending
+    store0.refresh_from_db()
+    assert store0.obsolete
+    new_store = tp0.stores.live().get(name='new.po')
+    assert (
+        sorted(new_store.units.values_list('source_f', flat=True))
+        == sources)
+
+
+@pytest.mark.cmd
+@pytest.mark.django_db
+def test_watch_stores_overflow(tp0, watch_stores):
+    watch_stores.handle_event(
+        inotify.Event(-1, inotify.IN_Q_OVERFLOW, 0, b''))
+    assert watch_stores.rescans == set([tp0.id])
+
+
+@pytest.mark.cmd
+@pytest.mark.django_db
+def test_watch_stores_non_utf8_name(tp0, watch_stores):
+    wd = next(wd for wd, (tp, relative_dir) in watch_stores.watches.items()
+              if relative_dir == tp0.real_path)
+    watch_stores.handle_event(
+        inotify.Event(wd, inotify.IN_CLOSE_WRITE, 0, b'invalid\xff.po'))
+    assert not watch_stores.has_pending
@@ -29,6 +29,13 @@ def pytest_addoption(parser):
         default=False,
         help='Generate snapshots for tests marked with the `snapshot` mark.'
     )
+    parser.addoption(
+        '--run-benchmarks',
+        dest='run_benchmarks',
+        action='store_true',
+        default=False,
+        help='Run tests marked with the `benchmark` mark.'
+    )
 
 
 @pytest.fixture
@@ -40,7 +47,17 @@ def should_generate_snapshots(pytestconfig):
 def pytest_collection_modifyitems(items, config):
     """When willing to generate snapshots, only consider tests that
     make actual use of the snapshot stack.
+
+    Benchmarks are skipped unless explicitly requested.
     """
+    if not config.getoption('run_benchmarks'):
+        skip_benchmark = pytest.mark.skip(
+            reason='Use --run-benchmarks to run benchmarks.'
+        )
+        for item in items:
+            if 'benchmark' in item.keywords:
+                item.add_marker(skip_benchmark)
+
     if not config.getoption('generate_snapshots'):
         return
 
@@ -9,6 +9,12 @@
 
 import pytest
 
+from django.db import transaction
+
+from django_rq.queues import get_connection
+
+from pootle.core.mixins import stats_batch, treeitem
+from pootle.core.mixins.treeitem import POOTLE_DIRTY_TREEITEMS, cache
 from pootle_app.models import Directory
 from pootle_project.models import Project
 from pootle_store.models import Store
@@ -56,3 +62,98 @@ def test_get_parent(po_directory, project0, language0, tp0, store0, subdir0):
 
     parent = language0.directory.get_parent()
     assert parent is None
+
+
+@pytest.mark.django_db
+def test_stats_batch(project0, tp0, refresh_stats):
+    """Ensure batched updates produce the same stats as per-item updates."""
+    expected_stats = project0.get_stats()
+    expected_tp_stats = tp0.get_stats()
+
+    stores = list(tp0.stores.live())
+    for item in stores + [tp0, project0]:
+        item.clear_cache()
+    assert tp0.get_stats()['total'] is None
+
+    with stats_batch() as batch:
+        for store in stores:
+            store.update_all_cache()
+        assert len(batch) == len(stores)
+        assert tp0.pootle_path in batch.dirty_paths
+
+    assert tp0.get_stats() == expected_tp_stats
+    assert project0.get_stats() == expected_stats
+
+    r_con = get_connection()
+    scores = r_con.zrangebyscore(POOTLE_DIRTY_TREEITEMS, 1, '+inf')
+    assert scores == []
+
+
+@pytest.mark.django_db
+def test_stats_batch_rollback(store0, monkeypatch):
+    """Ensure rolled back batches don't leave paths registered as dirty."""
+    from django_rq.queues import get_queue
+
+    queue = get_queue('default')
+    monkeypatch.setattr(queue, '_async', True)
+    monkeypatch.setattr(treeitem, 'get_queue', lambda name: queue)
+    r_con = get_connection()
+    score = r_con.zscore(POOTLE_DIRTY_TREEITEMS, store0.pootle_path)
+
+    with pytest.raises(ValueError):
+        with transaction.atomic():
+            with stats_batch():
+                store0.update_all_cache()
+                raise ValueError
+
+    assert (
+        r_con.zscore(POOTLE_DIRTY_TREEITEMS, store0.pootle_path) == score)
+
+
+@pytest.mark.django_db
+def test_stats_batch_nested(store0):
+    """Ensure nested batches are collected by the outermost one."""
+    with stats_batch() as outer_batch:
+        with stats_batch() as inner_batch:
+            store0.update_all_cache()
+        assert inner_batch is outer_batch
+        assert len(outer_batch) == 1
+
+
+@pytest.mark.django_db
+def test_get_stats_children(tp0, language0, refresh_stats):
+    """Ensure bulk-retrieved children stats match individual stats."""
+    for item in (tp0, tp0.directory, language0):
+        stats = item.get_stats()
+        assert stats['children'] == [
+            child.get_stats(include_children=False)
+            for child in item.children
+        ]
+        assert stats['total'] == sum(
+            child_stats['total'] for child_stats in stats['children']
+        )
+        assert stats['is_dirty'] is False
+
+
+@pytest.mark.django_db
+def test_get_stats_aggregated_cache(tp0, language0, refresh_stats):
+    """Ensure aggregated stats are cached per set of children, and these
+    are invalidated by translation project updates.
+    """
+    children = list(language0.children)
+    key = language0.get_aggregated_stats_key(children)
+    stats = language0.get_stats(include_children=False)
+    assert cache.get(key) == dict(
+        (name, value) for name, value in stats.iteritems()
+        if name != 'is_dirty'
+    )
+
+    language0.set_children([tp0])
+    assert language0.get_aggregated_stats_key([tp0]) != key
+    assert (
+        language0.get_stats(include_children=False)['total']
+        == tp0.get_stats(include_children=False)['total']
+    )
+
+    tp0.update_all_cache()
+    assert language0.get_aggregated_stats_key(children) != key
@@ -11,7 +11,8 @@ import pytest
 
 from translate.filters.checks import FilterFailure
 
-from pootle_misc.checks import (ENChecker, check_names,
+from pootle_misc.checks import (ENChecker, FingerprintCache, SkipCheck,
+                                check_names, check_timer, fingerprint_cache,
                                 get_category_code, get_category_name,
                                 get_qc_data_by_name, get_qualitychecks,
                                 get_qualitycheck_schema)
@@ -436,3 +437,61 @@ def test_get_qualitycheck_schema():
 def test_get_qc_data_by_name(fake_check_name):
     """Tests for invalid values in `get_qc_data_by_name`."""
     assert get_qc_data_by_name(fake_check_name) == {}
+
+
+def test_fingerprint_cache():
+    calls = []
+
+    def get_fingerprint(string, is_source=False, translation=''):
+        calls.append(string)
+        if string == u'skip':
+            raise SkipCheck()
+        return string.upper()
+
+    cache = FingerprintCache(maxsize=2)
+    assert cache.get_fingerprint('check', get_fingerprint, u'a') == u'A'
+    assert cache.get_fingerprint('check', get_fingerprint, u'a') == u'A'
+    assert calls == [u'a']
+    assert (cache.hits, cache.misses) == (1, 1)
+
+    for i in range(2):
+        with pytest.raises(SkipCheck):
+            cache.get_fingerprint('check', get_fingerprint, u'skip')
+    assert calls == [u'a', u'skip']
+
+    # least recently used fingerprints are evicted
+    cache.get_fingerprint('other_check', get_fingerprint, u'a')
+    assert len(cache) == 2
+    cache.get_fingerprint('check', get_fingerprint, u'a')
+    assert calls == [u'a', u'skip', u'a', u'a']
+
+
+def test_fingerprint_cache_checks():
+    """Ensure cached source fingerprints produce the same results."""
+    fingerprint_cache.clear()
+    for i in range(2):
+        assert_check(checker.tags_differ, u'foo <b>bar</b>',
+                     u'FOO <b>BAR</b>', True)
+        assert_check(checker.tags_differ, u'foo <b>bar</b>',
+                     u'FOO BAR', False)
+        assert_check(checker.c_format, u'%d foo', u'%d FOO', True)
+        assert_check(checker.c_format, u'%d foo', u'%s FOO', False)
+    assert fingerprint_cache.misses == 2
+    assert fingerprint_cache.hits == 6
+
+
+def test_check_timer():
+    check_timer.enabled = True
+    check_timer.reset()
+    try:
+        checker.str1, checker.str2 = u'%d foo', u'%d FOO'
+        checker.language_code = 'fr'
+        checker.run_test(checker.c_format, None)
+        checker.run_test(checker.c_format, None)
+    finally:
+        check_timer.enabled = False
+
+    report = check_timer.get_report()
+    assert [(name, calls) for name, calls, elapsed_ in report] == [
+        ('c_format', 2),
+    ]
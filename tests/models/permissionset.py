@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) Zing contributors.
+#
+# This file is a part of the Zing project. It is distributed under the GPL3
+# or later license. See the LICENSE file for a copy of the license and the
+# AUTHORS file for copyright and authorship information.
+
+import pytest
+
+from django.core.cache import caches
+from django.http import HttpRequest
+
+from pootle_app.models import permissions
+from pootle_app.models.permissions import (check_user_permission,
+                                           get_matching_permissions,
+                                           get_permissions_cache_key)
+from pytest_pootle.fixtures.models.permission_set import \
+    _require_permission_set
+
+
+@pytest.fixture
+def permissions_cache(monkeypatch):
+    """Caches permissions in a (fake) Redis cache."""
+    cache = caches['stats']
+    monkeypatch.setattr(permissions, 'cache', cache)
+    yield cache
+    cache.delete_pattern(get_permissions_cache_key('*', '*'))
+
+
+@pytest.mark.django_db
+def test_get_matching_permissions_fallback(member, default, tp0, translate):
+    directory = tp0.directory
+    # `member` has no permission set of its own
+    member_permissions = get_matching_permissions(member, directory)
+    assert member_permissions == get_matching_permissions(default, directory)
+
+    _require_permission_set(member, directory, [translate])
+    assert get_matching_permissions(member, directory) == {'translate': True}
+
+
+@pytest.mark.django_db
+def test_permissions_cache_invalidation(permissions_cache, member, default,
+                                        tp0, translate, administrate):
+    directory = tp0.directory
+    permission_set = _require_permission_set(member, directory, [translate])
+
+    assert not check_user_permission(member, 'administrate', directory)
+    key = get_permissions_cache_key(member.username, directory.pootle_path)
+    assert permissions_cache.get(key) == {'translate': True}
+
+    permission_set.positive_permissions.add(administrate)
+    assert permissions_cache.get(key) is None
+    assert check_user_permission(member, 'administrate', directory)
+
+    # Permission sets of other TPs don't affect the cached ones
+    other_tp = tp0.project.translationproject_set.exclude(pk=tp0.pk)[0]
+    _require_permission_set(member, other_tp.directory, [translate])
+    assert permissions_cache.get(key) is not None
+
+    # Project permission sets do
+    _require_permission_set(member, tp0.project.directory, [translate])
+    assert permissions_cache.get(key) is None
+
+    permission_set.delete()
+    get_matching_permissions(member, directory)
+    _require_permission_set(default, directory, [translate])
+    assert permissions_cache.get(key) is None
+
+
+@pytest.mark.django_db
+def test_permissions_request_memoization(permissions_cache, member, tp0):
+    directory = tp0.directory
+    request = HttpRequest()
+    permissions = get_matching_permissions(member, directory, request=request)
+
+    permissions_cache.delete_pattern(get_permissions_cache_key('*', '*'))
+    assert get_matching_permissions(
+        member, directory, request=request) is permissions
+    key = get_permissions_cache_key(member.username, directory.pootle_path)
+    assert permissions_cache.get(key) is None
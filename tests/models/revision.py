@@ -61,3 +61,13 @@ def test_revision_incr(store0):
     assert db_unit.revision != previous_revision
     assert Revision.get() != previous_revision
     assert db_unit.revision == Revision.get()
+
+
+@pytest.mark.django_db
+def test_revision_stats(revision):
+    """Tests revision allocations are counted."""
+    Revision.reset_stats()
+    Revision.incr()
+    Revision.incr()
+
+    assert Revision.get_stats().calls == 2
@@ -14,6 +14,7 @@ from pytest_pootle.factories import ScoreLogFactory, SubmissionFactory
 
 from pootle_statistics.models import (ScoreLog, SubmissionTypes, SubmissionFields,
                                       SIMILARITY_THRESHOLD)
+from reports.utils import get_paid_wordcount_totals
 
 
 TEST_EDIT_TYPES = (SubmissionTypes.NORMAL, SubmissionTypes.SYSTEM,
@@ -61,3 +62,33 @@ def test_is_similarity_taken_from_mt(similarity, mt_similarity):
         assert score_log.is_similarity_taken_from_mt()
     else:
         assert not score_log.is_similarity_taken_from_mt()
+
+
+@pytest.mark.django_db
+def test_get_paid_wordcount_totals():
+    """Paid wordcounts aggregated by the DB match the per-entry ones."""
+    scores = ScoreLog.objects.all()
+    scores.filter(id__in=list(scores.values_list('id', flat=True)[:10])) \
+          .update(rate=0.5, review_rate=0.2)
+    assert scores.exists()
+
+    translated = {}
+    reviewed = {}
+    suggested = 0
+    for score in scores:
+        translated_words, reviewed_words = score.get_paid_wordcounts()
+        if translated_words is not None:
+            translated[score.rate] = (translated.get(score.rate, 0) +
+                                      translated_words)
+        if reviewed_words is not None:
+            reviewed[score.review_rate] = (
+                reviewed.get(score.review_rate, 0) + reviewed_words)
+        suggested += score.get_suggested_wordcount() or 0
+
+    (translated_totals, reviewed_totals,
+     suggested_total) = get_paid_wordcount_totals(scores)
+    assert (
+        {rate: round(words, 2) for rate, words in translated_totals.items()}
+        == {rate: round(words, 2) for rate, words in translated.items()})
+    assert reviewed_totals == reviewed
+    assert suggested_total == suggested
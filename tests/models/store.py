@@ -7,6 +7,7 @@
 # or later license. See the LICENSE file for a copy of the license and the
 # AUTHORS file for copyright and authorship information.
 
+import difflib
 import io
 import os
 
@@ -16,14 +17,16 @@ from pytest_pootle.factories import (LanguageDBFactory, StoreDBFactory,
                                      TranslationProjectFactory)
 
 from translate.storage.factory import getclass
+from translate.storage.po import pofile
 
 from django.core.exceptions import ValidationError
 
 from pootle.core.models import Revision
 from pootle.core.url_helpers import to_tp_relative_path
 from pootle_store.constants import OBSOLETE, PARSED, TRANSLATED
-from pootle_store.diff import StoreDiff
-from pootle_store.models import Store
+from pootle_store.diff import StoreDiff, get_opcodes
+from pootle_store.models import QualityCheck, Store
+from pootle_store.stats import StoreStatsCalculator
 from pootle_store.syncer import PoStoreSyncer
 
 
@@ -433,6 +436,15 @@ def test_store_po_deserializer(test_fs, store_po):
     assert len(ttk_po.units) - 1 == store_po.units.count()
 
 
+@pytest.mark.django_db
+def test_store_serialize_streaming(tp0):
+    """Streaming serialization writes the same file as converting the
+    whole store.
+    """
+    store = tp0.stores.get(name='complex.po')
+    assert store.serialize() == str(store.syncer.convert())
+
+
 @pytest.mark.django_db
 def test_store_po_serializer(test_fs, store_po):
 
@@ -664,6 +676,40 @@ def test_store_diff_delete_obsoleted_source_unit(diffable_stores):
     assert not differ.diff()
 
 
+@pytest.mark.parametrize('a, b', [
+    ([], []),
+    ([], ['x', 'y']),
+    (['x', 'y'], []),
+    (['a', 'b', 'c'], ['a', 'b', 'c']),
+    (['a', 'b', 'c'], ['a', 'x', 'b', 'c']),
+    (['a', 'b', 'c', 'd'], ['a', 'c', 'b', 'd']),
+    (['a', 'b', 'c', 'd'], ['a', 'd']),
+    (['a', 'b', 'c'], ['x', 'b', 'y']),
+    (['a', 'b', 'c', 'd'], ['d', 'c', 'b', 'a']),
+    (['a', 'b', 'c', 'd', 'e'], ['b', 'c', 'e', 'a', 'd']),
+    (['a', 'b', 'a'], ['b', 'a', 'c']),
+])
+def test_store_diff_get_opcodes(a, b):
+    opcodes = get_opcodes(a, b)
+    result = []
+    for (tag, i1, i2, j1, j2) in opcodes:
+        if tag == 'equal':
+            assert a[i1:i2] == b[j1:j2]
+            result += a[i1:i2]
+        else:
+            result += b[j1:j2]
+
+    assert result == b
+
+    # at least as many items as `SequenceMatcher` are kept
+    def count_equal(opcodes):
+        return sum(i2 - i1 for tag, i1, i2, j1_, j2_ in opcodes
+                   if tag == 'equal')
+
+    assert count_equal(opcodes) >= count_equal(
+        difflib.SequenceMatcher(None, a, b).get_opcodes())
+
+
 @pytest.mark.django_db
 def test_store_syncer(tp0):
     store = tp0.stores.live().first()
@@ -879,3 +925,101 @@ def test_store_syncer_new_units(dummy_store_syncer_units, tp0):
 @pytest.mark.django_db
 def test_store_path(store0):
     assert store0.path == to_tp_relative_path(store0.pootle_path)
+
+
+@pytest.mark.django_db
+def test_store_stats_calculator(project0):
+    """Tests grouped stats match the ones calculated store by store."""
+    stores = list(Store.objects.live().filter(
+        translation_project__project=project0))
+    stats = StoreStatsCalculator.for_project(project0).calculate()
+
+    assert sorted(stats.keys()) == sorted(store.pk for store in stores)
+    for store in stores:
+        assert stats[store.pk] == {
+            'get_wordcount_stats': store._get_wordcount_stats(),
+            'get_checks': store._get_checks(),
+            'get_suggestion_count': store._get_suggestion_count(),
+            'get_mtime': store._get_mtime(),
+            'get_last_updated': store._get_last_updated(),
+            'get_last_action': store._get_last_action(),
+        }
+
+
+@pytest.mark.django_db
+def test_store_add_units(tp0, member):
+    """Tests units added in bulk match the ones added one by one."""
+    ttk = pofile()
+    ttk.addsourceunit(u'Translated').target = u'Traducido'
+    ttk.addsourceunit(u'Untranslated')
+    fuzzy_unit = ttk.addsourceunit(u'Fuzzy')
+    fuzzy_unit.target = u'Difuso'
+    fuzzy_unit.markfuzzy()
+    ttk.addsourceunit(u'Failing check.').target = u'Comprobación fallida'
+
+    revision = Revision.incr()
+    to_add = [(unit, index) for index, unit in enumerate(ttk.units)]
+    single_store = StoreDBFactory(translation_project=tp0,
+                                  parent=tp0.directory)
+    for unit, index in to_add:
+        single_store.addunit(unit, index, user=member,
+                             update_revision=revision)
+    bulk_store = StoreDBFactory(translation_project=tp0,
+                                parent=tp0.directory)
+    added = bulk_store.add_units(to_add, user=member,
+                                 update_revision=revision)
+
+    assert len(added) == len(to_add)
+    assert all(unit.id is not None for unit in added)
+
+    def get_units(store):
+        return list(store.unit_set.order_by('index').values_list(
+            'index', 'unitid', 'source_f', 'target_f', 'state', 'revision',
+            'source_wordcount', 'target_wordcount', 'source_length',
+            'target_length', 'submitted_by', 'reviewed_by',
+        ))
+
+    def get_submissions(store):
+        return list(store.submission_set.order_by('unit__index').values_list(
+            'unit__index', 'type', 'field', 'submitter', 'new_value',
+        ))
+
+    def get_checks(store):
+        return sorted(
+            QualityCheck.objects.filter(unit__store=store).values_list(
+                'unit__index', 'name', 'category', 'false_positive',
+            )
+        )
+
+    assert get_units(bulk_store) == get_units(single_store)
+    assert get_submissions(bulk_store) == get_submissions(single_store)
+    assert get_checks(bulk_store) == get_checks(single_store)
+    assert get_checks(bulk_store)
+
+
+@pytest.mark.django_db
+def test_store_parse_cache(project0_disk, store0, settings, tmpdir):
+    """Parsed files are shared through the parse cache until they change."""
+    from pootle_store import parse_cache
+
+    settings.POOTLE_PARSE_CACHE_DIRECTORY = str(tmpdir)
+    store0.sync()
+    parse_cache.stats.reset()
+
+    def load_file_store():
+        store0.file._delete_store_cache()
+        return store0.file.store
+
+    file_store = load_file_store()
+    assert (parse_cache.stats.hits, parse_cache.stats.misses) == (0, 1)
+
+    cached_store = load_file_store()
+    assert (parse_cache.stats.hits, parse_cache.stats.misses) == (1, 1)
+    assert cached_store is not file_store
+    assert cached_store.getids() == file_store.getids()
+    assert store0.header() == file_store.header()
+
+    with open(store0.file.path, 'a') as f:
+        f.write('\n')
+    load_file_store()
+    assert (parse_cache.stats.hits, parse_cache.stats.misses) == (1, 2)
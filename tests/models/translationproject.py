@@ -67,3 +67,42 @@ def test_tp_checker(po_directory, tp_checker_tests, settings):
                                        checks.StandardChecker)
         ]
     assert [x.__class__ for x in tp.checker.checkers] == checkerclasses
+
+
+@pytest.mark.django_db
+def test_tp_update_from_disk_unchanged(project0_disk, tp0, store0,
+                                       monkeypatch):
+    """Unchanged translation projects and touched files are skipped."""
+    from pootle_store.updater import StoreUpdater
+
+    store0.sync()
+    tp0.update_from_disk(force=True)
+
+    updated = []
+    update_from_disk = StoreUpdater.update_from_disk
+
+    def _update_from_disk(self, *args, **kwargs):
+        updated.append(self.target_store.pootle_path)
+        return update_from_disk(self, *args, **kwargs)
+
+    def _scan_files(self):
+        raise AssertionError("Unchanged tree was scanned")
+
+    monkeypatch.setattr(StoreUpdater, 'update_from_disk', _update_from_disk)
+    monkeypatch.setattr(TranslationProject, 'scan_files', _scan_files)
+    assert not tp0.update_from_disk()
+    assert updated == []
+
+    # Touched files are not parsed again
+    mtime = os.stat(store0.file.path).st_mtime + 10
+    os.utime(store0.file.path, (mtime, mtime))
+    assert not tp0.update_from_disk()
+    assert updated == []
+    store0.refresh_from_db()
+    assert store0.file_mtime == store0.get_file_mtime()
+
+    # Changed ones are
+    with open(store0.file.path, 'a') as f:
+        f.write('\n')
+    tp0.update_from_disk()
+    assert updated == [store0.pootle_path]
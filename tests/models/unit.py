@@ -17,8 +17,9 @@ from django.utils import timezone
 
 from pootle.core.mixins.treeitem import CachedMethods
 from pootle_store.constants import FUZZY, OBSOLETE, TRANSLATED, UNTRANSLATED
-from pootle_store.models import Unit
+from pootle_store.models import Store, Unit
 from pootle_store.syncer import UnitSyncer
+from pootle_store.unit.altsrc import AltSrcFinder
 
 
 User = get_user_model()
@@ -404,3 +405,130 @@ def test_unit_resurrect_active_unit(store0):
     assert not unit.isobsolete()
     assert not unit.resurrect()
     assert not unit.isobsolete()
+
+
+@pytest.mark.django_db
+def test_unit_altsrc_finder(store0, language1):
+    """Tests alternative sources are found for many units at once."""
+    alt_store = Store.objects.get(
+        translation_project__project=store0.translation_project.project,
+        translation_project__language=language1,
+        name=store0.name,
+    )
+    units = list(store0.unit_set.all())
+    # make sure some of the units have alternative sources
+    alt_units = alt_store.unit_set.order_by('index')[:2]
+    for unit, alt_unit in zip(units, alt_units):
+        Unit.objects.filter(id=alt_unit.id).update(
+            unitid_hash=unit.unitid_hash, state=TRANSLATED,
+            target_f=u'Alternative',
+        )
+    altsrcs = AltSrcFinder(store0, [language1]).find(units)
+
+    assert sorted(altsrcs.keys()) == sorted(unit.id for unit in units)
+    for unit in units:
+        expected = list(alt_store.unit_set.filter(
+            unitid_hash=unit.unitid_hash, state=TRANSLATED,
+        ).values_list('id', flat=True))
+        assert [altsrc.id for altsrc in altsrcs[unit.id]] == expected
+        assert all(altsrc.language_code == language1.code
+                   for altsrc in altsrcs[unit.id])
+
+    assert any(altsrcs.values())
+    assert AltSrcFinder(store0, []).find(units[:1]) == {units[0].id: []}
+
+
+@pytest.mark.django_db
+def test_unit_altsrc_finder_revision(store0, language1):
+    """Tests cached alternative sources are only invalidated by changes to
+    the alternative source stores.
+    """
+    finder = AltSrcFinder(store0, [language1])
+    revision = finder.get_revision()
+
+    Unit.objects.filter(id=store0.unit_set.first().id).update(
+        revision=revision + 10)
+    assert finder.get_revision() == revision
+
+    alt_unit = Unit.objects.filter(
+        store__pootle_path__in=finder.alt_pootle_paths).first()
+    Unit.objects.filter(id=alt_unit.id).update(revision=revision + 20)
+    assert finder.get_revision() == revision + 20
+
+
+@pytest.mark.django_db
+def test_unit_filter_counts(store0, system):
+    """Tests the suggestion and check counts of units are kept up to
+    date.
+    """
+    tp = store0.translation_project
+    unit = store0.units.filter(state=UNTRANSLATED)[0]
+    initial = unit.suggestion_count
+
+    sugg, added_ = unit.add_suggestion(u'foo bar baz')
+    assert unit.suggestion_count == initial + 1
+    assert Unit.objects.get(id=unit.id).suggestion_count == initial + 1
+
+    unit.reject_suggestion(sugg, tp, system)
+    assert unit.suggestion_count == initial
+    assert Unit.objects.get(id=unit.id).suggestion_count == initial
+
+    # A critical check fails for the accepted translation, which lacks
+    # the source's placeholder
+    sugg, added_ = unit.add_suggestion(u'foo')
+    unit.accept_suggestion(sugg, tp, system)
+    unit = Unit.objects.get(id=unit.id)
+    checks = unit.get_active_qualitychecks()
+    assert unit.suggestion_count == initial
+    assert unit.check_count == checks.count() > 0
+    assert (unit.critical_check_count
+            == unit.get_active_critical_qualitychecks().count())
+
+    for check in checks:
+        unit.toggle_qualitycheck(check.id, True, system)
+    assert unit.check_count == 0
+    assert unit.critical_check_count == 0
+    assert Unit.objects.get(id=unit.id).check_count == 0
+
+
+@pytest.mark.django_db
+def test_unit_save_filter_counts(store0):
+    """Tests saving a unit doesn't overwrite the counts updated since it
+    was loaded.
+    """
+    unit = store0.units.first()
+    Unit.simple_objects.filter(id=unit.id).update(
+        suggestion_count=3, check_count=2, critical_check_count=1)
+
+    unit.translator_comment = u'Stale counts'
+    unit._comment_updated = True
+    unit.save()
+
+    unit = Unit.objects.get(id=unit.id)
+    assert unit.translator_comment == u'Stale counts'
+    assert unit.suggestion_count == 3
+    assert unit.check_count == 2
+    assert unit.critical_check_count == 1
+
+
+@pytest.mark.django_db
+def test_unit_update_filter_counts(store0):
+    """Tests denormalized counts are recalculated for many units."""
+    units = store0.unit_set.all()
+    expected = {
+        unit.id: {
+            'suggestion_count': unit.get_suggestions().count(),
+            'check_count': unit.get_active_qualitychecks().count(),
+            'critical_check_count':
+                unit.get_active_critical_qualitychecks().count(),
+        }
+        for unit in units
+    }
+    units.update(suggestion_count=0, check_count=5, critical_check_count=5)
+
+    assert Unit.update_filter_counts(expected.keys()) == expected
+    for unit in units:
+        assert unit.suggestion_count == expected[unit.id]['suggestion_count']
+        assert unit.check_count == expected[unit.id]['check_count']
+        assert (unit.critical_check_count
+                == expected[unit.id]['critical_check_count'])
@@ -24,6 +24,7 @@ from pootle_app.models.permissions import PermissionSet, check_user_permission
 from pootle_language.models import Language
 from pootle_project.models import Project
 from pootle_store.constants import FUZZY, TRANSLATED
+from pootle_store.models import Unit
 from pootle_translationproject.models import TranslationProject
 
 
@@ -200,6 +201,30 @@ def test_delete_purge_user(en_tutorial_po_member_updated,
                        lambda m: m.delete(purge=True))
 
 
+@pytest.mark.django_db
+def test_purge_user_reverts_units_in_bulk(store0, member2):
+    """Test units edited by a purged user are reverted at once"""
+    units = list(store0.units.filter(state=TRANSLATED)[:3])
+    for unit in units:
+        unit.target = u"SPAM"
+        unit.submitted_by = member2
+        unit.save()
+
+    accounts.utils.UserPurger(member2).purge()
+
+    revisions = set()
+    for unit in units:
+        unit = Unit.objects.get(id=unit.id)
+        assert unit.target != u"SPAM"
+        assert unit.submitted_by != member2
+        # Checks were updated for the reverted targets
+        assert not unit.update_qualitychecks(keep_false_positives=True)
+        revisions.add(unit.revision)
+
+    # A single revision is allocated for all reverted units
+    assert len(revisions) == 1
+
+
 @pytest.mark.django_db
 def test_verify_user(member_with_email):
     """Test verifying user using `verify_user` function"""
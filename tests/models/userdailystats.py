@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) Zing contributors.
+#
+# This file is a part of the Zing project. It is distributed under the GPL3
+# or later license. See the LICENSE file for a copy of the license and the
+# AUTHORS file for copyright and authorship information.
+
+from datetime import timedelta
+
+import pytest
+
+from django.contrib.auth import get_user_model
+from django.db.models import Case, IntegerField, Sum, When
+from django.utils import timezone
+
+from pootle.core.utils.timezone import aware_datetime
+from pootle_statistics.models import (ScoreLog, Submission,
+                                      TranslationActionCodes, UserDailyStats)
+
+
+def _get_daily_stats():
+    return sorted(
+        UserDailyStats.objects.values_list(
+            'user_id', 'translation_project_id', 'date', 'score',
+            'suggested', 'translated', 'reviewed', 'submissions'))
+
+
+@pytest.mark.django_db
+def test_user_daily_stats_incremental(store0, member):
+    unit = store0.units.first()
+    unit.add_suggestion(u'Daily stats suggestion', user=member)
+
+    daily_stats = _get_daily_stats()
+    UserDailyStats.refresh()
+    assert _get_daily_stats() == daily_stats
+
+
+@pytest.mark.django_db
+def test_user_daily_stats_refresh_users(member, member2):
+    UserDailyStats.objects.all().delete()
+    UserDailyStats.refresh(user_ids=[member.id])
+
+    assert (
+        set(UserDailyStats.objects.values_list('user_id', flat=True))
+        == set([member.id]))
+    assert (
+        sum(UserDailyStats.objects.values_list('submissions', flat=True))
+        == Submission.objects.filter(submitter=member).count())
+
+
+def test_user_daily_stats_split_range():
+    start = aware_datetime(2017, 1, 1, 12, tz=timezone.utc)
+    end = aware_datetime(2017, 1, 5, 8, tz=timezone.utc)
+    days, partial = UserDailyStats.split_range(start, end)
+    assert (
+        dict(days.children)
+        == {'date__gte': start.date() + timedelta(days=1),
+            'date__lt': end.date()})
+
+    # Ranges which don't cover a whole day are entirely partial
+    days, partial = UserDailyStats.split_range(start, start + timedelta(1))
+    assert days is None
+    days, partial = UserDailyStats.split_range(
+        start, start + timedelta(hours=6))
+    assert days is None
+
+
+def _get_raw_top_scores(past, now):
+    """Aggregates score logs in the `past`-`now` period, the way top
+    scorers were calculated before daily stats.
+    """
+    User = get_user_model()
+    return {
+        item['user']: item
+        for item in ScoreLog.objects.filter(
+            creation_time__range=[past, now],
+        ).exclude(
+            user__in=User.objects.meta_users(),
+        ).values('user').annotate(
+            total_score=Sum('score_delta'),
+            suggested=Sum(
+                Case(
+                    When(action_code=TranslationActionCodes.SUGG_ADDED,
+                         then='wordcount'),
+                    default=0,
+                    output_field=IntegerField(),
+                )
+            ),
+            translated=Sum(
+                Case(
+                    When(translated_wordcount__isnull=False,
+                         then='translated_wordcount'),
+                    default=0,
+                    output_field=IntegerField(),
+                )
+            ),
+            reviewed=Sum(
+                Case(
+                    When(action_code__in=[
+                        TranslationActionCodes.SUGG_REVIEWED_ACCEPTED,
+                        TranslationActionCodes.REVIEWED,
+                        TranslationActionCodes.EDITED,
+                    ], translated_wordcount__isnull=True, then='wordcount'),
+                    default=0,
+                    output_field=IntegerField(),
+                )
+            ),
+        ).order_by()
+    }
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('skipped_days', [0, 7])
+def test_user_top_scorers_daily_stats(member, skipped_days):
+    """Top scorers add up whole days and partial days."""
+    User = get_user_model()
+    now = timezone.now()
+    earliest = ScoreLog.objects.earliest('creation_time').creation_time
+    days = (now - earliest).days + 1 - skipped_days
+
+    top_scorers = User.top_scorers(days=days, limit=None)
+    scores = _get_raw_top_scores(now - timedelta(days), timezone.now())
+    assert top_scorers
+    assert len(top_scorers) == len(scores)
+    for item in top_scorers:
+        user_scores = scores[item['user'].id]
+        assert (round(item['total_score'], 4)
+                == round(user_scores['total_score'], 4))
+        assert item['suggested'] == user_scores['suggested']
+        assert item['translated'] == user_scores['translated']
+        assert item['reviewed'] == user_scores['reviewed']
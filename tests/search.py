@@ -7,10 +7,22 @@
 # or later license. See the LICENSE file for a copy of the license and the
 # AUTHORS file for copyright and authorship information.
 
+import time
+
 import pytest
 
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import connection, transaction
+
+from django_rq.queues import get_connection
+
 from pootle.core.delegate import search_backend
+from pootle.core.models import Revision
 from pootle.core.plugin import getter
+from pootle.core.search import SearchBackend, SearchBroker
+from pootle.core.search.index import get_index_revision
+from pootle.core.search.queue import (POOTLE_TM_FLUSH_SCHEDULED,
+                                      TMUpdateQueue, flush_tm_updates_job)
 from pootle_project.models import Project
 from pootle_statistics.models import SubmissionTypes
 from pootle_store.getters import get_search_backend
@@ -21,6 +33,7 @@ from pootle_store.unit.filters import (
     FilterNotFound, UnitChecksFilter, UnitContributionFilter, UnitSearchFilter,
     UnitStateFilter, UnitTextSearch)
 from pootle_store.unit.search import DBSearchBackend
+from pootle_store.unit.textsearch import InvertedIndexUnitSearch
 
 
 def _expected_text_search_words(text, exact):
@@ -78,17 +91,19 @@ def _test_units_checks_filter(qs, check_type, check_data):
             item.qualitycheck_set.values_list("category", flat=True)
         if check_data:
             assert(
-                list(result)
+                list(result.order_by("pk"))
                 == list(
                     qs.filter(
                         qualitycheck__false_positive=False,
-                        qualitycheck__category=check_data).distinct()))
+                        qualitycheck__category=check_data
+                    ).distinct().order_by("pk")))
         else:
             assert(
-                list(result)
+                list(result.order_by("pk"))
                 == list(
                     qs.filter(
-                        qualitycheck__false_positive=False).distinct()))
+                        qualitycheck__false_positive=False
+                    ).distinct().order_by("pk")))
 
 
 def _test_units_contribution_filter(qs, user, unit_filter):
@@ -134,9 +149,10 @@ def _test_units_contribution_filter(qs, user, unit_filter):
         == list(result.order_by("pk")))
 
 
-def _test_unit_text_search(qs, text, sfields, exact, empty=True):
+def _test_unit_text_search(qs, text, sfields, exact, empty=True,
+                           search_class=UnitTextSearch):
 
-    unit_search = UnitTextSearch(qs)
+    unit_search = search_class(qs)
     result = unit_search.search(text, sfields, exact).order_by("pk")
     words = unit_search.get_words(text, exact)
     fields = unit_search.get_search_fields(sfields)
@@ -222,6 +238,41 @@ def test_get_units_text_search(units_text_searches):
             qs, search["text"], search["sfields"], search["exact"])
 
 
+@pytest.mark.django_db
+def test_get_units_inverted_index_search(units_text_searches):
+    search = units_text_searches
+    InvertedIndexUnitSearch.index_units(Unit.objects.all())
+
+    for qs in [Unit.objects.all(), Unit.objects.live()]:
+        _test_unit_text_search(
+            qs, search["text"], search["sfields"], search["exact"],
+            qs.exists() and search["empty"],
+            search_class=InvertedIndexUnitSearch)
+
+
+@pytest.mark.django_db
+def test_inverted_index_unit_save(settings, store0):
+    settings.POOTLE_UNIT_TEXT_SEARCH = (
+        'pootle_store.unit.textsearch.InvertedIndexUnitSearch')
+    unit = store0.units.first()
+    unit.target = u'Réglage dépassé'
+    unit.save()
+
+    def _search(text, exact=False):
+        return list(
+            InvertedIndexUnitSearch(Unit.objects.all()).search(
+                text, ["target"], exact=exact))
+
+    assert _search(u'GLAGE PASS') == [unit]
+    assert _search(u'glage dépassé', exact=True) == [unit]
+    assert _search(u'glage pass', exact=True) == []
+
+    unit.target = u'Autre chose'
+    unit.save()
+    assert _search(u'glage') == []
+    assert _search(u'chose') == [unit]
+
+
 @pytest.mark.django_db
 def test_units_contribution_filter_none(units_contributor_searches):
     unit_filter = units_contributor_searches
@@ -334,3 +385,314 @@ def test_unit_search_backend_custom():
     search_backend.connect(get_search_backend, sender=Unit)
 
     assert search_backend.get(Unit) is CustomSearchBackend
+
+
+@pytest.mark.django_db
+def test_unit_search_backend_uid_window(monkeypatch, tp0, admin):
+    """Tests the window of uids around a unit matches the one found by
+    scanning all the results.
+    """
+    monkeypatch.setattr('pootle_store.unit.search.MAX_RESULTS', 4)
+    store = tp0.stores.first()
+    kwargs = {
+        'language_code': tp0.language.code,
+        'project_code': tp0.project.code,
+        'dir_path': '',
+        'filename': store.name,
+        'category': None,
+        'checks': None,
+        'soptions': [],
+        'month': None,
+        'search': None,
+        'sfields': [],
+        'user': None,
+    }
+    all_uids = list(
+        DBSearchBackend(admin, **kwargs).results.values_list('pk', 'store_id')
+    )
+    assert len(all_uids) > 4
+
+    for position, (uid, store_id_) in enumerate(all_uids):
+        backend = DBSearchBackend(admin, uid=uid, **kwargs)
+        begin, end, total, uids = backend.get_uids()
+        expected_begin = max(position - 2, 0)
+        expected_end = min(expected_begin + 4, len(all_uids))
+        assert total == len(all_uids)
+        assert (begin, end) == (expected_begin, expected_end)
+        assert uids == all_uids[expected_begin:expected_end]
+
+    # uids not matching the search get the first results
+    backend = DBSearchBackend(admin, uid=-1, **kwargs)
+    assert backend.get_uids() == (0, 4, len(all_uids), all_uids[:4])
+
+
+@pytest.mark.django_db
+def test_unit_search_backend_total_suggestions(monkeypatch, tp0, admin,
+                                               member):
+    """Tests cached totals of results are invalidated when suggestions are
+    added, which doesn't change the revision.
+    """
+    monkeypatch.setattr('pootle_store.unit.search.cache',
+                        LocMemCache('unit_search', {}))
+    kwargs = {
+        'language_code': tp0.language.code,
+        'project_code': tp0.project.code,
+        'dir_path': '',
+        'filename': '',
+        'filter': 'suggestions',
+        'category': None,
+        'checks': None,
+        'soptions': [],
+        'month': None,
+        'search': None,
+        'sfields': [],
+        'user': None,
+    }
+    total = DBSearchBackend(admin, **kwargs).get_total()
+    assert DBSearchBackend(admin, **kwargs).get_total() == total
+
+    revision = Revision.get()
+    unit = Unit.objects.filter(store__translation_project=tp0,
+                               suggestion_count=0).first()
+    unit.add_suggestion(u'Cached totals suggestion', user=member)
+    assert Revision.get() == revision
+    assert DBSearchBackend(admin, **kwargs).get_total() == total + 1
+
+
+class RecordingTMBackend(SearchBackend):
+    updates = []
+
+    def search(self, unit):
+        return []
+
+    def update_many(self, language, objs):
+        self.updates.extend((language, obj['id'], obj['revision'])
+                            for obj in objs)
+
+
+@pytest.fixture
+def on_commit_immediately(monkeypatch):
+    """Runs on-commit callbacks right away, as if there was no test
+    transaction around.
+    """
+    monkeypatch.setattr(connection, 'on_commit', lambda func: func())
+
+
+@pytest.mark.django_db
+def test_tm_update_queue(monkeypatch, settings, on_commit_immediately):
+    """Tests queued TM updates are flushed in bulk, indexing only the
+    latest update of each unit.
+    """
+    settings.POOTLE_TM_SERVER = {
+        'local': {
+            'ENGINE': 'tests.search.RecordingTMBackend',
+            'INDEX_NAME': 'translations',
+        },
+    }
+    queue = TMUpdateQueue()
+    monkeypatch.setattr(queue, 'schedule_flush', lambda: None)
+    queue.flush()
+    RecordingTMBackend.updates = []
+
+    queue.push('fr', [{'id': 1, 'revision': 1}, {'id': 2, 'revision': 2}])
+    queue.push('fr', [{'id': 1, 'revision': 3}])
+    queue.push('de', [{'id': 1, 'revision': 4}])
+    assert queue.get_pending_count() == 3
+    assert RecordingTMBackend.updates == []
+
+    fr_index_revision = get_index_revision('fr')
+    assert queue.flush() == 3
+    assert queue.get_pending_count() == 0
+    assert get_index_revision('fr') == fr_index_revision + 1
+    assert sorted(RecordingTMBackend.updates) == [
+        ('de', 1, 4), ('fr', 1, 3), ('fr', 2, 2),
+    ]
+
+    assert queue.flush() == 0
+
+
+@pytest.mark.django_db
+def test_tm_update_queue_flush_concurrent_push(monkeypatch, settings,
+                                               on_commit_immediately):
+    """Tests updates pushed while a flush is in progress are flushed once
+    it releases its lock, even though the flush they scheduled gave up.
+    """
+    settings.POOTLE_TM_SERVER = {
+        'local': {
+            'ENGINE': 'tests.search.RecordingTMBackend',
+            'INDEX_NAME': 'translations',
+        },
+    }
+    queue = TMUpdateQueue()
+    scheduled_flushes = []
+    monkeypatch.setattr(queue, 'schedule_flush',
+                        lambda: scheduled_flushes.append(queue.flush()))
+    queue.flush()
+    RecordingTMBackend.updates = []
+
+    update_many = RecordingTMBackend.update_many
+
+    def update_many_and_push(self, language, objs):
+        update_many(self, language, objs)
+        if len(RecordingTMBackend.updates) == 1:
+            queue.push('fr', [{'id': 2, 'revision': 2}])
+
+    monkeypatch.setattr(RecordingTMBackend, 'update_many',
+                        update_many_and_push)
+    queue.add('fr', [{'id': 1, 'revision': 1}])
+    assert scheduled_flushes == []
+
+    assert queue.flush() == 2
+    assert scheduled_flushes == [0]
+    assert queue.get_pending_count() == 0
+    assert sorted(RecordingTMBackend.updates) == [('fr', 1, 1), ('fr', 2, 2)]
+
+
+@pytest.mark.django_db
+def test_tm_update_queue_rollback(monkeypatch, settings):
+    """Tests updates are only queued once their transaction commits."""
+    settings.POOTLE_TM_SERVER = {
+        'local': {
+            'ENGINE': 'tests.search.RecordingTMBackend',
+            'INDEX_NAME': 'translations',
+        },
+    }
+    queue = TMUpdateQueue()
+    scheduled_flushes = []
+    monkeypatch.setattr(queue, 'schedule_flush',
+                        lambda: scheduled_flushes.append(True))
+    pending_count = queue.get_pending_count()
+
+    with pytest.raises(ValueError):
+        with transaction.atomic():
+            queue.push('fr', [{'id': 1, 'revision': 1}])
+            raise ValueError('Rolled back')
+
+    assert queue.get_pending_count() == pending_count
+    assert scheduled_flushes == []
+
+
+def test_tm_update_queue_schedule_flush(monkeypatch):
+    """Tests a single flush job is scheduled until it runs, and the flag
+    tracking it expires in case the job is lost.
+    """
+    class RecordingQueue(object):
+        _async = True
+        jobs = []
+
+        def enqueue(self, func):
+            self.jobs.append(func)
+
+    monkeypatch.setattr('pootle.core.search.queue.get_queue',
+                        lambda name: RecordingQueue())
+    r_con = get_connection()
+    r_con.delete(POOTLE_TM_FLUSH_SCHEDULED)
+    queue = TMUpdateQueue()
+    try:
+        queue.schedule_flush()
+        queue.schedule_flush()
+        assert RecordingQueue.jobs == [flush_tm_updates_job]
+        assert 0 < r_con.ttl(POOTLE_TM_FLUSH_SCHEDULED) <= queue.LOCK_TIMEOUT
+    finally:
+        r_con.delete(POOTLE_TM_FLUSH_SCHEDULED)
+
+
+@pytest.mark.django_db
+def test_tm_update_queue_disabled(settings):
+    """Tests nothing is queued if there's no local TM."""
+    settings.POOTLE_TM_SERVER = {}
+    queue = TMUpdateQueue()
+    pending_count = queue.get_pending_count()
+    queue.push('fr', [{'id': 1, 'revision': 1}])
+
+    assert queue.get_pending_count() == pending_count
+
+
+class StaticTMBackend(SearchBackend):
+
+    def search(self, unit):
+        time.sleep(self._settings.get('DELAY', 0))
+        if self._settings.get('FAIL'):
+            raise ValueError('TM server failure')
+
+        return [{
+            'source': unit.source,
+            'target': self._settings['TARGET'],
+            'count': 1,
+            'score': self._settings['SCORE'],
+        }]
+
+
+@pytest.mark.django_db
+def test_search_broker_search(settings):
+    """Tests TM servers are queried concurrently, skipping the ones which
+    fail or time out.
+    """
+    engine = 'tests.search.StaticTMBackend'
+    settings.POOTLE_TM_SERVER = {
+        'fast': {'ENGINE': engine, 'INDEX_NAME': 'fast', 'TARGET': u'Fast',
+                 'SCORE': 1},
+        'other': {'ENGINE': engine, 'INDEX_NAME': 'other',
+                  'TARGET': u'Other', 'SCORE': 2, 'DELAY': 0.1},
+        'slow': {'ENGINE': engine, 'INDEX_NAME': 'slow', 'TARGET': u'Slow',
+                 'SCORE': 3, 'DELAY': 1, 'TIMEOUT': 0.2},
+        'failing': {'ENGINE': engine, 'INDEX_NAME': 'failing',
+                    'TARGET': u'Failing', 'SCORE': 4, 'FAIL': True},
+    }
+    broker = SearchBroker()
+    unit = Unit.objects.first()
+
+    start = time.time()
+    results = broker.search(unit)
+    assert time.time() - start < 1
+    assert [result['target'] for result in results] == [u'Other', u'Fast']
+
+    stats = broker.get_stats()
+    assert stats['fast']['calls'] == 1
+    assert stats['other']['calls'] == 1
+    assert stats['other']['time'] >= 0.1
+    assert stats['slow']['timeouts'] == 1
+    assert stats['failing']['errors'] == 1
+
+
+@pytest.mark.django_db
+def test_search_broker_search_single_server_timeout(settings):
+    """Tests a lone TM server is skipped when it times out."""
+    settings.POOTLE_TM_SERVER = {
+        'slow': {'ENGINE': 'tests.search.StaticTMBackend',
+                 'INDEX_NAME': 'slow', 'TARGET': u'Slow', 'SCORE': 1,
+                 'DELAY': 1, 'TIMEOUT': 0.2},
+    }
+    broker = SearchBroker()
+    unit = Unit.objects.first()
+
+    start = time.time()
+    assert broker.search(unit) == []
+    assert time.time() - start < 1
+    assert broker.get_stats()['slow']['timeouts'] == 1
+
+
+@pytest.mark.django_db
+def test_search_broker_search_hung_server(settings):
+    """Tests searches aren't held up by the ones still waiting for a server
+    which hangs.
+    """
+    engine = 'tests.search.StaticTMBackend'
+    settings.POOTLE_TM_SERVER = {
+        'fast': {'ENGINE': engine, 'INDEX_NAME': 'fast', 'TARGET': u'Fast',
+                 'SCORE': 1},
+        'hung': {'ENGINE': engine, 'INDEX_NAME': 'hung', 'TARGET': u'Hung',
+                 'SCORE': 2, 'DELAY': 2, 'TIMEOUT': 0.1},
+    }
+    broker = SearchBroker()
+    unit = Unit.objects.first()
+
+    start = time.time()
+    for i in range(3):
+        results = broker.search(unit)
+        assert [result['target'] for result in results] == [u'Fast']
+    assert time.time() - start < 1
+
+    stats = broker.get_stats()
+    assert stats['fast']['calls'] == 3
+    assert stats['hung']['timeouts'] == 3
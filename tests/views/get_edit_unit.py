@@ -37,7 +37,7 @@ def test_get_edit_unit(project0_disk, get_edit_unit, client,
 
     src_lang = unit.store.translation_project.project.source_language
     alt_src_langs = get_alt_src_langs(request, user, translation_project)
-    altsrcs = find_altsrcs(unit, alt_src_langs, store=store, project=project)
+    altsrcs = find_altsrcs(unit, alt_src_langs, store=store)
     altsrcs = {x.id: x.data for x in altsrcs}
     sources = {altsrcs[x]['language_code']: altsrcs[x]['target'] for x in altsrcs}
     sources[src_lang.code] = unit.source
@@ -9,6 +9,8 @@
 
 from __future__ import absolute_import
 
+import json
+
 import pytest
 
 from django.http import Http404
@@ -23,7 +25,8 @@ from pootle_comment import get_model as get_comment_model
 from pootle_store.constants import TRANSLATED, UNTRANSLATED
 from pootle_store.models import QualityCheck, Suggestion, Unit
 from pootle_statistics.models import Submission, SubmissionTypes
-from pootle_store.views import get_uids, toggle_qualitycheck
+from pootle_store.views import (get_uids, prefetch_tm_suggestions,
+                                toggle_qualitycheck)
 
 
 @pytest.mark.django_db
@@ -60,6 +63,55 @@ def test_get_uids_ordered(rf, default, admin, numbered_po):
     assert response.status_code == 200
 
 
+@pytest.mark.django_db
+def test_prefetch_tm_suggestions(rf, admin, monkeypatch, settings):
+    """Tests TM suggestions are prefetched for the requested units."""
+    settings.POOTLE_TM_SERVER = {
+        'local': {
+            'ENGINE': 'tests.search.StaticTMBackend',
+            'INDEX_NAME': 'local',
+        },
+    }
+    monkeypatch.setattr('pootle_store.models.TM_BROKER', None)
+    prefetched = []
+    monkeypatch.setattr(
+        'pootle_store.models.Unit.get_tm_suggestions',
+        lambda unit: prefetched.append(unit.id) or [],
+    )
+    view = prefetch_tm_suggestions
+
+    # `uids` query parameter missing
+    request = create_api_request(rf, user=admin)
+    with pytest.raises(Http400):
+        view(request)
+
+    uids = list(Unit.objects.values_list('id', flat=True)[:3])
+    # Unknown uids are skipped
+    url = '/?%s' % '&'.join('uids=%d' % uid for uid in uids + [0])
+    request = create_api_request(rf, url=url, user=admin)
+    response = view(request)
+    assert response.status_code == 200
+    assert sorted(json.loads(response.content)['uids']) == sorted(uids)
+    assert sorted(prefetched) == sorted(uids)
+
+
+@pytest.mark.django_db
+def test_prefetch_tm_suggestions_no_servers(rf, admin, monkeypatch,
+                                            settings):
+    """Tests no jobs are created if there are no TM servers to query."""
+    settings.POOTLE_TM_SERVER = {}
+    monkeypatch.setattr('pootle_store.models.TM_BROKER', None)
+    monkeypatch.setattr('pootle_store.models.get_queue',
+                        lambda name: pytest.fail(u"A job was created"))
+
+    uids = list(Unit.objects.values_list('id', flat=True)[:3])
+    url = '/?%s' % '&'.join('uids=%d' % uid for uid in uids)
+    request = create_api_request(rf, url=url, user=admin)
+    response = prefetch_tm_suggestions(request)
+    assert response.status_code == 200
+    assert sorted(json.loads(response.content)['uids']) == sorted(uids)
+
+
 @pytest.mark.django_db
 def test_submit_with_suggestion_and_comment(client, request_users):
     """Tests translation can be applied after suggestion is accepted."""